@@ -1,6 +1,11 @@
+import os, hashlib
+import requests
+from typing import Optional, Dict
 
 class DownloadHandler:
     """ Base class for download handlers """
+    chunk_size = 1 << 20
+
     def __init__( self, download_base_dir:str ):
         """ Initialize the download handler
         Args:
@@ -10,4 +15,88 @@ class DownloadHandler:
 
     def downloadFolder( self, folder_id, output_dir ):
         """Pure virtual function to download a folder"""
-        raise NotImplementedError("Pure virtual function to download a folder")
\ No newline at end of file
+        raise NotImplementedError("Pure virtual function to download a folder")
+
+    @staticmethod
+    def parseChecksum( checksum:str ):
+        """ Splits a checksum of the form `<algorithm>:<hexdigest>`. SHA-256 is assumed if no algorithm is given.
+        Returns:
+            tuple[str,str]: The hashlib algorithm name and the lowercase hex digest
+        Raises:
+            ValueError: If the algorithm is not supported by hashlib
+        """
+        algorithm, _, digest = checksum.rpartition(":")
+        algorithm = algorithm.lower() or "sha256"
+        if algorithm not in hashlib.algorithms_available:
+            raise ValueError(f"Unsupported checksum algorithm {algorithm}")
+        return algorithm, digest.lower()
+
+    @classmethod
+    def fileChecksum( cls, filepath:str, algorithm:str = "sha256" ) -> str:
+        """ Hex digest of a file content"""
+        digest = hashlib.new(algorithm)
+        with open(filepath, "rb") as f:
+            for chunk in iter(lambda: f.read(cls.chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @classmethod
+    def checksumMatches( cls, filepath:str, checksum:str ) -> bool:
+        """ Whether a local file exists and its content matches the given `<algorithm>:<hexdigest>` checksum"""
+        if not os.path.isfile(filepath):
+            return False
+        algorithm, digest = cls.parseChecksum(checksum)
+        return cls.fileChecksum(filepath, algorithm) == digest
+
+    @classmethod
+    def resumableDownload( cls, url:str, filepath:str, headers:Optional[Dict[str,str]] = None, checksum:Optional[str] = None, size:Optional[int] = None ) -> str:
+        """ Downloads a file over HTTP, resuming an interrupted transfer and verifying its integrity.
+        The content is written to `<filepath>.part`, which is continued with a `Range` request if it exists, and moved to `filepath` once complete and verified.
+        The download is skipped if `filepath` already matches the checksum (or the size, if no checksum is known).
+
+        Args:
+            url (str): URL of the file
+            filepath (str): Local path of the file
+            headers (Optional[Dict[str,str]]): Additional request headers (e.g. authentication)
+            checksum (Optional[str]): Expected `<algorithm>:<hexdigest>` checksum of the file
+            size (Optional[int]): Expected size of the file in bytes
+        Returns:
+            str: "skipped" if the local file was up to date, "downloaded" otherwise
+        Raises:
+            ValueError: If the downloaded content does not match the expected checksum or size. The partial file is removed.
+        """
+        if os.path.isfile(filepath):
+            if checksum and cls.checksumMatches(filepath, checksum):
+                return "skipped"
+            if not checksum and size is not None and os.path.getsize(filepath) == size:
+                return "skipped"
+
+        os.makedirs(os.path.dirname(os.path.abspath(filepath)), exist_ok=True)
+        part_filepath = f"{filepath}.part"
+        offset = os.path.getsize(part_filepath) if os.path.isfile(part_filepath) else 0
+        if size is not None and offset > size:
+            os.remove(part_filepath)
+            offset = 0
+
+        if size is None or offset < size:
+            request_headers = dict(headers or {})
+            if offset:
+                request_headers["Range"] = f"bytes={offset}-"
+            with requests.get(url, headers=request_headers, stream=True) as response:
+                if response.status_code != 416:
+                    response.raise_for_status()
+                    #The server ignored the range, the transfer starts over
+                    mode = "ab" if response.status_code == 206 else "wb"
+                    with open(part_filepath, mode) as f:
+                        for chunk in response.iter_content(chunk_size=cls.chunk_size):
+                            f.write(chunk)
+
+        if size is not None and os.path.getsize(part_filepath) != size:
+            os.remove(part_filepath)
+            raise ValueError(f"Incomplete download of {url}: expected {size} bytes")
+        if checksum and not cls.checksumMatches(part_filepath, checksum):
+            os.remove(part_filepath)
+            raise ValueError(f"Checksum mismatch for {url}")
+
+        os.replace(part_filepath, filepath)
+        return "downloaded"
@@ -1,7 +1,7 @@
 from feelpp.benchmarking.dashboardRenderer.handlers.download import DownloadHandler
 import girder_client
 import os
-from typing import Optional, List
+from typing import Optional, List, Tuple
 
 class GirderHandler( DownloadHandler ):
     def __init__( self, download_base_dir:str ):
@@ -10,7 +10,7 @@ class GirderHandler( DownloadHandler ):
         It manages the connection details and provides methods to download and upload data to the remote platform.
         """
         super().__init__( download_base_dir = download_base_dir )
-        self.base_url = "https://girder.math.unistra.fr/api/v1"
+        self.base_url = os.environ.get( "GIRDER_API_URL", "https://girder.math.unistra.fr/api/v1" )
         self.initClient()
 
     def initClient( self ) -> None:
@@ -18,6 +18,7 @@ class GirderHandler( DownloadHandler ):
         Initialize and authenticate the Girder client.
 
         The client attempts to authenticate using an API key provided via the environment variable `GIRDER_API_KEY`.
+        The server can be changed with the `GIRDER_API_URL` environment variable.
 
         Raises:
             ConnectionRefusedError: If the `GIRDER_API_KEY` environment variable is not set.
@@ -90,6 +91,60 @@ class GirderHandler( DownloadHandler ):
 
         self.client.downloadFile( fileId=file_id, path=filepath )
 
+    def listFiles( self, resource_type:str, resource_id:str, destination:str ) -> List[Tuple[dict,str]]:
+        """
+        List the files of a Girder resource, with the local path where they should be downloaded.
+        The local layout is the same as the one of `downloadFile`, `downloadItem` and `downloadFolder`:
+        a file is downloaded to `destination`, an item and a folder are downloaded inside the `destination` directory.
+
+        Args:
+            resource_type (str): The resource type, either 'file', 'item' or 'folder'.
+            resource_id (str): The ID of the Girder resource.
+            destination (str): The local path (relative to `self.download_base_dir`) of the resource.
+        Returns:
+            List[Tuple[dict,str]]: The Girder file documents and their local filepaths.
+        """
+        base_dir = self.download_base_dir or ""
+        return [ ( file, os.path.join( base_dir, filepath ) ) for file, filepath in self._listFiles( resource_type, resource_id, destination ) ]
+
+    def _listFiles( self, resource_type:str, resource_id:str, destination:str ) -> List[Tuple[dict,str]]:
+        """ Same as `listFiles`, with filepaths relative to `self.download_base_dir`"""
+        if resource_type == "file":
+            return [ ( self.client.getFile( resource_id ), destination ) ]
+        elif resource_type == "item":
+            item = self.client.getItem( resource_id )
+            files = list( self.client.listFile( resource_id ) )
+            if len(files) == 1 and files[0]["name"] == item["name"]:
+                return [ ( files[0], os.path.join( destination, item["name"] ) ) ]
+            return [ ( file, os.path.join( destination, item["name"], file["name"] ) ) for file in files ]
+        elif resource_type == "folder":
+            files = []
+            for folder in self.client.listFolder( resource_id ):
+                files += self._listFiles( "folder", folder["_id"], os.path.join( destination, folder["name"] ) )
+            for item in self.client.listItem( resource_id ):
+                files += self._listFiles( "item", item["_id"], destination )
+            return files
+        raise NotImplementedError(f"Unknown Girder resource type {resource_type}")
+
+    def fetchFile( self, file:dict, filepath:str, checksum:Optional[str] = None ) -> str:
+        """
+        Download a Girder file if it is not already present locally, resuming interrupted transfers.
+        The integrity of the file is verified against `checksum`, or against the SHA-512 reported by the server if available, or against its size.
+
+        Args:
+            file (dict): The Girder file document (as returned by `listFiles`).
+            filepath (str): The local path of the file.
+            checksum (Optional[str]): The expected `<algorithm>:<hexdigest>` checksum of the file.
+        Returns:
+            str: "skipped" if the local file was up to date, "downloaded" otherwise.
+        """
+        if not checksum and file.get("sha512"):
+            checksum = f"sha512:{file['sha512']}"
+        return self.resumableDownload(
+            f"{self.base_url}/file/{file['_id']}/download", filepath,
+            headers = { "Girder-Token": self.client.token }, checksum = checksum, size = file.get("size")
+        )
+
     def listChildren( self, parent_id:str, children_name:Optional[str] = None ) -> List:
         """
         List children (items or folders) within a Girder folder.
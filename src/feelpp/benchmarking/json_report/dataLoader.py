@@ -1,7 +1,9 @@
 from typing import Union, Type, List, Dict
 from feelpp.benchmarking.json_report.schemas.dataRefs import DataFile, InlineTable, InlineRaw, InlineObject,DataTable,DataObject,DataRaw,DataField, Preprocessor, ReferenceSource
 from feelpp.benchmarking.json_report.schemas.dataRefs import Pivot, GroupBy, SortInstruction, FilterCondition
+from collections.abc import Mapping
 import pandas as pd
+import numpy as np
 import json
 
 
@@ -16,6 +18,9 @@ class DataFileLoader(DataLoader):
     def load(self):
         if not isinstance(self.source, DataFile):
             raise ValueError(f" DataFileLoader is not supported for source type : {type(self.source)}")
+        if self.source.format == "npz":
+            #Arrays are only read when accessed
+            return np.load(self.source.filepath)
         with open( self.source.filepath, "r" ) as f:
             if self.source.format == "csv":
                 return pd.read_csv(f)
@@ -85,6 +90,8 @@ class DataTableProcessor(DataFieldProcessor):
             filedata = pd.DataFrame.from_dict(filedata,orient="columns")
         elif isinstance(filedata,dict):
             filedata = pd.DataFrame.from_dict(filedata,orient="index")
+        elif isinstance(filedata,Mapping):
+            filedata = pd.DataFrame({ name: pd.Series(values) for name, values in filedata.items() })
         elif isinstance(filedata,str):
             raise NotImplementedError(f"Cannot create a Table from a string: {filedata}")
 
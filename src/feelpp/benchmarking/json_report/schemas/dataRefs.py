@@ -69,7 +69,7 @@ class Preprocessor(BaseModel):
 
 class DataFile(BaseModel):
     filepath: str
-    format: Optional[Literal["json","csv","raw"]] = None
+    format: Optional[Literal["json","csv","raw","npz"]] = None
 
     @field_validator("filepath", mode="after")
     @classmethod
@@ -92,7 +92,7 @@ class DataFile(BaseModel):
 
     @model_validator(mode="after")
     def inferFormat( self ):
-        extension_to_format = { "json":"json", "csv":"csv", "txt":"raw" }
+        extension_to_format = { "json":"json", "csv":"csv", "txt":"raw", "npz":"npz" }
         if self.format is None:
             _, ext = os.path.splitext( self.filepath )
             ext = ext.lower()
@@ -174,7 +174,7 @@ class DataField(BaseModel):
             filepath = values.pop("filepath")
             format = values.pop("format",None)
             values["source"] = DataFile.model_validate({"filepath":filepath,"format":format}, context=info.context)
-            format_to_default_type = { "json":"Object", "csv":"DataTable", "raw":"Raw" }
+            format_to_default_type = { "json":"Object", "csv":"DataTable", "raw":"Raw", "npz":"DataTable" }
             if values.get("type") is None:
                 values["type"] = format_to_default_type.get(values["source"].format,"Raw")
         elif "ref" in values:
@@ -43,6 +43,24 @@ class TestFileLoader:
         loaded = DataFileLoader(datafield.source).load()
         assert isinstance(loaded,expected_type)
 
+    def test_npz(self,tmp_path):
+        """ Tests that npz sidecar arrays are loaded lazily, and converted to a table with columns of different lengths"""
+        filepath = tmp_path / "arrays.npz"
+        np.savez(filepath, residual=np.array([1.0,0.1,0.01]), time=np.array([2.0]))
+        datafield = DataField.model_validate(dict(name="test", filepath=str(filepath)),context={"report_filepath":str(filepath)})
+        assert datafield.source.format == "npz"
+        assert datafield.type == "DataTable"
+
+        loaded = DataFileLoader(datafield.source).load()
+        assert sorted(loaded.keys()) == ["residual","time"]
+        assert loaded["residual"].tolist() == [1.0,0.1,0.01]
+
+        df = DataTableProcessor(DataTable(name="test",source=datafield.source)).process(loaded)
+        assert df["residual"].tolist() == [1.0,0.1,0.01]
+        assert df["time"].tolist()[0] == 2.0
+        assert df["time"].isna().sum() == 2
+        loaded.close()
+
     def test_unkown(self,tmp_path):
         filepath = tmp_path / "data.unkown"
         filepath.write_text("Weird format")
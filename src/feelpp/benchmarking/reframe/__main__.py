@@ -1,16 +1,29 @@
 import os, json, subprocess, shutil
 from feelpp.benchmarking.reframe.parser import Parser
 from feelpp.benchmarking.reframe.config.configReader import ConfigReader, FileHandler
+from feelpp.benchmarking.reframe.config.configCache import ConfigCache
 from feelpp.benchmarking.reframe.schemas.benchmarkSchemas import ConfigFile
 from feelpp.benchmarking.reframe.schemas.machines import MachineConfig
 from feelpp.benchmarking.report.websiteConfigcreator import WebsiteConfigCreator
 from feelpp.benchmarking.reframe.commandBuilder import CommandBuilder
+from feelpp.benchmarking.reframe.parameters import ParameterHandler
+from feelpp.benchmarking.reframe.estimator import CostEstimator
+from feelpp.benchmarking.reframe.bundling import BundlePlanner, BundleRunner, JobArrayPlanner, JobArrayRunner
+from feelpp.benchmarking.reframe.resultCache import ResultCache
+from feelpp.benchmarking.reframe.orchestrator import Orchestrator
+from feelpp.benchmarking.reframe.prefetch import Prefetcher
+from feelpp.benchmarking.reframe.prepare import PrepareStage
 from feelpp.benchmarking.dashboardRenderer.handlers.girder import GirderHandler
 
 def main_cli():
     parser = Parser()
 
-    machine_reader = ConfigReader(parser.args.machine_config,MachineConfig,"machine",dry_run=parser.args.dry_run)
+    #Disabling the config cache also applies to ReFrame processes
+    if parser.args.no_config_cache:
+        os.environ[ConfigCache.disable_env_var] = "1"
+    config_cache = ConfigCache.fromEnvironment()
+
+    machine_reader = ConfigReader(parser.args.machine_config,MachineConfig,"machine",dry_run=parser.args.dry_run,cache=config_cache)
 
     #Sets the cachedir and tmpdir directories for containers
     for platform, dirs in machine_reader.config.containers.items():
@@ -25,105 +38,164 @@ def main_cli():
     cmd_builder = CommandBuilder(machine_reader.config,parser)
 
     os.environ["MACHINE_CONFIG_FILEPATH"] = parser.args.machine_config
+    if parser.args.resume:
+        os.environ[ResultCache.resume_env_var] = "1"
 
     website_config = WebsiteConfigCreator(machine_reader.config.reports_base_dir)
 
-    for config_filepath in parser.args.benchmark_config:
+    return_code = 0
+    config_filepaths = parser.args.benchmark_config
+    if (parser.args.parallel_configs > 1 or parser.args.max_jobs) and not (parser.args.count or parser.args.estimate):
+        #Configurations run concurrently in child processes, sharing the jobs budget
+        orchestrator = Orchestrator(
+            parser.args, parser.args.parallel_configs, parser.args.max_jobs,
+            cmd_builder.buildConfigFilePath(), machine_reader.config.machine, machine_reader.config.reframe_base_dir
+        )
+        exit_codes = orchestrator.run()
+        print(Orchestrator.summary(exit_codes))
+        return_code = Orchestrator.exitCode(exit_codes)
+        config_filepaths = []
+
+    for config_filepath in config_filepaths:
         os.environ["APP_CONFIG_FILEPATH"] = config_filepath
 
 
         configs = [{"":config_filepath}]
         if parser.args.plots_config:
             configs += [{"json_report":parser.args.plots_config}]
-        app_reader = ConfigReader(configs,ConfigFile,"app",dry_run=parser.args.dry_run,additional_readers=[machine_reader])
+        app_reader = ConfigReader(configs,ConfigFile,"app",dry_run=parser.args.dry_run,additional_readers=[machine_reader],cache=config_cache)
 
         executable_name = os.path.basename(app_reader.config.executable).split(".")[0]
+        history_dir = CommandBuilder.buildReportBaseDir(machine_reader.config,executable_name,app_reader.config.use_case_name)
+        parameter_handler = ParameterHandler(app_reader.config.parameters,history_dir,app_reader.config.sampling)
+
+        if parser.args.count:
+            print(f"{config_filepath} : {parameter_handler.count()} parameter combinations")
+            continue
+
+        if parser.args.estimate:
+            estimator = CostEstimator(app_reader, machine_reader, parameter_handler, cmd_builder.buildConfigFilePath(), history_dir)
+            print(f"{config_filepath} :")
+            print(estimator.summary(estimator.estimate()))
+            continue
+
+        if parameter_handler.isExhausted():
+            print(f"{config_filepath} : No more points to run for adaptive parameters {parameter_handler.adaptive_parameters}")
+            continue
+
         report_folder_path = cmd_builder.createReportFolder(executable_name,app_reader.config.use_case_name)
 
-        #===============PULL IMAGES==================#
+        #========= PULL IMAGES AND DOWNLOAD REMOTE DEPENDENCIES =========#
         if not parser.args.dry_run:
-            for platform_name, platform_field in app_reader.config.platforms.items():
-                if not platform_field.image or not platform_field.image.url or not machine_reader.config.containers[platform_name].executable:
-                    continue
-                if platform_name == "apptainer":
-                    completed_pull = subprocess.run(f"{machine_reader.config.containers['apptainer'].executable} pull -F {platform_field.image.filepath} {platform_field.image.url}", shell=True)
-                    completed_pull.check_returncode()
-                else:
-                    raise NotImplementedError(f"Image pulling is not yet supported for {platform_name}")
-        #=============================================#
-
-        #===== Download remote dependencies ============#
-        if not parser.args.dry_run:
-            if app_reader.config.remote_input_dependencies:
-                if any(v.girder for v in app_reader.config.remote_input_dependencies.values()):
-                    girder_handler = GirderHandler(machine_reader.config.input_user_dir or machine_reader.config.input_dataset_base_dir  )
-            for dependency_name,remote_dependency in app_reader.config.remote_input_dependencies.items():
-                print(f"Donwloading remote file dependency : {dependency_name} ...")
-                if remote_dependency.girder:
-                    if remote_dependency.girder.file:
-                        girder_handler.downloadFile( remote_dependency.girder.file, os.path.dirname(remote_dependency.destination), name=os.path.basename(remote_dependency.destination) )
-                    elif remote_dependency.girder.folder:
-                        girder_handler.downloadFolder(remote_dependency.girder.folder,remote_dependency.destination)
-                    elif remote_dependency.girder.item:
-                        girder_handler.downloadItem(remote_dependency.girder.item,remote_dependency.destination)
-                    else:
-                        raise NotImplementedError(f"Remote dependency resource type is not implemented for {dependency_name}")
-                else:
-                    raise NotImplementedError(f"Platform {remote_dependency} is not implemented for {dependency_name}")
-        #================================================#
+            prefetcher = Prefetcher()
+            prefetcher.addImages(app_reader.config.platforms, machine_reader.config.containers)
+            if any(v.girder for v in app_reader.config.remote_input_dependencies.values()):
+                girder_handler = GirderHandler(machine_reader.config.input_user_dir or machine_reader.config.input_dataset_base_dir)
+                prefetcher.addRemoteDependencies(app_reader.config.remote_input_dependencies, girder_handler)
+            if prefetcher.tasks:
+                print(Prefetcher.summary(prefetcher.run()))
+        #================================================================#
 
         #============== UPDATE WEBSITE CONFIG FILE ==============#
         common_itempath = (parser.args.move_results or report_folder_path).split("/")
         common_itempath = "/".join(common_itempath[:-1 - (common_itempath[-1] == "")])
 
-        website_config.updateExecutionMapping(
-            executable_name, machine_reader.config.machine, app_reader.config.use_case_name,
-            report_itempath = common_itempath
-        )
+        #Other processes may update the website configuration at the same time
+        with WebsiteConfigCreator.lock(machine_reader.config.reports_base_dir):
+            website_config = WebsiteConfigCreator(machine_reader.config.reports_base_dir)
+            website_config.updateExecutionMapping(
+                executable_name, machine_reader.config.machine, app_reader.config.use_case_name,
+                report_itempath = common_itempath
+            )
 
-        website_config.updateMachine(machine_reader.config.machine)
-        website_config.updateUseCase(app_reader.config.use_case_name)
-        website_config.updateApplication(executable_name)
+            website_config.updateMachine(machine_reader.config.machine)
+            website_config.updateUseCase(app_reader.config.use_case_name)
+            website_config.updateApplication(executable_name)
 
-        website_config.save()
+            website_config.save()
         #======================================================#
 
 
-        #============ CREATING RESULT ITEM ================#
-        with open(os.path.join(report_folder_path,"report.json"),"w") as f:
-            f.write(json.dumps(app_reader.config.json_report.model_dump()))
+        #Adaptive parameters are refined from previous results, campaigns are repeated until there are no more points to run
+        while True:
+            #============ CREATING RESULT ITEM ================#
+            with open(os.path.join(report_folder_path,"report.json"),"w") as f:
+                f.write(json.dumps(app_reader.config.json_report.model_dump()))
+
+            #Copy use case description if existant
+            FileHandler.copyResource(
+                app_reader.config.additional_files.description_filepath,
+                os.path.join(report_folder_path,"partials"),
+                "description"
+            )
+            #===============================================#
+
+            #With a timeout policy, time limits are set for each test
+            timeout = None if app_reader.config.timeout_policy else app_reader.config.timeout
+            try:
+                # ============== LAUNCH REFRAME =======================#
+                if (machine_reader.config.bundling or machine_reader.config.job_array) and not parser.args.dry_run:
+                    #Compatible test cases are grouped into single allocations or job arrays
+                    estimator = CostEstimator(app_reader, machine_reader, parameter_handler, cmd_builder.buildConfigFilePath(), None)
+                    if machine_reader.config.bundling:
+                        planner, runner_type = BundlePlanner(estimator, machine_reader.config.bundling), BundleRunner
+                    else:
+                        planner, runner_type = JobArrayPlanner(estimator, machine_reader.config.job_array), JobArrayRunner
+                    bundles = planner.plan()
+                    print(f"Running {sum(len(b.combinations) for b in bundles)} test cases in {len(bundles)} {runner_type.bundle_mode} jobs")
+                    runner = runner_type(cmd_builder, machine_reader.config, cmd_builder.buildConfigFilePath(), report_folder_path)
+                    return_code = return_code or runner.exitCode(runner.run(bundles, timeout))
+                else:
+                    reframe_cmd = cmd_builder.buildCommand(timeout)
+                    exit_code = subprocess.run(reframe_cmd, shell=True)
+                    return_code = return_code or exit_code.returncode
+                #======================================================#
+            finally:
+                if not os.path.exists(os.path.join(report_folder_path,"reframe_report.json")):
+                    if os.path.exists(os.path.join(report_folder_path,"report.json")):
+                        os.remove(os.path.join(report_folder_path,"report.json"))
+                    if os.path.exists(os.path.join(report_folder_path,"bundles")):
+                        shutil.rmtree(os.path.join(report_folder_path,"bundles"))
+                    os.rmdir(report_folder_path)
+
+            #============ REMOVE PREPARE STAGE FROM REPORT ==========#
+            if app_reader.config.prepare and os.path.exists(os.path.join(report_folder_path,"reframe_report.json")):
+                PrepareStage.pruneReport(os.path.join(report_folder_path,"reframe_report.json"))
+            #======================================================#
 
-        #Copy use case description if existant
-        FileHandler.copyResource(
-            app_reader.config.additional_files.description_filepath,
-            os.path.join(report_folder_path,"partials"),
-            "description"
-        )
-        #===============================================#
+            #============ MERGE AND STORE CACHED RESULTS ===========#
+            if not parser.args.dry_run and os.path.exists(os.path.join(report_folder_path,"reframe_report.json")):
+                restored, stored = ResultCache(CommandBuilder.buildCacheDir(machine_reader.config,executable_name,app_reader.config.use_case_name)).update(report_folder_path)
+                if restored:
+                    print(f"{restored} test cases restored from the result cache")
+            #======================================================#
 
-        try:
-            # ============== LAUNCH REFRAME =======================#
-            reframe_cmd = cmd_builder.buildCommand( app_reader.config.timeout)
-            exit_code = subprocess.run(reframe_cmd, shell=True)
+            # ================== MOVE RESULTS (OPTION)============#
+            if parser.args.move_results:
+                if not os.path.exists(parser.args.move_results):
+                    os.makedirs(parser.args.move_results)
+                os.rename(os.path.join(report_folder_path,"reframe_report.json"),os.path.join(parser.args.move_results,"reframe_report.json"))
+                os.rename(os.path.join(report_folder_path,"report.json"),os.path.join(parser.args.move_results,"report.json"))
             #======================================================#
-        finally:
-            if not os.path.exists(os.path.join(report_folder_path,"reframe_report.json")):
-                if os.path.exists(os.path.join(report_folder_path,"report.json")):
-                    os.remove(os.path.join(report_folder_path,"report.json"))
-                os.rmdir(report_folder_path)
-
-        # ================== MOVE RESULTS (OPTION)============#
-        if parser.args.move_results:
-            if not os.path.exists(parser.args.move_results):
-                os.makedirs(parser.args.move_results)
-            os.rename(os.path.join(report_folder_path,"reframe_report.json"),os.path.join(parser.args.move_results,"reframe_report.json"))
-            os.rename(os.path.join(report_folder_path,"report.json"),os.path.join(parser.args.move_results,"report.json"))
-        #======================================================#
+
+            if parser.args.dry_run or not parameter_handler.adaptive_parameters:
+                break
+            previous_parameters = parameter_handler.parameters
+            parameter_handler = ParameterHandler(app_reader.config.parameters,history_dir,app_reader.config.sampling)
+            #Stop if the previous campaign did not produce new results (e.g. failed or moved reports)
+            if parameter_handler.isExhausted() or parameter_handler.parameters == previous_parameters:
+                break
+            cmd_builder.updateDate()
+            report_folder_path = cmd_builder.createReportFolder(executable_name,app_reader.config.use_case_name)
 
     if parser.args.website:
         subprocess.run(["feelpp-benchmarking-render","--config-file", website_config.config_filepath])
         subprocess.run(["npm","run","antora"])
         subprocess.run(["npm","run","start"])
 
+    #Orchestrated runs report ReFrame exit codes, so that the parent process can aggregate them
+    if parser.args.parallel_configs > 1 or parser.args.max_jobs or os.environ.get(CommandBuilder.config_key_env_var):
+        return return_code
+
     # return exit_code.returncode
-    return 0
\ No newline at end of file
+    return 0
@@ -0,0 +1,87 @@
+import os
+
+
+class AffinityProbe:
+    """ Records the CPU affinity of each rank, as seen by the kernel (Cpus_allowed_list of /proc/self/status).
+    The probe is launched with the same launcher and options as the application, before it runs, and writes one line per rank: <host> <rank> <cpu list>.
+    """
+    filename = "affinity.log"
+    probe = 'echo "$(hostname) ${SLURM_PROCID:-${PMI_RANK:-${OMPI_COMM_WORLD_RANK:-0}}} $(grep Cpus_allowed_list /proc/self/status | cut -f2)"'
+
+    @classmethod
+    def command(cls, launcher_command, output_filepath):
+        """ Builds the shell command running the probe
+        Args:
+            launcher_command (str): Launcher command of the job (e.g. srun --cpu-bind=cores)
+            output_filepath (str): File where ranks affinities are written
+        """
+        return f"{launcher_command} sh -c '{cls.probe}' > {output_filepath}"
+
+    @staticmethod
+    def expandCpuList(cpu_list):
+        """ Expands a kernel CPU list (e.g. "0-3,8,10-11") to a sorted list of CPU ids"""
+        cpus = set()
+        for chunk in cpu_list.strip().split(","):
+            if not chunk:
+                continue
+            if "-" in chunk:
+                start, end = chunk.split("-")
+                cpus.update(range(int(start), int(end)+1))
+            else:
+                cpus.add(int(chunk))
+        return sorted(cpus)
+
+    @classmethod
+    def parse(cls, filepath):
+        """ Reads the probe output
+        Returns:
+            list[dict]: host, rank and allowed cpus of each rank, sorted by rank. Empty if the file does not exist.
+        """
+        if not os.path.exists(filepath):
+            return []
+        ranks = []
+        with open(filepath,"r") as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) != 3:
+                    continue
+                host, rank, cpu_list = fields
+                ranks.append({ "host": host, "rank": int(rank), "cpus": cls.expandCpuList(cpu_list) })
+        return sorted(ranks, key=lambda r: r["rank"])
+
+    @staticmethod
+    def check(ranks, max_cpus=None, exclusive=True):
+        """ Looks for mis-pinned ranks
+        Args:
+            ranks (list[dict]): Parsed probe output
+            max_cpus (int): Maximum number of CPUs a rank is expected to be allowed on. Not checked if None.
+            exclusive (bool): Whether ranks of the same host should be bound to disjoint CPUs
+        Returns:
+            list[str]: Description of the issues found
+        """
+        issues = []
+        used = {}
+        for rank in ranks:
+            if max_cpus and len(rank["cpus"]) > max_cpus:
+                issues.append(f"Rank {rank['rank']} is allowed on {len(rank['cpus'])} CPUs (expected at most {max_cpus})")
+            if exclusive:
+                for cpu in rank["cpus"]:
+                    other = used.setdefault((rank["host"],cpu), rank["rank"])
+                    if other != rank["rank"]:
+                        issues.append(f"Ranks {other} and {rank['rank']} share CPU {cpu} on {rank['host']}")
+                        break
+        return issues
+
+    @staticmethod
+    def summarize(ranks):
+        """ Compact representation of ranks affinity, for reports. e.g. {"0": "node1:0-3"}"""
+        def compress(cpus):
+            ranges, start = [], None
+            for i, cpu in enumerate(cpus):
+                if start is None:
+                    start = cpu
+                if i == len(cpus)-1 or cpus[i+1] != cpu+1:
+                    ranges.append(f"{start}-{cpu}" if cpu != start else f"{cpu}")
+                    start = None
+            return ",".join(ranges)
+        return { str(rank["rank"]): f"{rank['host']}:{compress(rank['cpus'])}" for rank in ranks }
@@ -0,0 +1,384 @@
+import os, json, runpy, subprocess, time
+from feelpp.benchmarking.reframe.estimator import formatTimeout
+from feelpp.benchmarking.reframe.commandBuilder import CommandBuilder
+
+
+class Bundle:
+    """ Group of compatible test cases (same partition, environment and number of nodes), run inside a single scheduler allocation"""
+    def __init__(self, index, partition, environment, num_nodes, combinations, timeouts, concurrent_steps=1):
+        """
+        Args:
+            index (int): Bundle number, used for naming
+            partition (str): Partition name
+            environment (str): Programming environment name
+            num_nodes (int): Number of nodes of each test case
+            combinations (list[dict]): Parameter combinations of the bundled test cases
+            timeouts (list[int]): Timeout of each test case, in seconds
+            concurrent_steps (int): Number of test cases running at the same time inside the allocation
+        """
+        self.index = index
+        self.partition = partition
+        self.environment = environment
+        self.num_nodes = num_nodes
+        self.combinations = combinations
+        self.timeouts = timeouts
+        self.concurrent_steps = min(concurrent_steps, len(combinations))
+
+    @property
+    def name(self):
+        return f"bundle_{self.index}"
+
+    @property
+    def allocation_nodes(self):
+        return self.num_nodes * self.concurrent_steps
+
+    @property
+    def time_limit(self):
+        """ Wall time of the allocation (seconds): test cases run in waves of concurrent_steps"""
+        return sum(
+            max(self.timeouts[start:start+self.concurrent_steps])
+            for start in range(0, len(self.timeouts), self.concurrent_steps)
+        )
+
+
+class JobArray(Bundle):
+    """ Group of test cases with identical resources, submitted as a scheduler job array (one array task per test case)"""
+    def __init__(self, index, partition, environment, num_nodes, combinations, timeouts, max_concurrent=None):
+        """
+        Args:
+            max_concurrent (int): Maximum number of array tasks running simultaneously. Not limited if None.
+        """
+        super().__init__(index, partition, environment, num_nodes, combinations, timeouts)
+        self.max_concurrent = max_concurrent
+
+    @property
+    def name(self):
+        return f"array_{self.index}"
+
+    @property
+    def allocation_nodes(self):
+        return self.num_nodes
+
+    @property
+    def time_limit(self):
+        """ Wall time of each array task (seconds)"""
+        return max(self.timeouts)
+
+
+class BundlePlanner:
+    """ Groups the test cases of a campaign into bundles"""
+    def __init__(self, estimator, bundling_config):
+        """
+        Args:
+            estimator (CostEstimator): Estimator used to expand the test cases and resolve their resources
+            bundling_config (Bundling): Bundling configuration from the machine pydantic schema
+        """
+        self.estimator = estimator
+        self.max_cases = bundling_config.max_cases
+        self.concurrent_steps = bundling_config.concurrent_steps
+
+    @staticmethod
+    def groupKey(test, environment):
+        """ Test cases with the same key can be bundled together"""
+        return (test["partition"], environment, test["num_nodes"])
+
+    def createBundle(self, index, key, combinations, timeouts):
+        partition, environment, num_nodes = key[:3]
+        return Bundle(index, partition, environment, num_nodes, combinations, timeouts, self.concurrent_steps)
+
+    def plan(self):
+        """ Groups test cases by key (partition, environment and number of nodes), in chunks of at most max_cases
+        Returns:
+            list[Bundle]
+        """
+        groups = {}
+        for test in self.estimator.expandTests():
+            for environment in self.estimator.environments(test["partition"]):
+                groups.setdefault(self.groupKey(test, environment), []).append((test["combination"], test["timeout"]))
+
+        bundles = []
+        for key, cases in groups.items():
+            for start in range(0, len(cases), self.max_cases):
+                chunk = cases[start:start+self.max_cases]
+                bundles.append(self.createBundle(
+                    len(bundles), key, [combination for combination, _ in chunk], [timeout for _, timeout in chunk]
+                ))
+        return bundles
+
+
+class JobArrayPlanner(BundlePlanner):
+    """ Groups the test cases of a campaign into job arrays. Only test cases differing in application parameters (not resources) share an array."""
+    def __init__(self, estimator, job_array_config):
+        """
+        Args:
+            estimator (CostEstimator): Estimator used to expand the test cases and resolve their resources
+            job_array_config (JobArrayConfig): Job array configuration from the machine pydantic schema
+        """
+        self.estimator = estimator
+        self.max_cases = job_array_config.max_tasks
+        self.max_concurrent = job_array_config.max_concurrent
+
+    @staticmethod
+    def groupKey(test, environment):
+        return (test["partition"], environment, test["num_nodes"], test["num_tasks"], test["num_tasks_per_node"], test["num_cpus_per_task"])
+
+    def createBundle(self, index, key, combinations, timeouts):
+        partition, environment, num_nodes = key[:3]
+        return JobArray(index, partition, environment, num_nodes, combinations, timeouts, self.max_concurrent)
+
+
+class BundleRunner:
+    """ Submits bundles as batch jobs and merges their ReFrame reports.
+    Inside each allocation, ReFrame runs the bundled test cases with the local scheduler, so every test case is launched as a job step
+    (with the partition launcher) and keeps its own stage directory.
+    """
+    bundle_env_var = "FEELPP_BENCHMARKING_BUNDLE"
+    combinations_env_var = "FEELPP_BENCHMARKING_COMBINATIONS"
+    bundle_mode = "allocation"
+    poll_interval = 30
+    max_poll_failures = 10
+
+    def __init__(self, cmd_builder, machine_config, rfm_config_path, report_folder_path):
+        """
+        Args:
+            cmd_builder (CommandBuilder): Builder of the ReFrame command
+            machine_config (MachineConfig): Machine configuration
+            rfm_config_path (str): Path of the ReFrame configuration file of the machine
+            report_folder_path (str): Report folder of the campaign
+        """
+        self.cmd_builder = cmd_builder
+        self.machine_config = machine_config
+        self.rfm_config_path = rfm_config_path
+        self.report_folder_path = report_folder_path
+        self.bundles_dir = os.path.join(report_folder_path, "bundles")
+        self.missing_reports = []
+
+    def loadSiteConfiguration(self):
+        return runpy.run_path(self.rfm_config_path)["site_configuration"]
+
+    def writeSiteConfiguration(self, site_configuration, output_filepath):
+        """ Writes a copy of the ReFrame configuration where the machine partitions use the local scheduler"""
+        CommandBuilder.writeSiteConfiguration(site_configuration, self.machine_config.machine, output_filepath, scheduler="local", max_jobs=self.maxJobs())
+
+    def maxJobs(self):
+        """ Number of test cases ReFrame runs at the same time inside an allocation"""
+        return self.machine_config.bundling.concurrent_steps
+
+    @staticmethod
+    def partitionAccess(site_configuration, machine, partition):
+        system = next((s for s in site_configuration["systems"] if s["name"] == machine), {})
+        return next((p.get("access",[]) for p in system.get("partitions",[]) if p["name"] == partition), [])
+
+    def buildScript(self, bundle, reframe_command, access):
+        """ Builds the batch script of a bundle
+        Args:
+            bundle (Bundle): Bundle to run
+            reframe_command (str): ReFrame command running the bundled test cases
+            access (list[str]): Scheduler options of the partition
+        """
+        bundle_dir = os.path.join(self.bundles_dir, bundle.name)
+        lines = ["#!/bin/bash"]
+        lines += [f"#SBATCH {directive}" for directive in self.directives(bundle) + access + self.machine_config.access]
+        lines += [
+            "",
+            f"export {self.bundle_env_var}={self.bundle_mode}",
+            f"export {self.combinations_env_var}={os.path.join(bundle_dir, 'combinations.json')}",
+        ]
+        lines += [f"export {name}={os.environ[name]}" for name in ["MACHINE_CONFIG_FILEPATH","APP_CONFIG_FILEPATH"] if name in os.environ]
+        lines += ["", reframe_command, ""]
+        return "\n".join(lines)
+
+    def directives(self, bundle):
+        """ Scheduler directives of the bundle allocation"""
+        return [
+            f"--job-name=feelpp_{bundle.name}",
+            f"--nodes={bundle.allocation_nodes}",
+            f"--time={formatTimeout(bundle.time_limit)}",
+            f"--output={os.path.join(self.bundles_dir, bundle.name, 'bundle.out')}",
+            "--exclusive"
+        ]
+
+    def reportFilename(self, bundle):
+        """ Name of the ReFrame report written inside the allocation. Not named reframe_report.json, so it is not read as history."""
+        return "bundle_report.json"
+
+    def reportFilepaths(self, bundle):
+        return [os.path.join(self.bundles_dir, bundle.name, "bundle_report.json")]
+
+    @classmethod
+    def selectedCombinations(cls):
+        """ Reads the combinations to run from the environment, inside a bundle or a job array task
+        Returns:
+            list[dict]: Selected combinations, or None outside bundles
+        """
+        filepath = os.environ.get(cls.combinations_env_var)
+        if not filepath:
+            return None
+        with open(filepath, "r") as f:
+            combinations = json.load(f)
+        if os.environ.get(cls.bundle_env_var) == JobArrayRunner.bundle_mode:
+            return [combinations[int(os.environ["SLURM_ARRAY_TASK_ID"])]]
+        return combinations
+
+    def prepare(self, bundles, timeout):
+        """ Writes the derived ReFrame configuration, and the combinations and batch script of each bundle
+        Args:
+            bundles (list[Bundle])
+            timeout (str): Timeout of each test case
+        Returns:
+            list[str]: Batch scripts paths
+        """
+        os.makedirs(self.bundles_dir, exist_ok=True)
+        site_configuration = self.loadSiteConfiguration()
+        access = {
+            partition: self.partitionAccess(site_configuration, self.machine_config.machine, partition)
+            for partition in {bundle.partition for bundle in bundles}
+        }
+        config_filepath = os.path.join(self.bundles_dir, "reframe_config.py")
+        self.writeSiteConfiguration(site_configuration, config_filepath)
+
+        scripts = []
+        for bundle in bundles:
+            bundle_dir = os.path.join(self.bundles_dir, bundle.name)
+            os.makedirs(bundle_dir, exist_ok=True)
+            with open(os.path.join(bundle_dir, "combinations.json"), "w") as f:
+                json.dump(bundle.combinations, f)
+
+            reframe_command = " ".join(self.cmd_builder.buildCommand(
+                timeout,
+                config_filepath = config_filepath,
+                system = f"{self.machine_config.machine}:{bundle.partition}",
+                environment = bundle.environment,
+                report_filepath = os.path.join(bundle_dir, self.reportFilename(bundle))
+            ).split())
+            script_path = os.path.join(bundle_dir, "bundle.sh")
+            with open(script_path, "w") as f:
+                f.write(self.buildScript(bundle, reframe_command, access[bundle.partition]))
+            scripts.append(script_path)
+        return scripts
+
+    @staticmethod
+    def submit(script):
+        """ Submits a batch script
+        Returns:
+            str: Job id
+        """
+        completed = subprocess.run(["sbatch", "--parsable", script], capture_output=True, text=True, check=True)
+        return completed.stdout.strip().split(";")[0]
+
+    def wait(self, job_ids):
+        """ Waits until none of the jobs (or of their array tasks) is queued or running.
+        Other squeue errors (e.g. slurmctld temporarily unreachable) are retried, and a RuntimeError is raised after max_poll_failures consecutive errors.
+        """
+        job_ids = list(job_ids)
+        failures = 0
+        while job_ids:
+            completed = subprocess.run(["squeue", "-h", "-o", "%i", "-j", ",".join(job_ids)], capture_output=True, text=True)
+            if completed.returncode != 0:
+                #squeue fails with an invalid job id error when all jobs have left the queue
+                if "Invalid job id" in completed.stderr:
+                    break
+                failures += 1
+                if failures >= self.max_poll_failures:
+                    raise RuntimeError(f"Cannot poll jobs {','.join(job_ids)}, squeue failed {failures} times: {completed.stderr.strip()}")
+                time.sleep(self.poll_interval)
+                continue
+            failures = 0
+            active = {line.split("_")[0] for line in completed.stdout.split()}
+            job_ids = [job_id for job_id in job_ids if job_id in active]
+            if job_ids:
+                time.sleep(self.poll_interval)
+
+    def run(self, bundles, timeout):
+        """ Submits all bundles, waits for their completion and merges their reports into the campaign reframe_report.json.
+        Reports of jobs that did not write them (e.g. cancelled or timed out jobs) are recorded in missing_reports."""
+        self.wait([self.submit(script) for script in self.prepare(bundles, timeout)])
+        filepaths = [filepath for bundle in bundles for filepath in self.reportFilepaths(bundle)]
+        self.missing_reports = [filepath for filepath in filepaths if not os.path.exists(filepath)]
+        return self.mergeReports(filepaths, os.path.join(self.report_folder_path, "reframe_report.json"))
+
+    def exitCode(self, merged):
+        """ Exit code of the bundled campaign, as returned by ReFrame for a single run: 1 if test cases failed or aborted, or if a job did not write its report
+        Args:
+            merged (dict): Merged report returned by run
+        """
+        if merged is None or self.missing_reports:
+            return 1
+        session_info = merged.get("session_info", {})
+        return int(bool(session_info.get("num_failures", 0) or session_info.get("num_aborted", 0)))
+
+    @staticmethod
+    def mergeReports(filepaths, output_filepath):
+        """ Merges ReFrame reports: test cases of each run are concatenated and counters are summed.
+        Missing reports (e.g. bundles that could not start) are ignored, and nothing is written if no report exists.
+        Returns:
+            dict: The merged report, or None
+        """
+        counters = ["num_cases","num_failures","num_aborted","num_skipped"]
+        merged = None
+        for filepath in filepaths:
+            if not os.path.exists(filepath):
+                continue
+            with open(filepath, "r") as f:
+                report = json.load(f)
+            if merged is None:
+                merged = report
+                continue
+
+            session_info = merged.setdefault("session_info", {})
+            for key in counters:
+                if key in report.get("session_info", {}):
+                    session_info[key] = session_info.get(key, 0) + report["session_info"][key]
+            if report.get("session_info", {}).get("time_end", "") > session_info.get("time_end", ""):
+                session_info["time_end"] = report["session_info"]["time_end"]
+
+            for i, run in enumerate(report.get("runs", [])):
+                if i >= len(merged["runs"]):
+                    merged["runs"].append(run)
+                    continue
+                for key in counters:
+                    if key in run:
+                        merged["runs"][i][key] = merged["runs"][i].get(key, 0) + run[key]
+                merged["runs"][i]["testcases"] += run.get("testcases", [])
+
+        if merged is not None:
+            with open(output_filepath, "w") as f:
+                json.dump(merged, f)
+        return merged
+
+    @staticmethod
+    def stepOptions(test):
+        """ Launcher options confining a test case to its own share of the bundle allocation"""
+        options = [f"--nodes={test.num_nodes}", f"--ntasks={test.num_tasks}", "--exact"]
+        if test.num_tasks_per_node:
+            options.append(f"--ntasks-per-node={test.num_tasks_per_node}")
+        if test.num_cpus_per_task:
+            options.append(f"--cpus-per-task={test.num_cpus_per_task}")
+        return options
+
+
+class JobArrayRunner(BundleRunner):
+    """ Submits job arrays and merges their ReFrame reports.
+    Each array task runs ReFrame on the test case of its index, with the local scheduler, so its output is written to the test case stage directory.
+    """
+    bundle_mode = "array"
+
+    def maxJobs(self):
+        return 1
+
+    def directives(self, bundle):
+        array = f"0-{len(bundle.combinations)-1}" + (f"%{bundle.max_concurrent}" if bundle.max_concurrent else "")
+        return [
+            f"--job-name=feelpp_{bundle.name}",
+            f"--array={array}",
+            f"--nodes={bundle.allocation_nodes}",
+            f"--time={formatTimeout(bundle.time_limit)}",
+            f"--output={os.path.join(self.bundles_dir, bundle.name, 'task_%a.out')}",
+            "--exclusive"
+        ]
+
+    def reportFilename(self, bundle):
+        return "task_report_${SLURM_ARRAY_TASK_ID}.json"
+
+    def reportFilepaths(self, bundle):
+        return [os.path.join(self.bundles_dir, bundle.name, f"task_report_{i}.json") for i in range(len(bundle.combinations))]
@@ -1,15 +1,22 @@
-import os
+import os, pprint
 from datetime import datetime
 from pathlib import Path
 
 
 class CommandBuilder:
+    #Set by the orchestrator in the environment of each configuration it runs, so that concurrent configurations use distinct ReFrame prefixes and test case instances
+    config_key_env_var = "FEELPP_BENCHMARKING_CONFIG_KEY"
+
     def __init__(self, machine_config, parser):
         self.machine_config = machine_config
         self.parser = parser
-        self.current_date = datetime.now().strftime("%Y_%m_%dT%H_%M_%S")
+        self.updateDate()
         self.report_folder_path = None
 
+    def updateDate(self):
+        """ Updates the date used to name report folders (e.g. for a new campaign of the same benchmark)"""
+        self.current_date = datetime.now().strftime("%Y_%m_%dT%H_%M_%S")
+
     @staticmethod
     def getScriptRootDir():
         return Path(__file__).resolve().parent
@@ -20,14 +27,56 @@ class CommandBuilder:
     def buildRegressionTestFilePath(self):
         return f'{self.getScriptRootDir() / "regression.py"}'
 
+    @staticmethod
+    def writeSiteConfiguration(site_configuration,machine,output_filepath,**partition_updates):
+        """ Writes a copy of a ReFrame configuration, where fields of the partitions of a system are updated (e.g. scheduler="local", max_jobs=4)"""
+        for system in site_configuration["systems"]:
+            if system["name"] != machine:
+                continue
+            for partition in system["partitions"]:
+                partition.update(partition_updates)
+        with open(output_filepath,"w") as f:
+            f.write(f"site_configuration = {pprint.pformat(site_configuration)}\n")
+
+    @staticmethod
+    def buildReportBaseDir(machine_config,executable,use_case):
+        """ Directory containing all report folders of a benchmark on a machine"""
+        return os.path.join(machine_config.reports_base_dir,executable,use_case,machine_config.machine)
+
+    @staticmethod
+    def buildCacheDir(machine_config,executable,use_case):
+        """ Directory containing cached test case results of a benchmark on a machine"""
+        return os.path.join(machine_config.reports_base_dir,".cache",executable,use_case,machine_config.machine)
+
     def createReportFolder(self,executable,use_case):
-        folder_path = os.path.join(self.machine_config.reports_base_dir,executable,use_case,self.machine_config.machine,str(self.current_date))
-        if not os.path.exists(folder_path):
-            os.makedirs(folder_path)
+        """ Creates a new report folder named after the current date.
+        A suffix is added if the folder exists, e.g. for campaigns of the same benchmark started in the same second by concurrent processes."""
+        base_dir = self.buildReportBaseDir(self.machine_config,executable,use_case)
+        os.makedirs(base_dir,exist_ok=True)
+        folder_path = os.path.join(base_dir,str(self.current_date))
+        suffix = 0
+        while True:
+            try:
+                os.mkdir(folder_path)
+                break
+            except FileExistsError:
+                suffix += 1
+                folder_path = os.path.join(base_dir,f"{self.current_date}_{suffix}")
         self.report_folder_path = folder_path
 
         return str(self.report_folder_path)
 
+    @classmethod
+    def instanceName(cls,hashcode):
+        """ Name of a test case instance ({{instance}} placeholder), unique accross the configurations run concurrently by the orchestrator"""
+        config_key = os.environ.get(cls.config_key_env_var)
+        return f"{config_key}_{hashcode}" if config_key else str(hashcode)
+
+    def buildReframePrefix(self):
+        """ ReFrame prefix (stage and output directories), in a subdirectory of reframe_base_dir for configurations run by the orchestrator"""
+        config_key = os.environ.get(self.config_key_env_var)
+        return os.path.join(self.machine_config.reframe_base_dir,config_key) if config_key else self.machine_config.reframe_base_dir
+
     def buildExecutionMode(self):
         """Write the ReFrame execution flag depending on the parser arguments.
             Examples are --dry-run or -r
@@ -47,21 +96,31 @@ class CommandBuilder:
         return " ".join(options)
 
 
-    def buildCommand(self,timeout):
+    def buildCommand(self,timeout,config_filepath=None,system=None,environment=None,report_filepath=None):
+        """ Builds the ReFrame command
+        Args:
+            timeout (str): Job time limit
+            config_filepath (str): ReFrame configuration file. Defaults to the machine configuration file.
+            system (str): System (or system:partition) to run on. Defaults to the machine.
+            environment (str): If provided, only this programming environment is selected
+            report_filepath (str): ReFrame report file. Defaults to reframe_report.json inside the report folder.
+        """
         assert self.report_folder_path is not None, "Report folder path not set"
         cmd = [
             'reframe',
-            f'-C {self.buildConfigFilePath()}',
+            f'-C {config_filepath or self.buildConfigFilePath()}',
             f'-c {self.buildRegressionTestFilePath()}',
             f'-S report_dir_path={str(self.report_folder_path)}',
-            f'--system={self.machine_config.machine}',
+            f'--system={system or self.machine_config.machine}',
             f'--exec-policy={self.machine_config.execution_policy}',
-            f'--prefix={self.machine_config.reframe_base_dir}',
-            f'--report-file={str(os.path.join(self.report_folder_path,"reframe_report.json"))}',
+            f'--prefix={self.buildReframePrefix()}',
+            f'--report-file={report_filepath or str(os.path.join(self.report_folder_path,"reframe_report.json"))}',
             f"{self.buildJobOptions(timeout)}",
             f'--perflogdir=logs',
             f'{self.buildExecutionMode()}'
         ]
+        if environment:
+            cmd.insert(-1, f"-p '^{environment}$'")
         cmd = ' '.join(cmd)
         if self.parser.args.reframe_args:
             cmd += ' ' + self.parser.args.reframe_args
@@ -0,0 +1,123 @@
+import os, re, json, hashlib, pickle, tempfile, warnings
+
+
+class ConfigCache:
+    """ Persistent cache of validated configurations, shared by the launcher and every ReFrame process.
+    Entries contain the state of a ConfigReader (validated and resolved config) pickled after a successful validation.
+    They are keyed by a hash of everything that can change the resolved config: the content of the configuration files,
+    the environment variables they refer to, the dry-run mode, the resolved configs of additional readers and the source code of the package.
+    Checks of the filesystem done by validators (e.g. existence of images or directories) are only done when an entry is created.
+    """
+    dir_env_var = "FEELPP_BENCHMARKING_CONFIG_CACHE_DIR"
+    disable_env_var = "FEELPP_BENCHMARKING_NO_CONFIG_CACHE"
+    env_var_pattern = re.compile(r'\$\{?(\w+)\}?')
+
+    def __init__(self, cache_dir, max_entries=256):
+        """
+        Args:
+            cache_dir (str): Directory containing the cache entries
+            max_entries (int): Maximum number of entries. Least recently written entries are removed first.
+        """
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+
+    @classmethod
+    def fromEnvironment(cls):
+        """ Cache located in FEELPP_BENCHMARKING_CONFIG_CACHE_DIR (defaults to $XDG_CACHE_HOME/feelpp-benchmarking/configs).
+        Returns None if FEELPP_BENCHMARKING_NO_CONFIG_CACHE is set."""
+        if os.environ.get(cls.disable_env_var):
+            return None
+        cache_dir = os.environ.get(cls.dir_env_var) or os.path.join(
+            os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+            "feelpp-benchmarking", "configs"
+        )
+        return cls(cache_dir)
+
+    @staticmethod
+    def sourceFingerprint():
+        """ Size and modification time of the source files of the package, so that entries are invalidated when schemas change"""
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        fingerprint = []
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = sorted(d for d in dirnames if d not in ("__pycache__", "tests"))
+            for filename in sorted(filenames):
+                if filename.endswith(".py"):
+                    stat = os.stat(os.path.join(dirpath, filename))
+                    fingerprint.append([os.path.relpath(os.path.join(dirpath, filename), root), stat.st_size, stat.st_mtime_ns])
+        return fingerprint
+
+    @classmethod
+    def key(cls, config_paths, schema, name, dry_run, additional_keys=[]):
+        """ Hash of the inputs of a ConfigReader
+        Args:
+            config_paths (list[dict[str,str]]): Prefixed configuration filepaths, as prepared by the ConfigReader
+            schema (cls): Pydantic schema of the configuration
+            name (str): Name of the reader
+            dry_run (bool): Dry-run mode
+            additional_keys (list[str]): Keys of the additional readers whose config is used to resolve placeholders
+        Returns:
+            str: The key, None if a configuration file does not exist
+        """
+        files = []
+        env_vars = set()
+        for config in config_paths:
+            for prefix, config_path in config.items():
+                if not os.path.isfile(config_path):
+                    return None
+                with open(config_path, "rb") as f:
+                    content = f.read()
+                files.append([prefix, os.path.abspath(config_path), hashlib.sha256(content).hexdigest()])
+                env_vars.update(cls.env_var_pattern.findall(content.decode(errors="replace")))
+
+        return hashlib.sha256(json.dumps([
+            files,
+            { var: os.environ.get(var) for var in sorted(env_vars) },
+            f"{schema.__module__}.{schema.__qualname__}", name, dry_run,
+            additional_keys, os.getcwd(), cls.sourceFingerprint()
+        ], default=str).encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pickle")
+
+    def load(self, key):
+        """ Returns the cached state of a ConfigReader, None if it is not cached or cannot be read"""
+        if not key:
+            return None
+        try:
+            with open(self.path(key), "rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            warnings.warn(f"Ignoring invalid config cache entry {self.path(key)}: {e}")
+            return None
+
+    def store(self, key, state):
+        """ Writes the state of a ConfigReader atomically, so that concurrent processes never read partial entries.
+        Failures (e.g. read-only home directory) are ignored, as the cache is only an optimization."""
+        if not key:
+            return
+        try:
+            os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, self.path(key))
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            self.prune()
+        except (OSError, pickle.PicklingError, AttributeError, TypeError) as e:
+            warnings.warn(f"Cannot write config cache entry {self.path(key)}: {e}")
+
+    def prune(self):
+        entries = [os.path.join(self.cache_dir, f) for f in os.listdir(self.cache_dir) if f.endswith(".pickle")]
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=lambda f: os.stat(f).st_mtime_ns)
+        for entry in entries[:len(entries) - self.max_entries]:
+            try:
+                os.remove(entry)
+            except FileNotFoundError:
+                pass
@@ -1,4 +1,5 @@
 import json, os, re, shutil
+from copy import deepcopy
 from pydantic import BaseModel
 from feelpp.benchmarking.jsonWithComments import JSONWithCommentsDecoder
 
@@ -72,6 +73,80 @@ class TemplateProcessor:
             return self.replacePlaceholders(target,flattened_source)
         return target
 
+
+class TemplateIndex:
+    """ Dependency graph of the placeholders of a configuration, compiled once from its dumped values.
+    It maps each placeholder name to the paths of the string fields using it, so that an update only re-resolves the fields affected by the replaced keys.
+    Fields with nested placeholders (e.g. {{a.{{b}}}}) or environment variables depend on any key, and are always re-resolved.
+    """
+    def __init__(self, data, template_pattern):
+        self.template_pattern = template_pattern
+        self.dependencies = {}
+        self.dynamic = set()
+        self.fields = {}
+        for path, value in self.stringFields(data):
+            self.add(path, value)
+
+    @staticmethod
+    def stringFields(data, path=()):
+        """ Yields (path, value) for every string of a nested dict/list structure"""
+        items = data.items() if isinstance(data, dict) else enumerate(data) if isinstance(data, list) else []
+        for key, value in items:
+            if isinstance(value, str):
+                yield path + (key,), value
+            elif isinstance(value, (dict, list)):
+                yield from TemplateIndex.stringFields(value, path + (key,))
+
+    @staticmethod
+    def get(data, path):
+        for key in path:
+            data = data[key]
+        return data
+
+    @staticmethod
+    def set(data, path, value):
+        """ Returns a copy of data where the value at path is replaced. Only the containers along the path are copied."""
+        if not path:
+            return value
+        data = dict(data) if isinstance(data, dict) else list(data)
+        data[path[0]] = TemplateIndex.set(data[path[0]], path[1:], value)
+        return data
+
+    def add(self, path, value):
+        names = set()
+        if "{{" in value:
+            names = {name.strip() for name in self.template_pattern.findall(value)}
+            if "{{" in self.template_pattern.sub("", value):
+                self.dynamic.add(path)
+        if "$" in value:
+            self.dynamic.add(path)
+        for name in names:
+            self.dependencies.setdefault(name, set()).add(path)
+        if names or path in self.dynamic:
+            self.fields[path] = names
+
+    def remove(self, path):
+        for name in self.fields.pop(path, ()):
+            self.dependencies[name].discard(path)
+            if not self.dependencies[name]:
+                del self.dependencies[name]
+        self.dynamic.discard(path)
+
+    def affected(self, flattened_source=None):
+        """ Paths of the fields to re-resolve when replacing the keys of flattened_source. All fields if flattened_source is None."""
+        if flattened_source is None:
+            return set(self.fields)
+        paths = set(self.dynamic)
+        names = self.dependencies.keys() if len(self.dependencies) < len(flattened_source) else flattened_source.keys()
+        for name in names:
+            if name in flattened_source and name in self.dependencies:
+                paths |= self.dependencies[name]
+        return paths
+
+    def __repr__(self):
+        return f"TemplateIndex(placeholders={sorted(self.dependencies)}, dynamic={len(self.dynamic)})"
+
+
 class FileHandler:
     @staticmethod
     def copyResource(src,dest_dirpath,rename=None):
@@ -109,21 +184,41 @@ class FileHandler:
 
 class ConfigReader:
     """ Class to load config files"""
-    def __init__(self, config_paths, schema, name, dry_run=False, additional_readers = []):
+    def __init__(self, config_paths, schema, name, dry_run=False, additional_readers = [], cache = None):
         """
         Args:
             config_paths (str | list[str] | list[dict[str,str]]) : Path to the config JSON file. If a list is provided, files will be merged. If a list of dict is provided, files will be prefixed by the key in the schema
+            cache (ConfigCache) : Persistent cache of validated configurations. If provided, the config is only loaded, validated and resolved if it is not cached.
         """
         self.schema = schema
         self.context = { "dry_run":dry_run }
+        self.name = name
+        self.cache_key = None
+        cache_key = None
+        if cache and config_paths:
+            cache_key = cache.key(
+                self.prepareConfigs(config_paths), schema, name, dry_run,
+                [additional_reader.cache_key or json.dumps(additional_reader.config.model_dump(), default=str) for additional_reader in additional_readers]
+            )
+            cached = cache.load(cache_key)
+            if cached is not None:
+                self.__dict__.update(cached)
+                #Time-dependent defaults (e.g. the report datetime) are not restored from the cache
+                if hasattr(self.config, "refreshDefaults") and self.config.refreshDefaults(self.original_config):
+                    self.values = self.config.model_dump()
+                return
+
         if config_paths:
             self.config = self.load( self.prepareConfigs(config_paths), schema )
-        self.name = name
         self.original_config = self.config.model_copy()
         self.processor = TemplateProcessor()
+        self.compileTemplates()
         for additional_reader in additional_readers:
             self.updateConfig(TemplateProcessor.flattenDict(additional_reader.config,additional_reader.name))
         self.updateConfig()
+        if cache_key:
+            self.cache_key = cache_key
+            cache.store(cache_key, self.__dict__)
 
     def prepareConfigs(self,config_paths):
         if isinstance(config_paths, str):
@@ -163,21 +258,47 @@ class ConfigReader:
 
         return self.config
 
+    def compileTemplates(self):
+        """ Dumps the config once and indexes its placeholders. Updates are then applied to the dumped values and validated from them."""
+        self.values = self.config.model_dump()
+        self.templates = TemplateIndex(self.values, self.processor.template_pattern)
+
     def updateConfig(self, flattened_replace = None):
-        """ Recursively replace all placeholders {{}} on the config.
+        """ Replace the placeholders {{}} on the config.
+        Only the fields using the replaced keys are re-resolved, and the config is not validated again if no field changed.
         Args:
             flattened_replace: (dict) Containing all key, pair values that indicate the paths to replace. e.g { "replace.this.path": "with_this_value" }
                 If not provided, placeholders will be changed with own confing
         """
         if not flattened_replace:
             flattened_replace = TemplateProcessor.flattenDict(self.config.model_dump())
-        self.config = self.schema.model_validate(self.processor.recursiveReplace(self.config.model_dump(),flattened_replace), context=self.context)
+            paths = self.templates.affected()
+        else:
+            paths = self.templates.affected(flattened_replace)
+
+        changed = False
+        for path in paths:
+            value = TemplateIndex.get(self.values, path)
+            resolved = self.processor.replacePlaceholders(value, flattened_replace)
+            if resolved == value:
+                continue
+            changed = True
+            self.values = TemplateIndex.set(self.values, path, resolved)
+            self.templates.remove(path)
+            self.templates.add(path, resolved)
+
+        if changed:
+            #Validators may modify their input in place (e.g. default plots), so the dumped values are kept untouched
+            self.config = self.schema.model_validate(deepcopy(self.values), context=self.context)
+            #The config no longer corresponds to its cache entry
+            self.cache_key = None
 
     def __repr__(self):
         return json.dumps(self.config.dict(), indent=4)
 
     def resetConfig(self, additional_readers = []):
         self.config = self.original_config.model_copy()
+        self.compileTemplates()
         for additional_reader in additional_readers:
             self.updateConfig(TemplateProcessor.flattenDict(additional_reader.config,additional_reader.name))
         self.updateConfig()
\ No newline at end of file
@@ -0,0 +1,228 @@
+import ast, re
+import numpy as np
+
+
+def _concatenate(*values):
+    """ Flattens and concatenates scalars and arrays into a single float array"""
+    return np.concatenate([np.atleast_1d(np.asarray(v,dtype=float)).ravel() for v in values])
+
+REDUCTIONS = {
+    "sum": np.sum,
+    "min": np.min,
+    "max": np.max,
+    "mean": np.mean,
+    "std": np.std,
+    "median": np.median,
+    "argmax": np.argmax,
+    "argmin": np.argmin,
+    "imbalance": lambda v: np.max(v) / np.mean(v)
+}
+
+ELEMENTWISE = {
+    "abs": np.abs,
+    "sqrt": np.sqrt,
+    "log": np.log,
+    "exp": np.exp
+}
+
+def aggregate(op, values, q=None):
+    """ Reduces a list of values (or arrays) using a statistical operator
+    Args:
+        op (str): Name of the reduction (sum, min, max, mean, std, median, argmax, argmin, imbalance, percentile)
+        values (list): Values to reduce. Arrays are flattened and concatenated
+        q (float): Percentile to compute, only used if op == "percentile"
+    """
+    if op == "percentile":
+        return np.percentile(_concatenate(*values), q)
+    if op not in REDUCTIONS:
+        raise NotImplementedError(f"Operation {op} is not implemented")
+    return REDUCTIONS[op](_concatenate(*values))
+
+
+class CustomExpression:
+    """ Arithmetic expression over performance variables, parsed once and evaluated on NumPy arrays.
+    Variables are referenced by name, or between braces if the name is not a valid identifier (e.g. {stage_gaya2.total}).
+    Supported: numbers, + - * / // % **, and the functions in REDUCTIONS, ELEMENTWISE and percentile(values,q).
+    """
+    _quoted_name = re.compile(r"\{([^{}]+)\}")
+    _binary_operators = {
+        ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.true_divide,
+        ast.FloorDiv: np.floor_divide, ast.Mod: np.mod, ast.Pow: np.power
+    }
+    _unary_operators = { ast.USub: np.negative, ast.UAdd: np.positive }
+
+    def __init__(self, expression, tree, names):
+        """
+        Args:
+            expression (str): Original expression, for error messages
+            tree (ast.AST): Parsed expression
+            names (dict[str,str]): Mapping from generated identifiers to quoted variable names
+        """
+        self.expression = expression
+        self.tree = tree
+        self.names = names
+        self.references = []
+        self._check(self.tree)
+
+    @classmethod
+    def parse(cls, expression):
+        names = {}
+        def quote(match):
+            identifier = f"__var{len(names)}__"
+            names[identifier] = match.group(1).strip()
+            return identifier
+        try:
+            tree = ast.parse(cls._quoted_name.sub(quote, expression).strip(), mode="eval").body
+        except SyntaxError as e:
+            raise ValueError(f"Invalid expression {expression} : {e.msg}")
+        return cls(expression, tree, names)
+
+    @classmethod
+    def fromAggregation(cls, op, columns, q=None):
+        """ Builds the expression equivalent to op(column_1, ..., column_n)"""
+        names = {f"__var{i}__": column for i,column in enumerate(columns)}
+        args = [ast.Name(id=identifier, ctx=ast.Load()) for identifier in names]
+        if op == "percentile":
+            tree = ast.Call(func=ast.Name(id="percentile", ctx=ast.Load()), args=[ast.List(elts=args, ctx=ast.Load()), ast.Constant(value=q)], keywords=[])
+        else:
+            tree = ast.Call(func=ast.Name(id=op, ctx=ast.Load()), args=args, keywords=[])
+        return cls(f"{op}({', '.join(columns)})", tree, names)
+
+    @classmethod
+    def fromConfig(cls, custom_variable):
+        if custom_variable.expression:
+            return cls.parse(custom_variable.expression)
+        return cls.fromAggregation(custom_variable.op, custom_variable.columns, custom_variable.q)
+
+    def _check(self, node):
+        """ Validates the expression nodes and collects the referenced variables"""
+        if isinstance(node, ast.Constant):
+            if not isinstance(node.value, (int, float)) or isinstance(node.value, bool):
+                raise ValueError(f"Invalid constant {node.value!r} in expression {self.expression}")
+        elif isinstance(node, ast.Name):
+            name = self.names.get(node.id, node.id)
+            if name not in self.references:
+                self.references.append(name)
+        elif isinstance(node, ast.List):
+            for element in node.elts:
+                self._check(element)
+        elif isinstance(node, ast.BinOp) and type(node.op) in self._binary_operators:
+            self._check(node.left)
+            self._check(node.right)
+        elif isinstance(node, ast.UnaryOp) and type(node.op) in self._unary_operators:
+            self._check(node.operand)
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+            function = node.func.id
+            if function == "percentile":
+                if len(node.args) != 2:
+                    raise ValueError(f"percentile expects 2 arguments (values, q) in expression {self.expression}")
+            elif function in ELEMENTWISE:
+                if len(node.args) != 1:
+                    raise ValueError(f"{function} expects a single argument in expression {self.expression}")
+            elif function not in REDUCTIONS:
+                raise ValueError(f"Unknown function {function} in expression {self.expression}")
+            if not node.args:
+                raise ValueError(f"{function} expects at least one argument in expression {self.expression}")
+            for arg in node.args:
+                self._check(arg)
+        else:
+            raise ValueError(f"Unsupported syntax {ast.dump(node)} in expression {self.expression}")
+
+    def evaluate(self, resolve):
+        """ Evaluates the expression
+        Args:
+            resolve (callable): Function returning the values (array) of a variable from its name
+        Returns:
+            np.ndarray: 1D array of results
+        """
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.atleast_1d(self._evaluate(self.tree, resolve))
+
+    def _evaluate(self, node, resolve):
+        if isinstance(node, ast.Constant):
+            return float(node.value)
+        if isinstance(node, ast.Name):
+            return resolve(self.names.get(node.id, node.id))
+        if isinstance(node, ast.List):
+            return _concatenate(*[self._evaluate(element, resolve) for element in node.elts])
+        if isinstance(node, ast.BinOp):
+            left, right = self._evaluate(node.left, resolve), self._evaluate(node.right, resolve)
+            try:
+                return self._binary_operators[type(node.op)](left, right)
+            except ValueError as e:
+                raise ValueError(f"Incompatible operand shapes in expression {self.expression} : {e}")
+        if isinstance(node, ast.UnaryOp):
+            return self._unary_operators[type(node.op)](self._evaluate(node.operand, resolve))
+
+        function = node.func.id
+        args = [self._evaluate(arg, resolve) for arg in node.args]
+        if function == "percentile":
+            return aggregate("percentile", [args[0]], q=float(np.asarray(args[1]).ravel()[0]))
+        if function in ELEMENTWISE:
+            return ELEMENTWISE[function](np.asarray(args[0], dtype=float))
+        return aggregate(function, args)
+
+
+class CustomVariableGraph:
+    """ Custom performance variables resolved as a dependency graph, and evaluated in topological order.
+    A reference that is not an existing variable is expanded to the multi-row group {name}_0, {name}_1, ... if it exists.
+    """
+    _line_suffix = re.compile(r"^(.*)_(\d+)$")
+
+    def __init__(self, custom_variables):
+        self.custom_variables = custom_variables
+        self.expressions = { custom_var.name: CustomExpression.fromConfig(custom_var) for custom_var in custom_variables }
+        self.order = self.sort()
+
+    def sort(self):
+        """ Topologically sorts custom variables, keeping the declaration order between independent ones"""
+        dependencies = {
+            name: [ref for ref in expression.references if ref in self.expressions and ref != name]
+            for name, expression in self.expressions.items()
+        }
+        order = []
+        remaining = list(self.expressions.keys())
+        while remaining:
+            ready = [name for name in remaining if all(dep in order for dep in dependencies[name])]
+            if not ready:
+                raise ValueError(f"Cyclic dependency between custom variables : {remaining}")
+            order += ready
+            remaining = [name for name in remaining if name not in ready]
+        return order
+
+    @classmethod
+    def buildGroups(cls, names):
+        """ Indexes multi-row variables ({name}_{line}) by name, ordered by line"""
+        groups = {}
+        for name in names:
+            match = cls._line_suffix.match(name)
+            if match:
+                groups.setdefault(match.group(1), []).append((int(match.group(2)), name))
+        return { base: [name for _, name in sorted(lines)] for base, lines in groups.items() }
+
+    def evaluate(self, perfvars):
+        """ Evaluates all custom variables in one pass
+        Args:
+            perfvars (dict): Existing performance variables, either values or deferred expressions (with an evaluate method)
+        Returns:
+            dict[str,np.ndarray]: Values of each custom variable
+        """
+        groups = self.buildGroups(perfvars.keys())
+        computed = {}
+
+        def value(name):
+            v = perfvars[name]
+            return v.evaluate() if hasattr(v, "evaluate") else v
+
+        def resolve(name):
+            if name in computed:
+                return computed[name]
+            if name in perfvars:
+                return np.atleast_1d(np.asarray(value(name), dtype=float))
+            if name in groups:
+                return np.array([value(line) for line in groups[name]], dtype=float)
+            raise ValueError(f"Custom variable not found : {name}")
+
+        for name in self.order:
+            computed[name] = self.expressions[name].evaluate(resolve)
+        return computed
@@ -0,0 +1,277 @@
+import os, json, glob, runpy
+import numpy as np
+from copy import deepcopy
+from types import SimpleNamespace
+from tabulate import tabulate
+from feelpp.benchmarking.reframe.resources import ResourceHandler
+
+
+def parseTimeout(timeout):
+    """ Converts a <days>-<hours>:<minutes>:<seconds> string to seconds"""
+    days, time = timeout.split("-")
+    hours, minutes, seconds = time.split(":")
+    return ((int(days)*24 + int(hours))*60 + int(minutes))*60 + int(seconds)
+
+def formatTimeout(seconds):
+    """ Converts seconds to a <days>-<hours>:<minutes>:<seconds> string"""
+    seconds = int(np.ceil(seconds))
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    days, hours = divmod(hours, 24)
+    return f"{days}-{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+def flattenParams(params, prefix=""):
+    """ Flattens nested parameter values, using the '.' separator (e.g. {"resources":{"tasks":1}} -> {"resources.tasks":1})"""
+    flat = {}
+    for name, value in params.items():
+        if isinstance(value, dict):
+            flat.update(flattenParams(value, f"{prefix}{name}."))
+        else:
+            flat[f"{prefix}{name}"] = value
+    return flat
+
+
+class EstimatedTest:
+    """ Minimal stand-in for a ReFrame test, holding the attributes set by the ResourceHandler"""
+    def __init__(self, partition):
+        self.current_partition = partition
+        self.job = SimpleNamespace(options=[], launcher=SimpleNamespace(options=[]))
+        self.num_tasks = None
+        self.num_tasks_per_node = None
+        self.num_nodes = None
+        self.num_gpus_per_node = None
+        self.num_cpus_per_task = None
+        self.exclusive_access = None
+        self.env_vars = {}
+
+
+class HistoryModel:
+    """ Predicts test wall times from previous ReFrame reports of the same benchmark.
+    Tests with the same parameters (and partition) use the mean of the measured times. Other tests use a power law regression
+    on numerical parameters and number of tasks (log(t) = c + sum_j b_j*log(x_j)), fitted on the runs sharing the same non-numerical parameter values.
+    """
+    def __init__(self, history_dir):
+        self.records = []
+        if history_dir and os.path.exists(history_dir):
+            filepaths = [history_dir] if os.path.isfile(history_dir) else glob.glob(os.path.join(history_dir,"**","reframe_report.json"), recursive=True)
+            for filepath in filepaths:
+                self.read(filepath)
+
+    #Whether the number of tasks is a feature of the model
+    include_tasks = True
+
+    def extract(self, testcase):
+        """ Quantity to predict (wall time), from a test case of a report. None if not measured."""
+        return testcase.get("time_run") or testcase.get("time_total")
+
+    def read(self, filepath):
+        with open(filepath,"r") as f:
+            report = json.load(f)
+        for run in report.get("runs",[]):
+            for testcase in run.get("testcases",[]):
+                value = self.extract(testcase)
+                if not value or testcase.get("result") not in ("pass","fail"):
+                    continue
+                params = flattenParams(testcase.get("check_params") or {})
+                if self.include_tasks and testcase.get("num_tasks"):
+                    params["num_tasks"] = testcase["num_tasks"]
+                self.records.append((testcase.get("partition"), params, float(value)))
+
+    @staticmethod
+    def isNumber(value):
+        return isinstance(value,(int,float)) and not isinstance(value,bool) and value > 0
+
+    def predict(self, partition, params):
+        """ Predicts the wall time of a test
+        Args:
+            partition (str): Partition name
+            params (dict): Flattened parameter values, including num_tasks
+        Returns:
+            tuple[float,str]: Predicted time in seconds (None if there is no history), and the prediction method (exact, regression or none)
+        """
+        records = [r for r in self.records if r[0] == partition] or self.records
+
+        exact = [time for _, p, time in records if p == params]
+        if exact:
+            return float(np.mean(exact)), "exact"
+
+        categorical = {k: v for k, v in params.items() if not self.isNumber(v)}
+        matching = [r for r in records if all(r[1].get(k) == v for k, v in categorical.items())] or records
+        if not matching:
+            return None, "none"
+
+        numerical = [
+            k for k, v in params.items()
+            if self.isNumber(v) and all(self.isNumber(r[1].get(k)) for r in matching) and len({r[1][k] for r in matching}) > 1
+        ]
+        y = np.log([time for _, _, time in matching])
+        X = np.column_stack([np.ones(len(matching))] + [np.log([float(r[1][k]) for r in matching]) for k in numerical])
+        coefficients = np.linalg.lstsq(X, y, rcond=None)[0]
+        x = np.concatenate([[1.0], np.log([float(params[k]) for k in numerical])])
+        return float(np.exp(x @ coefficients)), "regression"
+
+    def timeLimit(self, partition, params, default, safety_factor=1.5, floor=300, ceiling=None):
+        """ Computes the time limit of a test from its predicted wall time
+        Args:
+            partition (str): Partition name
+            params (dict): Flattened parameter values, including num_tasks
+            default (int): Time limit (seconds) used when there is no history
+            safety_factor (float): Factor applied to the predicted time
+            floor (int): Minimum time limit (seconds)
+            ceiling (int): Maximum time limit (seconds). Not bounded if None.
+        Returns:
+            int: Time limit in seconds, rounded up to the minute
+        """
+        time, _ = self.predict(partition, params)
+        if time is None:
+            return default
+        time_limit = max(int(np.ceil(time * safety_factor / 60) * 60), floor)
+        return min(time_limit, ceiling) if ceiling else time_limit
+
+
+class MemoryModel(HistoryModel):
+    """ Predicts the total memory (Gb) used by tests, from the peak memory per node recorded in previous ReFrame reports (memory_peak field).
+    Tests with the same parameters use the mean measured memory, other tests use a power law regression on numerical parameters (e.g. the problem size).
+    """
+    include_tasks = False
+
+    def extract(self, testcase):
+        return sum((testcase.get("memory_peak") or {}).values()) or None
+
+    def requirement(self, partition, params, default, headroom=1.2):
+        """ Computes the memory requirement of a test
+        Args:
+            partition (str): Partition name
+            params (dict): Flattened parameter values
+            default (int): Memory requirement (Gb) used when there is no history
+            headroom (float): Factor applied to the predicted memory
+        Returns:
+            int: Memory requirement in Gb, rounded up
+        """
+        memory, _ = self.predict(partition, params)
+        if memory is None:
+            return default
+        return int(np.ceil(memory * headroom))
+
+
+class CostEstimator:
+    """ Estimates the cost of a benchmark campaign without running ReFrame.
+    The parameter space is expanded, resources are resolved for each test, and wall times are predicted from the benchmark history.
+    """
+    def __init__(self, app_reader, machine_reader, parameter_handler, rfm_config_path, history_dir, safety_factor=1.5):
+        """
+        Args:
+            app_reader (ConfigReader): Benchmark configuration reader
+            machine_reader (ConfigReader): Machine configuration reader
+            parameter_handler (ParameterHandler): Handler of the benchmark parameters
+            rfm_config_path (str): Path of the ReFrame configuration file, containing partitions processors and extras
+            history_dir (str): Directory containing previous ReFrame reports of the benchmark
+            safety_factor (float): Factor applied to predicted times to compute timeouts
+        """
+        self.app_reader = app_reader
+        self.machine_reader = machine_reader
+        self.parameter_handler = parameter_handler
+        self.partitions = self.loadPartitions(rfm_config_path, machine_reader.config.machine)
+        self.model = HistoryModel(history_dir)
+        self.safety_factor = safety_factor
+
+    @staticmethod
+    def loadPartitions(rfm_config_path, machine):
+        """ Reads the partitions of a system from a ReFrame configuration file"""
+        site_configuration = runpy.run_path(rfm_config_path)["site_configuration"]
+        system = next((s for s in site_configuration["systems"] if s["name"] == machine), None)
+        if system is None:
+            raise ValueError(f"System {machine} not found in {rfm_config_path}")
+        return {
+            partition["name"]: SimpleNamespace(
+                fullname = f"{machine}:{partition['name']}",
+                processor = SimpleNamespace(
+                    num_cpus = partition.get("processor",{}).get("num_cpus",1),
+                    num_sockets = partition.get("processor",{}).get("num_sockets"),
+                    num_numa_nodes = len(partition.get("processor",{}).get("topology",{}).get("numa_nodes",[])) or None
+                ),
+                extras = partition.get("extras",{})
+            )
+            for partition in system["partitions"]
+        }
+
+    def environments(self, partition):
+        if self.machine_reader.config.environment_map:
+            return self.machine_reader.config.environment_map.get(partition,[])
+        return self.machine_reader.config.prog_environments
+
+    def expandTests(self):
+        """ Resolves the resources of every test of the campaign
+        Yields:
+            dict: combination, partition, number of environments, flattened parameters, resources and configured timeout of each test
+        """
+        for combination in self.parameter_handler.combinations():
+            app_reader = deepcopy(self.app_reader)
+            placeholders = self.parameter_handler.buildPlaceholders(combination)
+            if placeholders:
+                app_reader.updateConfig(placeholders)
+            for partition_name in self.machine_reader.config.partitions:
+                n_environments = len(self.environments(partition_name))
+                if not n_environments:
+                    continue
+                test = ResourceHandler.setResources(app_reader.config.resources, EstimatedTest(self.partitions[partition_name]))
+                yield {
+                    "combination": combination,
+                    "partition": partition_name,
+                    "environments": n_environments,
+                    "params": flattenParams(combination),
+                    "num_nodes": test.num_nodes,
+                    "num_tasks": test.num_tasks,
+                    "num_tasks_per_node": test.num_tasks_per_node,
+                    "num_cpus_per_task": test.num_cpus_per_task,
+                    "timeout": parseTimeout(app_reader.config.timeout)
+                }
+
+    def estimate(self):
+        """ Predicts the wall time, node hours and timeout of every test
+        Returns:
+            list[dict]: Tests with their prediction. Tests without history fall back to their configured timeout.
+        """
+        policy = self.app_reader.config.timeout_policy
+        estimates = []
+        for test in self.expandTests():
+            params = dict(test["params"], num_tasks=test["num_tasks"])
+            time, method = self.model.predict(test["partition"], params)
+            if policy:
+                suggested_timeout = self.model.timeLimit(
+                    test["partition"], params, test["timeout"], policy.safety_factor, parseTimeout(policy.floor),
+                    parseTimeout(policy.ceiling) if policy.ceiling else None
+                )
+            else:
+                suggested_timeout = self.model.timeLimit(test["partition"], params, test["timeout"], self.safety_factor)
+            if time is None:
+                time = test["timeout"]
+            test.update(
+                time = time,
+                method = method,
+                node_hours = test["num_nodes"] * time * test["environments"] / 3600,
+                suggested_timeout = suggested_timeout
+            )
+            estimates.append(test)
+        return estimates
+
+    def summary(self, estimates):
+        if not estimates:
+            return "No tests to run"
+        longest = max(estimates, key=lambda e: e["time"])
+        rows = [
+            [
+                e["partition"], ", ".join(f"{k}={v}" for k, v in e["params"].items()), e["num_nodes"], e["num_tasks"], e["environments"],
+                f"{e['time']:.1f}", e["method"], f"{e['node_hours']:.3f}", formatTimeout(e["suggested_timeout"])
+            ]
+            for e in estimates
+        ]
+        table = tabulate(rows, headers=["partition","parameters","nodes","tasks","environments","predicted time (s)","prediction","node hours","timeout"])
+        return "\n".join([
+            table,
+            "",
+            f"Tests : {sum(e['environments'] for e in estimates)}",
+            f"Predicted node hours : {sum(e['node_hours'] for e in estimates):.3f}",
+            f"Longest job : {longest['time']:.1f}s ({longest['partition']} : {', '.join(f'{k}={v}' for k, v in longest['params'].items())})",
+            f"Suggested timeout : {formatTimeout(max(e['suggested_timeout'] for e in estimates))} (configured : {self.app_reader.config.timeout})"
+        ])
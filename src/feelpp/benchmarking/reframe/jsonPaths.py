@@ -0,0 +1,156 @@
+import json, re
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+
+class JsonPathPlan:
+    """ Extraction plan compiled from a variables_path expression (e.g. "hardware.*.mem.*.host").
+    The expression is split once into a sequence of keys, wildcards being represented by None.
+    Extracted variables are named after the keys matched by wildcards, joined by '.', or after the last key if the expression has no wildcard.
+    """
+    def __init__(self, expression):
+        self.expression = expression
+        self.steps = [None if token == "*" else token for token in re.split(r"(\*)|\.", expression) if token]
+        self.has_wildcard = None in self.steps
+
+    def __repr__(self):
+        return f"JsonPathPlan({self.expression!r})"
+
+    def variableName(self, bound_keys):
+        if self.has_wildcard:
+            return ".".join(bound_keys)
+        return self.steps[-1] if self.steps else ""
+
+    def accepts(self, depth, key):
+        """ Checks if the key can be followed at the given depth of the plan"""
+        return depth < len(self.steps) and self.steps[depth] in (None, key)
+
+    def walk(self, node, fields, depth=0, bound_keys=()):
+        """ Resolves the plan on a decoded JSON node, starting at the given depth.
+        Args:
+            node (dict|any): Decoded JSON content
+            fields (dict): Dictionary where extracted values are stored, by variable name
+            depth (int): Position in the plan steps corresponding to the node
+            bound_keys (tuple[str]): Keys already matched by wildcards
+        """
+        if depth == len(self.steps):
+            fields[self.variableName(bound_keys)] = node
+            return fields
+        step = self.steps[depth]
+        if step is None:
+            for key, child in node.items():
+                self.walk(child, fields, depth+1, bound_keys+(key,))
+        else:
+            self.walk(node[step], fields, depth+1, bound_keys)
+        return fields
+
+    def resolve(self, content):
+        """ Returns a {variable_name: value} dictionary from decoded JSON content"""
+        return self.walk(content, {})
+
+
+class JsonPlanStream:
+    """ Resolves several plans in a single incremental pass over a JSON file, using ijson events.
+    Only the subtrees selected by the plans are materialized, the rest of the document is skipped.
+    """
+    _opening = ("start_map","start_array")
+    _closing = ("end_map","end_array")
+
+    def __init__(self, plans):
+        self.plans = plans
+
+    def resolve(self, filepath):
+        """ Returns the list of {variable_name: value} dictionaries, one per plan"""
+        self.results = [{} for _ in self.plans]
+        with open(filepath,"rb") as f:
+            events = ijson.basic_parse(f, use_float=True)
+            event, value = next(events)
+            self._consume(events, event, value, (), list(range(len(self.plans))))
+        return self.results
+
+    def _skip(self, events, event):
+        if event not in self._opening:
+            return
+        depth = 1
+        for event, _ in events:
+            if event in self._opening:
+                depth += 1
+            elif event in self._closing:
+                depth -= 1
+                if depth == 0:
+                    return
+
+    def _build(self, events, event, value):
+        builder = ijson.common.ObjectBuilder()
+        builder.event(event, value)
+        if event in self._opening:
+            depth = 1
+            for event, value in events:
+                builder.event(event, value)
+                if event in self._opening:
+                    depth += 1
+                elif event in self._closing:
+                    depth -= 1
+                    if depth == 0:
+                        break
+        return builder.value
+
+    def _consume(self, events, event, value, path, active):
+        """ Consumes the JSON value starting with (event,value), located at path.
+        Args:
+            active (list[int]): Indices of the plans whose steps match the path
+        """
+        depth = len(path)
+        complete = [i for i in active if len(self.plans[i].steps) == depth]
+        descending = [i for i in active if len(self.plans[i].steps) > depth]
+
+        if complete:
+            node = self._build(events, event, value)
+            for i in complete:
+                self.results[i][self.plans[i].variableName(self._boundKeys(i,path))] = node
+            for i in descending:
+                self.plans[i].walk(node, self.results[i], depth, self._boundKeys(i,path))
+            return
+
+        if not descending:
+            self._skip(events, event)
+            return
+
+        if event != "start_map":
+            self._skip(events, event)
+            raise KeyError(f"Cannot follow {self.plans[descending[0]].expression} at {'.'.join(path)}: not an object")
+
+        seen = set()
+        for event, key in events:
+            if event == "end_map":
+                break
+            child_active = [i for i in descending if self.plans[i].accepts(depth, key)]
+            seen.add(key)
+            event, value = next(events)
+            self._consume(events, event, value, path+(key,), child_active)
+
+        for i in descending:
+            step = self.plans[i].steps[depth]
+            if step is not None and step not in seen:
+                raise KeyError(step)
+
+    def _boundKeys(self, i, path):
+        return tuple(key for step, key in zip(self.plans[i].steps, path) if step is None)
+
+
+def resolveJsonFile(filepath, plans):
+    """ Resolves a list of plans on a JSON file.
+    The file is parsed incrementally if ijson is installed, and fully decoded otherwise.
+    Returns:
+        list[dict]: One {variable_name: value} dictionary per plan
+    """
+    if not plans:
+        return []
+    if ijson is not None:
+        return JsonPlanStream(plans).resolve(filepath)
+    with open(filepath,"r") as f:
+        content = json.load(f)
+    return [plan.resolve(content) for plan in plans]
@@ -0,0 +1,44 @@
+import shlex
+
+
+class LauncherCommands:
+    """ Launcher-specific commands built from the ReFrame launcher of a job.
+    Commands run once per node (probes, staging) use the launcher syntax placing one task on each node: srun, and mpirun for Open MPI and Intel MPI.
+    Launchers that cannot place one task per node (e.g. local, generic mpirun or mpiexec) are only supported for single node jobs, where commands run directly in the job script.
+    """
+    per_node_options = {
+        "srun": lambda num_nodes: [f"--nodes={num_nodes}", f"--ntasks={num_nodes}", "--ntasks-per-node=1"],
+        "mpirun-openmpi": lambda num_nodes: ["--map-by", "ppr:1:node"],
+        "mpirun-intelmpi": lambda num_nodes: ["-ppn", "1"],
+    }
+
+    @staticmethod
+    def name(launcher):
+        """ Registered name of a ReFrame launcher (e.g. srun, mpiexec), None if unknown"""
+        return getattr(launcher, "registered_name", None)
+
+    @classmethod
+    def perNode(cls, launcher, job, num_nodes):
+        """ Launcher command running one task on each node of the job
+        Args:
+            launcher (JobLauncher): Launcher of the job
+            job (Job): ReFrame job, used for the base launcher command
+            num_nodes (int): Number of nodes of the job
+        Returns:
+            str: The launcher command, empty if the command should run directly in the job script (single node)
+        Raises:
+            ValueError: If the launcher cannot run a command on each node of a multi-node job
+        """
+        name = cls.name(launcher)
+        if name == "srun":
+            return " ".join([launcher.run_command(job)] + cls.per_node_options[name](num_nodes))
+        if name in cls.per_node_options:
+            return " ".join(["mpirun", "-np", str(num_nodes)] + cls.per_node_options[name](num_nodes))
+        if not num_nodes or num_nodes <= 1:
+            return ""
+        raise ValueError(f"Running a command on each node of a {num_nodes} nodes job is not supported with the {name} launcher. Supported launchers are {list(cls.per_node_options.keys())}")
+
+    @staticmethod
+    def shell(per_node_launcher, script):
+        """ Command running a shell script with a per-node launcher command (see perNode)"""
+        return " ".join(filter(None, [per_node_launcher, "sh -c", shlex.quote(script)]))
@@ -0,0 +1,47 @@
+import os
+from feelpp.benchmarking.reframe.launchers import LauncherCommands
+
+
+class MemoryProbe:
+    """ Records the peak memory used by the job on each node, from the job memory cgroup (memory.peak for cgroup v2, memory.max_usage_in_bytes for v1).
+    The probe is launched once per node after the application, and writes one line per node: <host> <peak bytes>.
+    The job cgroup is found by removing the step part (/step_*) of the probe cgroup path, so that the peak includes all steps of the job.
+    """
+    filename = "memory.log"
+    probe = (
+        'peak=0; '
+        'for line in $(cat /proc/self/cgroup); do '
+        'path=${line#*:}; path=${path#*:}; path=${path%%/step_*}; '
+        'for f in /sys/fs/cgroup$path/memory.peak /sys/fs/cgroup/memory$path/memory.max_usage_in_bytes; do '
+        '[ -r $f ] && peak=$(cat $f); '
+        'done; '
+        'done; '
+        'echo "$(hostname) $peak"'
+    )
+
+    @classmethod
+    def command(cls, per_node_launcher, output_filepath):
+        """ Builds the shell command running the probe on each node
+        Args:
+            per_node_launcher (str): Launcher command running one task per node (see LauncherCommands.perNode)
+            output_filepath (str): File where nodes peak memory is written
+        """
+        return f"{LauncherCommands.shell(per_node_launcher, cls.probe)} > {output_filepath}"
+
+    @staticmethod
+    def parse(filepath):
+        """ Reads the probe output
+        Returns:
+            dict[str,float]: Peak memory (Gb) by host. Hosts without measure are ignored. Empty if the file does not exist.
+        """
+        if not os.path.exists(filepath):
+            return {}
+        peaks = {}
+        with open(filepath,"r") as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) != 2 or not fields[1].isdigit() or int(fields[1]) == 0:
+                    continue
+                host, peak = fields
+                peaks[host] = max(peaks.get(host,0), int(peak) / 1024**3)
+        return peaks
@@ -0,0 +1,74 @@
+import os, shlex
+from feelpp.benchmarking.reframe.launchers import LauncherCommands
+
+
+class NodeStaging:
+    """ Copies the container image and the input file dependencies of a test to node-local storage at job start.
+    The copy is launched once per node, so that ranks read their inputs from local storage instead of the parallel filesystem.
+    Paths seen by the application are rewritten to their local copies, and the local copies are removed at the end of the job.
+    The staging duration (in seconds) is written to the staging log.
+    """
+    filename = "staging.log"
+
+    def __init__(self, directory, instance):
+        """
+        Args:
+            directory (str): Node-local directory (e.g. /tmp)
+            instance (str): Instance name of the test (see CommandBuilder.instanceName), used to isolate its files from other jobs sharing the node
+        """
+        self.root = os.path.join(directory, f"feelpp_benchmarking_{instance}")
+        self.paths = {}
+
+    def add(self, path, relpath=None):
+        """ Registers a file or directory to stage
+        Args:
+            path (str): Path on the shared filesystem
+            relpath (str): Path of the local copy, relative to the staging directory. Defaults to the basename of path.
+        Returns:
+            str: Path of the local copy
+        """
+        self.paths[path] = os.path.join(self.root, relpath or os.path.basename(path))
+        return self.paths[path]
+
+    def rewrite(self, value):
+        """ Replaces staged paths by their local copies in a string (e.g. application options)"""
+        for path in sorted(self.paths, key=len, reverse=True):
+            value = value.replace(path, self.paths[path])
+        return value
+
+    def script(self):
+        """ Shell script copying all registered paths, run on each node"""
+        commands = [f"mkdir -p {shlex.quote(self.root)}"]
+        for path, local_path in self.paths.items():
+            commands.append(f"mkdir -p {shlex.quote(os.path.dirname(local_path))} && cp -a {shlex.quote(path)} {shlex.quote(local_path)}")
+        return " && ".join(commands)
+
+    def prerunCommands(self, per_node_launcher, output_filepath):
+        """ Commands copying the files on each node and recording the staging duration
+        Args:
+            per_node_launcher (str): Launcher command running one task per node (see LauncherCommands.perNode)
+            output_filepath (str): File where the staging duration is written
+        """
+        return [
+            "_staging_start=$(date +%s.%N)",
+            LauncherCommands.shell(per_node_launcher, self.script()),
+            f'echo "$(date +%s.%N) $_staging_start" | awk \'{{print $1-$2}}\' > {output_filepath}',
+        ]
+
+    def postrunCommands(self, per_node_launcher):
+        """ Commands removing the local copies on each node"""
+        return [LauncherCommands.shell(per_node_launcher, f"rm -rf {shlex.quote(self.root)}")]
+
+    @staticmethod
+    def parse(filepath):
+        """ Reads the staging duration
+        Returns:
+            float: Staging duration in seconds, None if the file does not exist or is invalid
+        """
+        if not os.path.exists(filepath):
+            return None
+        with open(filepath, "r") as f:
+            try:
+                return float(f.read().strip())
+            except ValueError:
+                return None
@@ -0,0 +1,118 @@
+import os, sys, runpy, subprocess, threading, hashlib
+from concurrent.futures import ThreadPoolExecutor
+from tabulate import tabulate
+from feelpp.benchmarking.reframe.commandBuilder import CommandBuilder
+
+
+class Orchestrator:
+    """ Runs several benchmark configurations concurrently, each one in its own feelpp-benchmarking-exec process.
+    The output of each process is streamed with a prefix (the configuration name), and exit codes are aggregated.
+    A global cap on in-flight jobs is split statically between processes: each process runs with a derived ReFrame configuration
+    whose partitions accept at most max_jobs // max_concurrent jobs. Slots of a process are not reused by the others,
+    and no more than max_jobs configurations run at the same time so that each process gets at least one job.
+    Configurations may share parameter spaces (hence ReFrame test hashcodes), so each process uses its own ReFrame prefix and test case instance names (see CommandBuilder.config_key_env_var).
+    """
+    def __init__(self, args, max_concurrent, max_jobs=None, rfm_config_path=None, machine=None, work_dir="."):
+        """
+        Args:
+            args (Namespace): Parsed command line arguments
+            max_concurrent (int): Maximum number of configurations running at the same time. Clamped to max_jobs if it is set.
+            max_jobs (int): Maximum number of jobs in flight, accross all configurations. Not limited if None.
+            rfm_config_path (str): ReFrame configuration file of the machine. Required if max_jobs is set.
+            machine (str): Machine name. Required if max_jobs is set.
+            work_dir (str): Directory where the derived ReFrame configuration is written
+        """
+        self.args = args
+        self.max_concurrent = max(1, min(max_concurrent, len(args.benchmark_config), max_jobs or max_concurrent))
+        self.max_jobs = max_jobs
+        self.rfm_config_path = rfm_config_path
+        self.machine = machine
+        self.work_dir = work_dir
+        self.print_lock = threading.Lock()
+
+    def jobsPerProcess(self):
+        return self.max_jobs // self.max_concurrent if self.max_jobs else None
+
+    def writeSiteConfiguration(self):
+        """ Writes the ReFrame configuration shared by all processes, where partitions accept jobsPerProcess jobs
+        Returns:
+            str: Path of the derived configuration, or None if jobs are not limited
+        """
+        if not self.max_jobs:
+            return None
+        os.makedirs(self.work_dir, exist_ok=True)
+        output_filepath = os.path.join(self.work_dir, "orchestrator_config.py")
+        site_configuration = runpy.run_path(self.rfm_config_path)["site_configuration"]
+        CommandBuilder.writeSiteConfiguration(site_configuration, self.machine, output_filepath, max_jobs=self.jobsPerProcess())
+        return output_filepath
+
+    def buildArgs(self, config_filepath, rfm_config_path=None):
+        """ Command line arguments of the process running a single configuration"""
+        args = ["--machine-config", self.args.machine_config, "--benchmark-config", config_filepath]
+        if self.args.plots_config:
+            args += ["--plots-config", self.args.plots_config]
+        if rfm_config_path or self.args.custom_rfm_config:
+            args += ["--custom-rfm-config", rfm_config_path or self.args.custom_rfm_config]
+        if self.args.move_results:
+            args += ["--move-results", self.args.move_results]
+        if self.args.verbose:
+            args += ["-" + "v"*self.args.verbose]
+        for flag in ["dry_run","resume"]:
+            if getattr(self.args, flag, False):
+                args += [f"--{flag.replace('_','-')}"]
+        if self.args.reframe_args:
+            args += [f"--reframe-args={self.args.reframe_args}"]
+        return args
+
+    def buildCommand(self, config_filepath, rfm_config_path=None):
+        return [
+            sys.executable, "-c",
+            "import sys; from feelpp.benchmarking.reframe.__main__ import main_cli; sys.exit(main_cli())",
+        ] + self.buildArgs(config_filepath, rfm_config_path)
+
+    @staticmethod
+    def prefix(config_filepath):
+        return os.path.splitext(os.path.basename(config_filepath))[0]
+
+    @classmethod
+    def configKey(cls, config_filepath):
+        """ Identifier of a configuration, unique even for configuration files of the same name in different directories"""
+        return f"{cls.prefix(config_filepath)}_{hashlib.sha256(os.path.abspath(config_filepath).encode()).hexdigest()[:8]}"
+
+    def buildEnvironment(self, config_filepath):
+        return { **os.environ, CommandBuilder.config_key_env_var: self.configKey(config_filepath) }
+
+    def runConfig(self, config_filepath, rfm_config_path=None):
+        """ Runs a configuration in a subprocess, printing its output line by line with a prefix
+        Returns:
+            int: Exit code of the process
+        """
+        prefix = self.prefix(config_filepath)
+        with subprocess.Popen(
+            self.buildCommand(config_filepath, rfm_config_path), env=self.buildEnvironment(config_filepath),
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1
+        ) as process:
+            for line in process.stdout:
+                with self.print_lock:
+                    print(f"[{prefix}] {line}", end="", flush=True)
+        return process.returncode
+
+    def run(self):
+        """ Runs all configurations
+        Returns:
+            dict[str,int]: Exit code by configuration file
+        """
+        rfm_config_path = self.writeSiteConfiguration()
+        with ThreadPoolExecutor(max_workers=self.max_concurrent) as executor:
+            futures = { config: executor.submit(self.runConfig, config, rfm_config_path) for config in self.args.benchmark_config }
+        return { config: future.result() for config, future in futures.items() }
+
+    @classmethod
+    def summary(cls, exit_codes):
+        rows = [[cls.prefix(config), "success" if code == 0 else f"failed ({code})"] for config, code in exit_codes.items()]
+        return tabulate(rows, headers=["configuration","status"])
+
+    @staticmethod
+    def exitCode(exit_codes):
+        """ Aggregated exit code: 0 if all configurations succeeded, the first non-zero exit code otherwise"""
+        return next((code for code in exit_codes.values() if code != 0), 0)
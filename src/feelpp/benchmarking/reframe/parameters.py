@@ -1,5 +1,7 @@
 import reframe as rfm
 import numpy as np
+import os, json, glob
+from feelpp.benchmarking.reframe.sampling import SamplerFactory
 
 class Parameter:
     """ Abstract calss for parameters """
@@ -93,10 +95,120 @@ class ZipParameter(Parameter):
     def parametrize(self):
         yield from ({key: value for key, value in zip(self.parameter_generators.keys(), values)} for values in zip(*self.parameter_generators.values()))
 
+class AdaptiveParameter(Parameter):
+    """ Parameter refined from the results of previous campaigns, used to locate scaling knees with few points.
+    The first campaign runs a coarse sweep. Following campaigns read the performance variable from the reframe_report.json files of the history directory,
+    and only yield new points inside the intervals where the target (parallel efficiency or raw value) changes the most, or crosses the threshold.
+    No values are yielded once the point budget is used up.
+    """
+    def __init__(self, param_config, history_dir=None):
+        """
+        Args:
+            param_config (Param). object from the pydantic schema representing a parameter
+            history_dir (str): Directory (searched recursively) or file containing previous ReFrame reports. Overriden by the history field of the configuration.
+        """
+        super().__init__(param_config)
+        self.config = param_config.adaptive
+        self.history_dir = self.config.history or history_dir
+
+    def normalize(self, points):
+        """ Rounds points if the parameter is an integer, and removes duplicates preserving the order"""
+        values = []
+        for point in points:
+            point = int(round(point)) if self.config.integer else float(point)
+            if point not in values:
+                values.append(point)
+        return values
+
+    def initialPoints(self):
+        if self.config.spacing == "geometric":
+            return self.normalize(np.geomspace(self.config.min, self.config.max, self.config.n_initial, endpoint=True))
+        return self.normalize(np.linspace(self.config.min, self.config.max, self.config.n_initial, endpoint=True))
+
+    def midpoint(self, a, b):
+        """ Returns the point splitting the [a,b] interval, or None if it cannot be split further"""
+        point = np.sqrt(a*b) if self.config.spacing == "geometric" else (a+b)/2
+        point = self.normalize([point])[0]
+        return point if a < point < b else None
+
+    def readHistory(self):
+        """ Reads the previous ReFrame reports.
+        Returns:
+            tuple[set,dict]: Parameter values that were already run (even if they failed), and the mean performance value for each parameter value.
+        """
+        attempted, samples = set(), {}
+        if not self.history_dir or not os.path.exists(self.history_dir):
+            return attempted, {}
+
+        if os.path.isfile(self.history_dir):
+            filepaths = [self.history_dir]
+        else:
+            filepaths = glob.glob(os.path.join(self.history_dir,"**","reframe_report.json"), recursive=True)
+
+        for filepath in filepaths:
+            with open(filepath,"r") as f:
+                report = json.load(f)
+            for run in report.get("runs",[]):
+                for testcase in run.get("testcases",[]):
+                    value = (testcase.get("check_params") or {}).get(self.name)
+                    if not isinstance(value,(int,float)) or not self.config.min <= value <= self.config.max:
+                        continue
+                    attempted.add(value)
+                    for perfvar_key, perfvalue in (testcase.get("perfvalues") or {}).items():
+                        if perfvar_key.split(":",2)[-1] == self.config.perfvar and perfvalue and perfvalue[0] is not None:
+                            samples.setdefault(value,[]).append(float(perfvalue[0]))
+
+        return attempted, {value: float(np.mean(perfvalues)) for value, perfvalues in samples.items()}
+
+    def computeTarget(self, points, values):
+        """ Computes the refinement target (parallel efficiency relative to the smallest point, or the raw value)"""
+        points, values = np.asarray(points,dtype=float), np.asarray(values,dtype=float)
+        if self.config.target == "value":
+            return values
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if self.config.lower_is_better:
+                return (values[0]*points[0]) / (values*points)
+            return (values/points) / (values[0]/points[0])
+
+    def refinementPoints(self, attempted, values):
+        """ Returns new points, sorted by decreasing priority.
+        Without threshold, intervals are ranked by the absolute change of the target. With a threshold, only intervals where the target crosses it are refined, widest first.
+        """
+        points = sorted(values)
+        if len(points) < 2:
+            return []
+        target = self.computeTarget(points, [values[p] for p in points])
+
+        candidates = []
+        for i in range(len(points)-1):
+            a, b = points[i], points[i+1]
+            if self.config.threshold is not None:
+                if (target[i]-self.config.threshold)*(target[i+1]-self.config.threshold) > 0:
+                    continue
+                score = np.log(b/a) if self.config.spacing == "geometric" else b - a
+            else:
+                score = abs(target[i+1] - target[i])
+            point = self.midpoint(a,b)
+            if point is None or point in attempted:
+                continue
+            candidates.append((np.nan_to_num(score), point))
+
+        return [point for _, point in sorted(candidates, key=lambda c: -c[0])]
+
+    def parametrize(self):
+        attempted, values = self.readHistory()
+        remaining = self.config.budget - len(attempted)
+        if remaining <= 0:
+            return
+        pending = [point for point in self.initialPoints() if point not in attempted]
+        points = pending or self.refinementPoints(attempted, values)[:self.config.points_per_iteration]
+        yield from points[:remaining]
+
+
 class ParameterFactory:
     """ Factory class to create Parameters for reframe tests"""
     @staticmethod
-    def create(param_config):
+    def create(param_config, history_dir=None):
         if param_config.mode == "linspace":
             return LinspaceParameter(param_config)
         elif param_config.mode == "range":
@@ -111,16 +223,27 @@ class ParameterFactory:
             return GeometricParameter(param_config)
         elif param_config.mode == "zip":
             return ZipParameter(param_config)
+        elif param_config.mode == "adaptive":
+            return AdaptiveParameter(param_config, history_dir)
         else:
             raise ValueError(f"Unkown parameter type {param_config.range.mode}")
 
 
 
 class ParameterHandler:
-    def __init__(self,parameters_config):
+    def __init__(self,parameters_config,history_dir=None,sampling=None):
+        """
+        Args:
+            parameters_config (list[Parameter]): parameters from the pydantic schema
+            history_dir (str): Directory containing previous ReFrame reports of the benchmark, used by adaptive parameters
+            sampling (Sampling): If provided, only a subset of the parameter space is selected
+        """
         self.parameters_config = parameters_config
+        self.sampling = sampling
+        self.selected_combinations = None
         self.parameters = {}
         self.nested_parameter_keys = {}
+        self.adaptive_parameters = []
 
         for param_config in parameters_config:
             if not param_config.active:
@@ -132,35 +255,129 @@ class ParameterHandler:
                 self.nested_parameter_keys[param_config.name] = list(param_config.sequence[0].keys())
             else:
                 self.nested_parameter_keys[param_config.name] = []
-            param_values = list(ParameterFactory.create(param_config).parametrize())
+            if param_config.mode=="adaptive":
+                self.adaptive_parameters.append(param_config.name)
+            param_values = list(ParameterFactory.create(param_config,history_dir).parametrize())
             self.parameters[param_config.name] = param_values
 
-    def pruneParameterSpace(self,rfm_test):
+    def isExhausted(self):
+        """ Checks if an adaptive parameter has no more points to run, either because its budget is used up or because it cannot be refined further"""
+        return any(not self.parameters[name] for name in self.adaptive_parameters)
+
+    def hasConditions(self):
+        """ Checks if any active parameter defines conditions"""
+        return any(param_config.conditions for param_config in self.parameters_config if param_config.name in self.parameters)
+
+    @staticmethod
+    def checkConditions(param_config, combination):
+        """ Evaluates the conditions of a parameter on a (possibly partial) combination of parameter values.
+        Args:
+            param_config (Parameter): parameter defining the conditions
+            combination (dict): Parameter values by name. Must contain the parameter and all parameters referenced by its filters.
+        Returns:
+            tuple[bool,dict,list]: Whether the combination is valid, the values of the filters, and the applied condition list.
+        """
+        filters_list = param_config.conditions.get(str(combination[param_config.name]))
+        if not filters_list:
+            return True, {}, filters_list
+
+        active_filter_values = {}
+        for filters in filters_list:
+            for filter_name in filters.keys():
+                param_path = filter_name.split(".")
+                active_filter_values[filter_name] = combination[param_path[0]]
+                for p in param_path[1:]:
+                    active_filter_values[filter_name] = active_filter_values[filter_name].get(p)
+
+        is_valid = any(
+            all(
+                active_filter_values[filter_key] in filter_values
+                for filter_key, filter_values in filters.items()
+            )
+            for filters in filters_list
+        )
+        return is_valid, active_filter_values, filters_list
+
+    def constrainedProduct(self):
+        """ Lazily generates the cartesian product of parameter values, as dictionaries, skipping combinations that do not satisfy the conditions.
+        Each condition is evaluated as soon as the parameters it depends on are set, so invalid partial combinations are never expanded.
+        """
+        names = list(self.parameters.keys())
+        checks = [[] for _ in names]
         for param_config in self.parameters_config:
-            if not param_config.conditions:
+            if param_config.name not in self.parameters or not param_config.conditions:
                 continue
+            dependencies = {param_config.name} | {
+                filter_name.split(".")[0]
+                for filters_list in param_config.conditions.values() for filters in filters_list for filter_name in filters
+            }
+            unknown = dependencies - set(names)
+            if unknown:
+                raise ValueError(f"Conditions of parameter {param_config.name} depend on unknown or inactive parameters : {sorted(unknown)}")
+            checks[max(names.index(d) for d in dependencies)].append(param_config)
 
-            active_parameter_value = str(getattr(rfm_test,param_config.name))
-            filters_list = param_config.conditions.get(active_parameter_value)
-            if not filters_list:
-                continue
+        def expand(depth, combination):
+            if depth == len(names):
+                yield dict(combination)
+                return
+            for value in self.parameters[names[depth]]:
+                combination[names[depth]] = value
+                if all(self.checkConditions(param_config, combination)[0] for param_config in checks[depth]):
+                    yield from expand(depth+1, combination)
+            combination.pop(names[depth], None)
 
-            active_filter_values = {}
-            for filters in filters_list:
-                for filter_name in filters.keys():
-                    param_path = filter_name.split(".")
-                    active_filter_values[filter_name] = getattr(rfm_test,param_path[0])
-                    if len(param_path) > 1:
-                        for p in param_path[1:]:
-                            active_filter_values[filter_name] = active_filter_values[filter_name].get(p)
-
-            is_valid = any(
-                all(
-                    active_filter_values[filter_key] in filter_values
-                    for filter_key, filter_values in filters.items()
-                )
-                for filters in filters_list
-            )
+        yield from expand(0, {})
+
+    def isValid(self,combination):
+        """ Checks if a complete combination of parameter values satisfies all conditions"""
+        return all(
+            self.checkConditions(param_config, combination)[0]
+            for param_config in self.parameters_config
+            if param_config.name in self.parameters and param_config.conditions
+        )
+
+    def selectCombinations(self,combinations):
+        """ Restricts the combinations to run to an explicit list (e.g. the cases of a job bundle)
+        Args:
+            combinations (list[dict]): Parameter values by name, for all active parameters
+        """
+        unknown = [name for combination in combinations for name in combination if name not in self.parameters]
+        if unknown:
+            raise ValueError(f"Selected combinations contain unknown or inactive parameters: {sorted(set(unknown))}")
+        self.selected_combinations = list(combinations)
 
-            rfm_test.skip_if(not is_valid , f"Invalid parameter combination ({active_filter_values}) for condition list {param_config.name}={active_parameter_value} condition list ({filters_list})", )
+    def isCombined(self):
+        """ Checks if the parameter space is not a plain cartesian product (because of conditions, sampling or selected combinations)"""
+        return self.selected_combinations is not None or self.sampling is not None or self.hasConditions()
 
+    def combinations(self):
+        """ Iterates over the combinations to run, sampled if a sampling is configured"""
+        if self.selected_combinations is not None:
+            return iter(self.selected_combinations)
+        if self.sampling is not None:
+            return iter(SamplerFactory.create(self.sampling).sample(self))
+        return self.constrainedProduct()
+
+    def count(self):
+        """ Returns the number of parameter combinations to run, without storing them"""
+        return sum(1 for _ in self.combinations())
+
+    def buildPlaceholders(self,combination):
+        """ Returns the configuration placeholders corresponding to a combination of parameter values
+        Args:
+            combination (dict): Parameter values by name
+        Returns:
+            dict: e.g. {"parameters.my_param.value": "1", "parameters.my_param.subparam.value": "2"}
+        """
+        placeholders = {}
+        for param_name,subparameters in self.nested_parameter_keys.items():
+            value = combination[param_name]
+            placeholders[f"parameters.{param_name}.value"] = str(value)
+            for subparameter in subparameters:
+                placeholders[f"parameters.{param_name}.{subparameter}.value"] = str(value[subparameter])
+        return placeholders
+
+    @staticmethod
+    def formatCombination(combination):
+        """ Short representation of a parameter combination, used for test names"""
+        return ",".join(f"{name}={value}" for name, value in combination.items())
@@ -0,0 +1,82 @@
+from collections import OrderedDict
+import os, threading
+
+
+class ParseCache:
+    """ Process-wide LRU cache of parsed output files.
+    Entries are keyed by (path, format, size, mtime), so that a file is decoded at most once per format as long as it does not change on disk.
+    The format can be any hashable describing how the file was parsed (e.g. "text", or a tuple containing the format and its options).
+    The memory used by the cache is bounded by the total size on disk of the cached files, so that large outputs (e.g. whole stdout texts) cannot accumulate.
+    """
+    def __init__(self, maxsize=64, maxbytes=256*1024**2):
+        """
+        Args:
+            maxsize (int): Maximum number of parsed files to keep in memory. Least recently used entries are evicted first.
+            maxbytes (int): Maximum total size of the cached files, in bytes. Files larger than maxbytes are parsed but not cached.
+        """
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def buildKey(filepath, format):
+        stat = os.stat(filepath)
+        return (os.path.abspath(filepath), format, stat.st_size, stat.st_mtime_ns)
+
+    def get(self, filepath, format, parser):
+        """ Returns the parsed content of a file, calling parser(filepath) only if it is not cached
+        Args:
+            filepath (str): Path of the file to parse
+            format (hashable): Format identifier of the parsed content
+            parser (callable): Function taking the filepath and returning its parsed content
+        """
+        key = self.buildKey(filepath, format)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+
+        value = parser(filepath)
+
+        with self.lock:
+            self.misses += 1
+            #Outdated versions of the same file are dropped
+            for outdated in [k for k in self.entries if k[:2] == key[:2]]:
+                self.evict(outdated)
+            if key[2] > self.maxbytes:
+                return value
+            self.entries[key] = value
+            self.nbytes += key[2]
+            while len(self.entries) > self.maxsize or self.nbytes > self.maxbytes:
+                self.evict(next(iter(self.entries)))
+        return value
+
+    def evict(self, key):
+        del self.entries[key]
+        self.nbytes -= key[2]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.nbytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def readText(filepath):
+    with open(filepath, "r", encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+PARSE_CACHE = ParseCache(
+    int(os.environ.get("FEELPP_BENCHMARKING_PARSE_CACHE_SIZE", 64)),
+    int(os.environ.get("FEELPP_BENCHMARKING_PARSE_CACHE_BYTES", 256*1024**2))
+)
@@ -32,6 +32,12 @@ class Parser(BaseParser):
         options.add_argument('--verbose', '-v', action='count', default=0, help='Select verbose level by specifying multiple v\'s. ')
         options.add_argument('--help', '-h', action='help', help='Display help and quit program')
         options.add_argument('--website', '-w', action='store_true', help='Render reports, compile them and create the website.')
+        options.add_argument('--count', action='store_true', help='Print the number of valid parameter combinations of each benchmark configuration (after applying parameter conditions). \nIf this option is provided, the application will not run.')
+        options.add_argument('--estimate', action='store_true', help='Estimate the cost of each benchmark configuration (node hours, longest job and timeouts) from previous reports, without running it.')
+        options.add_argument('--parallel-configs', '-pj', type=int, default=1, metavar='N', help='Number of benchmark configurations running at the same time, each one in its own process. Outputs are prefixed by the configuration name.')
+        options.add_argument('--max-jobs', type=int, default=None, metavar='N', help='Maximum number of jobs in flight accross all benchmark configurations running at the same time.')
+        options.add_argument('--resume', action='store_true', help='Skip test cases whose result is cached from a previous campaign (same configuration, parameter values, target and image). Cached results are merged into the new report.')
+        options.add_argument('--no-config-cache', action='store_true', help='Load and validate configuration files again instead of using validated configurations cached by previous launches.')
         options.add_argument('--dry-run', action='store_true', help='Execute ReFrame in dry-run mode. No tests will run, but the script to execute it will be generated in the stage directory. Config validation will be skipped, although warnings will be raised if bad.')
 
         self.parser.add_argument('--reframe-args', '-rfm', type=str, nargs="?", default="", help='Arguments for ReFrame')
@@ -58,6 +64,10 @@ class Parser(BaseParser):
             print(f'[Error] --machine-config should be specified')
             sys.exit(1)
 
+        if self.args.parallel_configs < 1 or (self.args.max_jobs is not None and self.args.max_jobs < 1):
+            print(f'[Error] --parallel-configs and --max-jobs should be strictly positive')
+            sys.exit(1)
+
 
 
     def checkDirectoriesExist(self):
@@ -0,0 +1,105 @@
+import os, json, subprocess
+from concurrent.futures import ThreadPoolExecutor
+from tabulate import tabulate
+from feelpp.benchmarking.dashboardRenderer.handlers.download import DownloadHandler
+
+
+class Prefetcher:
+    """ Fetches the container images and the remote input dependencies of a benchmark before launch.
+    All transfers run concurrently, so that image pulls overlap with dataset downloads.
+    Artifacts whose checksum already matches locally are skipped, and interrupted downloads are resumed from their partial file.
+    """
+    def __init__(self, max_workers=4):
+        """
+        Args:
+            max_workers (int): Maximum number of transfers running at the same time
+        """
+        self.max_workers = max_workers
+        self.tasks = {}
+
+    @staticmethod
+    def pullRecord(image):
+        """ Url and signature (size, modification time) of the last image pulled at image.filepath"""
+        st = os.stat(image.filepath)
+        return { "url": image.url, "signature": [st.st_size, st.st_mtime_ns] }
+
+    @classmethod
+    def isPulled(cls, image):
+        """ Whether the local image is up to date: it matches its checksum if one is given,
+        otherwise it was pulled from the same url and has not been modified since (as recorded in the <filepath>.pull.json sidecar)"""
+        if not os.path.exists(image.filepath):
+            return False
+        if image.checksum:
+            return DownloadHandler.checksumMatches(image.filepath, image.checksum)
+        try:
+            with open(f"{image.filepath}.pull.json", "r") as f:
+                return json.load(f) == cls.pullRecord(image)
+        except (OSError, ValueError):
+            return False
+
+    @classmethod
+    def pullImage(cls, executable, image):
+        """ Pulls a container image, unless the local image is up to date (see isPulled). The pulled image is verified against the checksum.
+        Args:
+            executable (str): Container executable used to pull (e.g. apptainer)
+            image (Image): Image with its url, filepath and optional checksum
+        Returns:
+            str: "skipped" or "pulled"
+        """
+        if cls.isPulled(image):
+            return "skipped"
+        subprocess.run(f"{executable} pull -F {image.filepath} {image.url}", shell=True, check=True)
+        if image.checksum and not DownloadHandler.checksumMatches(image.filepath, image.checksum):
+            raise ValueError(f"Checksum mismatch for image {image.filepath}")
+        with open(f"{image.filepath}.pull.json", "w") as f:
+            json.dump(cls.pullRecord(image), f)
+        return "pulled"
+
+    def addImages(self, platforms, containers):
+        """ Registers the images to pull, for platforms having an image url and a container executable"""
+        for platform_name, platform_field in platforms.items():
+            if not platform_field.image or not platform_field.image.url or not containers[platform_name].executable:
+                continue
+            if platform_name != "apptainer":
+                raise NotImplementedError(f"Image pulling is not yet supported for {platform_name}")
+            self.tasks[f"image:{platform_name}"] = (self.pullImage, containers[platform_name].executable, platform_field.image)
+
+    def addRemoteDependencies(self, remote_dependencies, girder_handler):
+        """ Registers one transfer per file of the remote dependencies
+        Args:
+            remote_dependencies (dict[str,RemoteData]): Remote input dependencies of the benchmark
+            girder_handler (GirderHandler): Handler used for Girder resources
+        """
+        for dependency_name, remote_dependency in remote_dependencies.items():
+            if not remote_dependency.girder:
+                raise NotImplementedError(f"Platform {remote_dependency} is not implemented for {dependency_name}")
+            resource_type = next(res for res in ["file","folder","item"] if getattr(remote_dependency.girder, res))
+            files = girder_handler.listFiles(resource_type, getattr(remote_dependency.girder, resource_type), remote_dependency.destination)
+            destination = os.path.join(girder_handler.download_base_dir or "", remote_dependency.destination)
+            for file, filepath in files:
+                name = dependency_name if resource_type == "file" else f"{dependency_name}:{os.path.relpath(filepath, destination)}"
+                self.tasks[name] = (girder_handler.fetchFile, file, filepath, remote_dependency.checksum)
+
+    def run(self):
+        """ Runs all registered transfers. Every transfer is attempted even if some of them fail.
+        Returns:
+            dict[str,str]: Status of each transfer ("skipped", "pulled" or "downloaded")
+        Raises:
+            RuntimeError: If any transfer failed, listing the failures
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = { name: executor.submit(*task) for name, task in self.tasks.items() }
+
+        statuses, errors = {}, {}
+        for name, future in futures.items():
+            if future.exception():
+                errors[name] = future.exception()
+            else:
+                statuses[name] = future.result()
+        if errors:
+            raise RuntimeError("Prefetch failed for " + ", ".join(f"{name} ({error})" for name, error in errors.items()))
+        return statuses
+
+    @staticmethod
+    def summary(statuses):
+        return tabulate(sorted(statuses.items()), headers=["artifact","status"])
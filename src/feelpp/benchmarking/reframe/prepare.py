@@ -0,0 +1,121 @@
+import os, json, hashlib
+from feelpp.benchmarking.reframe.config.configReader import TemplateProcessor
+
+
+class PrepareStage:
+    """ Preprocessing of a benchmark (e.g. mesh partitioning) shared by all test cases having the same values of some parameters (the keys).
+    The stage runs once per distinct key, and its outputs are cached in a directory of the dataset store named after the key values and the command.
+    The directory is available to the application with the {{prepare.directory}} placeholder.
+    """
+    test_name = "PrepareTest"
+    marker = ".complete"
+    dirname = ".prepare"
+
+    def __init__(self, prepare_config, base_dir):
+        """
+        Args:
+            prepare_config (Prepare): Prepare stage configuration
+            base_dir (str): Directory where the outputs of each key are cached
+        """
+        self.config = prepare_config
+        self.base_dir = base_dir
+
+    @classmethod
+    def fromConfig(cls, app_config, machine_config):
+        """ Prepare stage of a benchmark, None if it has none"""
+        if not app_config.prepare:
+            return None
+        store_dir = machine_config.input_dataset_base_dir or machine_config.reframe_base_dir
+        return cls(app_config.prepare, os.path.join(store_dir, cls.dirname, app_config.use_case_name))
+
+    def keyValues(self, combination):
+        """ Values of the key parameters in a combination. Keys can refer to subparameters (e.g. mesh.path)"""
+        values = {}
+        for key in self.config.keys:
+            name, *path = key.split(".")
+            value = combination[name]
+            for p in path:
+                value = value[p]
+            values[key] = value
+        return values
+
+    def keys(self, combinations):
+        """ Distinct key values of the combinations, in order of appearance"""
+        keys = []
+        for combination in combinations:
+            key_values = self.keyValues(combination)
+            if key_values not in keys:
+                keys.append(key_values)
+        return keys
+
+    @staticmethod
+    def formatKey(key_values):
+        return ",".join(f"{key}={value}" for key, value in key_values.items())
+
+    def directory(self, key_values):
+        """ Cache directory of a key. It changes with the command, so that outdated outputs are not reused."""
+        digest = hashlib.sha256(json.dumps([key_values, self.config.command], sort_keys=True, default=str).encode()).hexdigest()
+        return os.path.join(self.base_dir, digest[:16])
+
+    def isComplete(self, key_values):
+        return os.path.exists(os.path.join(self.directory(key_values), self.marker))
+
+    def placeholders(self, key_values):
+        placeholders = { "prepare.directory": self.directory(key_values) }
+        for key, value in key_values.items():
+            placeholders[f"parameters.{key}.value"] = str(value)
+            if isinstance(value, dict):
+                for subparameter, subvalue in value.items():
+                    placeholders[f"parameters.{key}.{subparameter}.value"] = str(subvalue)
+        return placeholders
+
+    def command(self, key_values):
+        """ Command of the stage, where key parameters and the output directory are replaced"""
+        return TemplateProcessor().replacePlaceholders(self.config.command, self.placeholders(key_values))
+
+    def prerunCommands(self, key_values):
+        """ Commands run before the stage: takes a lock on the key, and exits if its outputs were produced meanwhile"""
+        directory = self.directory(key_values)
+        return [
+            f"mkdir -p {directory}",
+            f"exec 9>{directory}.lock",
+            "flock 9",
+            f"if [ -e {os.path.join(directory, self.marker)} ]; then exit 0; fi",
+        ]
+
+    def postrunCommands(self, key_values):
+        """ Marks the outputs of the key as complete if the stage succeeded"""
+        return [f"if [ $? -eq 0 ]; then touch {os.path.join(self.directory(key_values), self.marker)}; fi"]
+
+    @classmethod
+    def pruneReport(cls, report_filepath):
+        """ Removes the prepare stage test cases from a ReFrame report, so that it only contains benchmark results
+        Returns:
+            int: Number of removed test cases
+        """
+        with open(report_filepath, "r") as f:
+            report = json.load(f)
+
+        removed = 0
+        for run in report.get("runs", []):
+            testcases = []
+            for testcase in run.get("testcases", []):
+                if not testcase.get("name", "").startswith(cls.test_name):
+                    testcases.append(testcase)
+                    continue
+                removed += 1
+                for counter, results in [("num_cases", None), ("num_failures", ("fail",)), ("num_aborted", ("abort",)), ("num_skipped", ("skip",))]:
+                    if run.get(counter) and (results is None or testcase.get("result") in results):
+                        run[counter] -= 1
+            run["testcases"] = testcases
+
+        session_info = report.get("session_info", {})
+        if removed and report.get("runs"):
+            #Cases and skips are counted on the first run, failures on the last one (after retries)
+            for counter in ["num_cases","num_failures","num_aborted","num_skipped"]:
+                if counter in session_info:
+                    session_info[counter] = report["runs"][0 if counter in ["num_cases","num_skipped"] else -1].get(counter, 0)
+
+        with open(report_filepath, "w") as f:
+            json.dump(report, f)
+        return removed
@@ -1,19 +1,79 @@
 import reframe as rfm
+import reframe.utility.sanity as sn
+import reframe.utility.udeps as udeps
 from feelpp.benchmarking.reframe.setup import ReframeSetup, DEBUG
 from feelpp.benchmarking.reframe.config.configReader import FileHandler
 from feelpp.benchmarking.reframe.validation import ValidationHandler
 from feelpp.benchmarking.reframe.scalability import ScalabilityHandler
+from feelpp.benchmarking.reframe.affinity import AffinityProbe
+from feelpp.benchmarking.reframe.memory import MemoryProbe
+from feelpp.benchmarking.reframe.staging import StagingStore
+from feelpp.benchmarking.reframe.nodeStaging import NodeStaging
+from feelpp.benchmarking.reframe.prepare import PrepareStage
+from feelpp.benchmarking.reframe.estimator import parseTimeout
 
 from feelpp.benchmarking.dashboardRenderer.renderer import TemplateRenderer
 
 
-import shutil, os
+import os
+
+@rfm.simple_test
+class PrepareTest(rfm.RunOnlyRegressionTest):
+    """ Runs the prepare stage of the benchmark once per distinct value of its key parameters.
+    Regression tests depend on the prepare test of their key. Keys whose outputs are already cached run locally, without going through the scheduler."""
+    machine_reader = ReframeSetup.machine_reader
+    app_reader = ReframeSetup.app_reader
+    prepare_stage = ReframeSetup.prepare_stage
+    prepare_key = parameter(
+        prepare_stage.keys(ReframeSetup.parameter_handler.combinations()) if prepare_stage else [],
+        fmt=PrepareStage.formatKey, loggable=False
+    )
+
+    @run_after('init')
+    def setValidEnvironments(self):
+        self.valid_systems = [f"{self.machine_reader.config.machine}:{part}" for part in self.machine_reader.config.partitions]
+        self.valid_prog_environs = self.machine_reader.config.prog_environments
+        self.local = self.prepare_stage.isComplete(self.prepare_key)
+
+    @run_after('setup')
+    def setPlatform(self):
+        command = self.prepare_stage.command(self.prepare_key)
+        if self.machine_reader.config.platform == "builtin":
+            self.executable = command
+        else:
+            platform = self.app_reader.config.platforms[self.machine_reader.config.platform]
+            self.container_platform.image = platform.image.filepath
+            self.container_platform.options = platform.options + self.machine_reader.config.containers[self.machine_reader.config.platform].options
+            self.container_platform.workdir = None
+            self.container_platform.command = command
+
+    @run_before('run')
+    def setJob(self):
+        self.num_tasks = self.prepare_stage.config.tasks
+        self.time_limit = parseTimeout(self.prepare_stage.config.timeout)
+        self.job.options += self.machine_reader.config.access
+        self.prerun_cmds = self.prepare_stage.prerunCommands(self.prepare_key) + self.prerun_cmds
+        self.postrun_cmds = self.prepare_stage.postrunCommands(self.prepare_key) + self.postrun_cmds
+
+    @sanity_function
+    def checkOutputs(self):
+        return sn.assert_true(self.prepare_stage.isComplete(self.prepare_key), msg=f"Prepare stage failed for {PrepareStage.formatKey(self.prepare_key)}")
+
 
 @rfm.simple_test
 class RegressionTest(ReframeSetup):
     """ Class to execute reframe test.
     It should contain sanity functions and performance variable setting"""
 
+    @run_after('init')
+    def setPrepareDependency(self):
+        """ Runs the test after the prepare stage of its key"""
+        if not self.prepare_stage:
+            return
+        key_values = self.prepare_stage.keyValues({ param_name: getattr(self,param_name) for param_name in self.parameter_handler.nested_parameter_keys })
+        variant_num = PrepareTest.get_variant_nums(prepare_key=lambda key: key == key_values)[0]
+        self.depends_on(PrepareTest.variant_name(variant_num), udeps.by_env)
+
     @run_before('run')
     def initHandlers(self):
         self.validation_handler = ValidationHandler(self.app_reader.config.sanity)
@@ -28,6 +88,31 @@ class RegressionTest(ReframeSetup):
             self.skip("ReFrame is in dry-run mode, perormance and sanity are not going to be evaluated.")
 
 
+    @run_before('sanity')
+    def recordAffinity(self):
+        """ Flags mis-pinned runs: ranks sharing CPUs, or allowed on more CPUs than requested (except for NUMA binding)"""
+        placement = self.app_reader.config.resources.placement
+        if not placement:
+            return
+        ranks = AffinityProbe.parse(os.path.join(self.stagedir,AffinityProbe.filename))
+        if not ranks:
+            return
+        self.affinity = AffinityProbe.summarize(ranks)
+        issues = AffinityProbe.check(
+            ranks,
+            max_cpus = None if placement == "numa" else self.num_cpus_per_task * (self.current_partition.processor.num_cpus_per_core or 1),
+            exclusive = placement != "numa"
+        )
+        for issue in issues:
+            DEBUG(issue)
+        self.pinning_ok = not issues
+
+    @run_before('sanity')
+    def recordMemory(self):
+        if not self.app_reader.config.resources.memory_policy:
+            return
+        self.memory_peak = MemoryProbe.parse(os.path.join(self.stagedir,MemoryProbe.filename))
+
     @run_before('performance')
     def renderLogs(self):
         logs_data = {}
@@ -73,11 +158,15 @@ class RegressionTest(ReframeSetup):
     @run_before('performance')
     def setPerfVars(self):
         self.perf_variables = {}
+        staging_time = NodeStaging.parse(os.path.join(self.stagedir,NodeStaging.filename))
+        if staging_time is not None:
+            self.perf_variables["staging_time"] = sn.make_performance_function(sn.defer(staging_time),unit="s")
         if not self.scalability_handler:
             return
         self.perf_variables.update(
             self.scalability_handler.getPerformanceVariables(self.num_tasks)
         )
+        self.scalability_handler.saveArrays(os.path.join(self.report_dir_path,"arrays",f"{self.hashcode}.npz"))
         self.perf_variables.update(
             self.scalability_handler.getCustomPerformanceVariables(self.perf_variables)
         )
@@ -94,28 +183,34 @@ class RegressionTest(ReframeSetup):
         if self.app_reader.config.scalability and self.app_reader.config.scalability.clean_directory and self.app_reader.config.scalability.directory:
             FileHandler.cleanupDirectory(self.app_reader.config.scalability.directory)
         if self.machine_reader.config.input_user_dir and self.app_reader.config.input_file_dependencies:
-            DEBUG("REMOVING INPUT FILE DEPENDENCIES...")
+            DEBUG("RELEASING INPUT FILE DEPENDENCIES...")
+            store = StagingStore(os.path.join(self.machine_reader.config.input_dataset_base_dir, StagingStore.dirname))
             for input_dep in self.app_reader.config.input_file_dependencies.values():
                 location = os.path.join(self.machine_reader.config.input_dataset_base_dir,input_dep)
-                if os.path.isfile(location):
-                    os.remove(location)
-                elif os.path.isdir(location):
-                    shutil.rmtree(location)
-                DEBUG(f"\t DELETED {input_dep}")
-
-            #Delete empty dirs
-            for dirpath, dirnames, _ in os.walk(self.machine_reader.config.input_dataset_base_dir, topdown=False):
-                for dirname in dirnames:
-                    directory = os.path.join(dirpath,dirname)
-                    if not os.listdir(directory):
-                        os.rmdir(directory)
-                        DEBUG(f"Deleted empty directory: {directory}")
+                #Inputs still used by other tests are kept
+                if store.release(location, self.stagedir):
+                    DEBUG(f"\t DELETED {input_dep}")
+            max_size = self.machine_reader.config.input_store_max_size
+            store.collect(max_bytes = None if max_size is None else int(max_size*1024**3))
+
+            #Delete empty dirs, deepest first. The staging store and prepare outputs are shared with other processes, and skipped.
+            base_dir = self.machine_reader.config.input_dataset_base_dir
+            directories = []
+            for dirpath, dirnames, _ in os.walk(base_dir):
+                if dirpath == base_dir:
+                    dirnames[:] = [dirname for dirname in dirnames if dirname not in [StagingStore.dirname, PrepareStage.dirname]]
+                directories += [os.path.join(dirpath,dirname) for dirname in dirnames]
+            for directory in reversed(directories):
+                if not os.listdir(directory):
+                    os.rmdir(directory)
+                    DEBUG(f"Deleted empty directory: {directory}")
 
 
     @sanity_function
     def sanityCheck(self):
+        stdout = os.path.join(self.stagedir,self.stdout.evaluate())
         return (
-            self.validation_handler.check_success(self.stdout)
+            self.validation_handler.check_success(stdout)
             and
-            self.validation_handler.check_errors(self.stdout)
+            self.validation_handler.check_errors(stdout)
         )
\ No newline at end of file
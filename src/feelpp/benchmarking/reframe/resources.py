@@ -1,4 +1,5 @@
 import numpy as np
+from feelpp.benchmarking.reframe.launchers import LauncherCommands
 
 class ResourceStrategy:
     """ Resource Strategy abstract class to configure the resources for the test """
@@ -61,12 +62,74 @@ class TasksAndNodesStrategy(ResourceStrategy):
 
 class TasksStrategy(ResourceStrategy):
     """ Resource Strategy to configure the resources for the test with tasks
-        The number of tasks per node is calculated as the minimum between the number of tasks and the number of CPUs per node
+        The number of tasks per node is calculated as the minimum between the number of tasks and the number of tasks fitting in a node (CPUs per node divided by CPUs per task)
     """
     def configure(self, resources, rfm_test):
+        cpus_per_task = int(resources.cpus_per_task or 1)
+        max_tasks_per_node = max(rfm_test.current_partition.processor.num_cpus // cpus_per_task, 1)
         rfm_test.num_tasks = int(resources.tasks)
-        rfm_test.num_nodes = int(np.ceil(rfm_test.num_tasks / rfm_test.current_partition.processor.num_cpus))
-        rfm_test.num_tasks_per_node = min(rfm_test.num_tasks, rfm_test.current_partition.processor.num_cpus)
+        rfm_test.num_nodes = int(np.ceil(rfm_test.num_tasks / max_tasks_per_node))
+        rfm_test.num_tasks_per_node = min(rfm_test.num_tasks, max_tasks_per_node)
+
+class CpusPerTaskStrategy(ResourceStrategy):
+    """ Strategy to set the number of CPUs (threads) per task, for hybrid MPI x OpenMP runs.
+        OpenMP and binding environment variables are exported in the job script, unless they are already defined.
+    """
+    def configure(self, resources, rfm_test):
+        rfm_test.num_cpus_per_task = int(resources.cpus_per_task)
+        binding_variables = {
+            "OMP_NUM_THREADS": str(rfm_test.num_cpus_per_task),
+            "OMP_PLACES": "cores",
+            "OMP_PROC_BIND": "close",
+            "SRUN_CPUS_PER_TASK": str(rfm_test.num_cpus_per_task)
+        }
+        for name, value in binding_variables.items():
+            rfm_test.env_vars.setdefault(name, value)
+
+    def validate(self, rfm_test):
+        super().validate(rfm_test)
+        assert rfm_test.num_cpus_per_task > 0, "Number of CPUs per task should be strictly positive"
+        tasks_per_node = rfm_test.num_tasks_per_node or int(np.ceil(rfm_test.num_tasks / rfm_test.num_nodes))
+        assert tasks_per_node * rfm_test.num_cpus_per_task <= rfm_test.current_partition.processor.num_cpus, f"A node has not enough capacity ({rfm_test.current_partition.processor.num_cpus}) for {tasks_per_node} tasks of {rfm_test.num_cpus_per_task} CPUs"
+
+class PlacementStrategy(ResourceStrategy):
+    """ Topology-aware placement of tasks inside nodes, using the sockets and NUMA nodes of the partition processor description.
+        - block: tasks fill cores consecutively
+        - socket: tasks are distributed evenly (cyclically) accross sockets, and bound to cores
+        - numa: tasks are distributed evenly accross NUMA nodes, and bound to their NUMA node
+        Distribution and binding options are added to the launcher (Slurm srun syntax), so placements require the srun launcher.
+    """
+    launcher_options = {
+        "block": ["--distribution=block:block", "--cpu-bind=cores"],
+        "socket": ["--distribution=block:cyclic", "--cpu-bind=cores"],
+        "numa": ["--distribution=block:cyclic", "--cpu-bind=ldoms"]
+    }
+
+    def domains(self, placement, processor):
+        """ Number of placement domains per node"""
+        if placement == "socket":
+            return processor.num_sockets
+        elif placement == "numa":
+            return processor.num_numa_nodes
+        return 1
+
+    def configure(self, resources, rfm_test):
+        self.placement = resources.placement
+        if self.placement not in self.launcher_options:
+            raise ValueError(f"Unknown placement {self.placement}. Valid placements are {list(self.launcher_options.keys())}")
+        launcher_name = LauncherCommands.name(rfm_test.job.launcher)
+        if launcher_name and launcher_name != "srun":
+            raise ValueError(f"Placement {self.placement} requires the srun launcher, got {launcher_name}")
+        rfm_test.job.launcher.options += self.launcher_options[self.placement]
+        if self.placement == "socket" and rfm_test.current_partition.processor.num_sockets and rfm_test.num_tasks_per_node:
+            rfm_test.num_tasks_per_socket = rfm_test.num_tasks_per_node // rfm_test.current_partition.processor.num_sockets
+
+    def validate(self, rfm_test):
+        super().validate(rfm_test)
+        domains = self.domains(self.placement, rfm_test.current_partition.processor)
+        assert domains, f"The partition processor description needs the {'num_sockets' if self.placement == 'socket' else 'topology'} field for {self.placement} placement"
+        tasks_per_node = rfm_test.num_tasks_per_node or int(np.ceil(rfm_test.num_tasks / rfm_test.num_nodes))
+        assert tasks_per_node % domains == 0 or tasks_per_node < domains, f"Tasks per node ({tasks_per_node}) cannot be evenly distributed accross {domains} {self.placement} domains"
 
 class GpusPerNodeStrategy(ResourceStrategy):
     """ Strategy to set number of gpus """
@@ -123,6 +186,8 @@ class ResourceHandler:
     @staticmethod
     def setResources(resources, rfm_test):
         """ Set the resources for the test based on the resources model and its combinations (tasks, tasks_per_node, nodes)
+        If cpus_per_task is set, tasks are placed accordingly and OpenMP threads are configured. Otherwise, a single CPU per task is used.
+        If placement is set, distribution and binding launcher options are added depending on the processor topology.
         If the memory is set, the number of nodes is recomputed to accomodate the memory requirements
         Args:
             resources (dict): The resources pydantic model
@@ -146,6 +211,16 @@ class ResourceHandler:
 
         strategy.configure(resources, rfm_test)
 
+        if resources.cpus_per_task:
+            cpus_strategy = CpusPerTaskStrategy()
+            cpus_strategy.configure(resources, rfm_test)
+        else:
+            rfm_test.num_cpus_per_task = 1
+
+        if resources.placement:
+            placement_strategy = PlacementStrategy()
+            placement_strategy.configure(resources, rfm_test)
+
         if resources.gpus_per_node: #or resources.gpus
             gpu_strategy = GpusPerNodeStrategy()
             gpu_strategy.configure(resources, rfm_test)
@@ -157,5 +232,9 @@ class ResourceHandler:
         ExclusiveAccessEnforcer(resources.exclusive_access).enforceExclusiveAccess(rfm_test)
 
         strategy.validate(rfm_test)
+        if resources.cpus_per_task:
+            cpus_strategy.validate(rfm_test)
+        if resources.placement:
+            placement_strategy.validate(rfm_test)
 
         return rfm_test
\ No newline at end of file
@@ -0,0 +1,164 @@
+import os, json, hashlib, shutil
+from functools import lru_cache
+from feelpp.benchmarking.jsonWithComments import JSONWithCommentsDecoder
+
+
+class ResultCache:
+    """ Cache of passed test case results of a benchmark, used to resume campaigns and to run incremental sweeps.
+    Test cases are keyed by a hash of everything determining their result: the benchmark and machine configurations,
+    the parameter values (which determine the resources), the partition, the programming environment and the container image.
+    Parameter definitions are not part of the key, so that adding values to a parameter only runs the new test cases.
+    Each entry contains the ReFrame report test case, and the files written to the report folder for this test case (logs, arrays, partials).
+    """
+    resume_env_var = "FEELPP_BENCHMARKING_RESUME"
+
+    #Benchmark configuration fields that do not change test results
+    ignored_app_fields = ["parameters","sampling","json_report","timeout","timeout_policy","additional_files"]
+    #Machine configuration fields that can change test results
+    machine_fields = ["machine","platform","env_variables","containers","input_dataset_base_dir","output_app_dir"]
+    artefact_dirs = ["logs","arrays","partials"]
+
+    def __init__(self, cache_dir):
+        """
+        Args:
+            cache_dir (str): Directory containing the cache entries of a benchmark
+        """
+        self.cache_dir = cache_dir
+
+    @staticmethod
+    def hash(value):
+        return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+    @staticmethod
+    def loadConfig(filepath):
+        """ Loads a JSON configuration file, which can contain comments. Files that cannot be parsed are returned as raw text"""
+        with open(filepath, "r") as f:
+            content = f.read()
+        try:
+            return json.loads(content, cls=JSONWithCommentsDecoder)
+        except json.JSONDecodeError:
+            return content
+
+    @classmethod
+    def configDigest(cls, app_config_filepath, machine_config_filepath):
+        """ Hash of the configuration fields that can change test results"""
+        app_config = cls.loadConfig(app_config_filepath)
+        machine_config = cls.loadConfig(machine_config_filepath)
+        if isinstance(app_config, dict):
+            app_config = { k: v for k, v in app_config.items() if k not in cls.ignored_app_fields }
+        if isinstance(machine_config, dict):
+            machine_config = { k: v for k, v in machine_config.items() if k in cls.machine_fields }
+        return cls.hash([app_config, machine_config])
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def fileDigest(filepath):
+        """ SHA-256 of a file content (e.g. a container image). None if the file does not exist."""
+        if not filepath or not os.path.isfile(filepath):
+            return None
+        digest = hashlib.sha256()
+        with open(filepath, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @classmethod
+    def key(cls, config_digest, combination, partition, environment, image_digest=None):
+        """ Cache key of a test case
+        Args:
+            config_digest (str): Digest of the benchmark and machine configurations
+            combination (dict): Parameter values of the test case
+            partition (str): Partition name
+            environment (str): Programming environment name
+            image_digest (str): Digest of the container image, if any
+        """
+        return cls.hash({
+            "config": config_digest, "parameters": combination, "partition": partition,
+            "environment": environment, "image": image_digest
+        })
+
+    def entryDir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, key):
+        """ Returns the cached test case, or None"""
+        filepath = os.path.join(self.entryDir(key), "testcase.json")
+        if not os.path.exists(filepath):
+            return None
+        with open(filepath, "r") as f:
+            return json.load(f)
+
+    def has(self, key):
+        return os.path.exists(os.path.join(self.entryDir(key), "testcase.json"))
+
+    @classmethod
+    def artefacts(cls, hashcode, dirpath):
+        """ Files of a test case (named after its hashcode) in the artefact directories of dirpath, as relative paths"""
+        files = []
+        for artefact_dir in cls.artefact_dirs:
+            if not os.path.isdir(os.path.join(dirpath, artefact_dir)):
+                continue
+            for filename in sorted(os.listdir(os.path.join(dirpath, artefact_dir))):
+                if os.path.splitext(filename)[0] == hashcode:
+                    files.append(os.path.join(artefact_dir, filename))
+        return files
+
+    @staticmethod
+    def copyFiles(files, source_dir, destination_dir):
+        for relpath in files:
+            os.makedirs(os.path.dirname(os.path.join(destination_dir, relpath)), exist_ok=True)
+            shutil.copy2(os.path.join(source_dir, relpath), os.path.join(destination_dir, relpath))
+
+    def store(self, testcase, report_folder_path):
+        """ Stores a test case and its files from the report folder"""
+        entry_dir = self.entryDir(testcase["cache_key"])
+        os.makedirs(entry_dir, exist_ok=True)
+        self.copyFiles(self.artefacts(testcase.get("hashcode"), report_folder_path), report_folder_path, entry_dir)
+        with open(os.path.join(entry_dir, "testcase.json"), "w") as f:
+            json.dump(testcase, f)
+
+    def restore(self, key, report_folder_path):
+        """ Copies the files of a cached test case to the report folder
+        Returns:
+            dict: The cached test case, or None if not cached
+        """
+        testcase = self.get(key)
+        if testcase is None:
+            return None
+        self.copyFiles(self.artefacts(testcase.get("hashcode"), self.entryDir(key)), self.entryDir(key), report_folder_path)
+        return testcase
+
+    def update(self, report_folder_path):
+        """ Merges cached results into the report of a campaign (replacing test cases skipped because they were cached), and stores new passed results.
+        Returns:
+            tuple[int,int]: Number of restored and stored test cases
+        """
+        report_filepath = os.path.join(report_folder_path, "reframe_report.json")
+        with open(report_filepath, "r") as f:
+            report = json.load(f)
+
+        restored, stored = 0, 0
+        for run in report.get("runs", []):
+            for i, testcase in enumerate(run.get("testcases", [])):
+                key = testcase.get("cache_key")
+                if not key:
+                    continue
+                if testcase.get("result") == "skip":
+                    cached = self.restore(key, report_folder_path)
+                    if cached is None:
+                        continue
+                    run["testcases"][i] = cached
+                    if run.get("num_skipped"):
+                        run["num_skipped"] -= 1
+                    restored += 1
+                elif testcase.get("result") == "pass":
+                    self.store(testcase, report_folder_path)
+                    stored += 1
+
+        session_info = report.get("session_info", {})
+        if restored and session_info.get("num_skipped"):
+            session_info["num_skipped"] = max(session_info["num_skipped"] - restored, 0)
+
+        with open(report_filepath, "w") as f:
+            json.dump(report, f)
+        return restored, stored
@@ -0,0 +1,140 @@
+import numpy as np
+from math import prod
+
+
+# Primitive polynomials (degree s, coefficients a) and initial direction numbers m, for dimensions 2 to 21 (Joe & Kuo)
+SOBOL_DIRECTIONS = [
+    (1, 0, [1]),
+    (2, 1, [1,3]),
+    (3, 1, [1,3,1]),
+    (3, 2, [1,1,1]),
+    (4, 1, [1,1,3,3]),
+    (4, 4, [1,3,5,13]),
+    (5, 2, [1,1,5,5,17]),
+    (5, 4, [1,1,5,5,5]),
+    (5, 7, [1,1,7,11,19]),
+    (5, 11, [1,1,5,1,1]),
+    (5, 13, [1,1,1,3,11]),
+    (5, 14, [1,3,5,5,31]),
+    (6, 1, [1,3,3,9,7,49]),
+    (6, 13, [1,1,1,15,21,21]),
+    (6, 16, [1,3,1,13,27,49]),
+    (6, 19, [1,1,1,15,7,5]),
+    (6, 22, [1,3,1,15,13,25]),
+    (6, 25, [1,1,5,5,19,61]),
+    (7, 1, [1,3,7,11,23,15,103]),
+    (7, 4, [1,3,7,13,13,15,69]),
+]
+
+
+class Sampler:
+    """ Abstract class for samplers, selecting a fixed number of well-spread combinations of the parameter space.
+    Points are drawn in the unit hypercube (one dimension per parameter) and mapped to parameter values.
+    Duplicated and invalid combinations (regarding parameter conditions) are rejected until enough combinations are found.
+    """
+    max_draws_factor = 100
+
+    def __init__(self, sampling_config):
+        """
+        Args:
+            sampling_config (Sampling). object from the pydantic schema representing the sampling
+        """
+        self.method = sampling_config.method
+        self.n_samples = sampling_config.n_samples
+        self.seed = sampling_config.seed
+
+    def points(self, rng, dimension):
+        """ Pure virtual generator of points in [0,1)^dimension"""
+        raise NotImplementedError("This is a pure virtual method that should be overriden by inherited classes")
+
+    def sample(self, parameter_handler):
+        """ Selects combinations of the parameter handler space
+        Args:
+            parameter_handler (ParameterHandler): Handler containing the parameter values and conditions
+        Returns:
+            list[dict]: Selected combinations, at most n_samples. Fewer combinations are returned if not enough valid ones are found.
+        """
+        names = list(parameter_handler.parameters.keys())
+        lengths = np.array([len(parameter_handler.parameters[name]) for name in names], dtype=int)
+
+        if prod(lengths.tolist()) <= self.n_samples:
+            return list(parameter_handler.constrainedProduct())
+
+        rng = np.random.default_rng(self.seed)
+        selected, seen = [], set()
+        for draw, point in enumerate(self.points(rng, len(names))):
+            if draw >= self.n_samples * self.max_draws_factor:
+                break
+            indices = tuple(np.minimum((np.asarray(point) * lengths).astype(int), lengths - 1).tolist())
+            if indices in seen:
+                continue
+            seen.add(indices)
+            combination = { name: parameter_handler.parameters[name][i] for name, i in zip(names, indices) }
+            if parameter_handler.isValid(combination):
+                selected.append(combination)
+                if len(selected) == self.n_samples:
+                    break
+        return selected
+
+
+class RandomSampler(Sampler):
+    """ Uniform random sampling"""
+    def points(self, rng, dimension):
+        while True:
+            yield rng.random(dimension)
+
+
+class LatinHypercubeSampler(Sampler):
+    """ Latin hypercube sampling: each batch of n_samples points has exactly one point per stratum of every dimension"""
+    def points(self, rng, dimension):
+        while True:
+            strata = np.array([rng.permutation(self.n_samples) for _ in range(dimension)]).T
+            yield from (strata + rng.random((self.n_samples, dimension))) / self.n_samples
+
+
+class SobolSampler(Sampler):
+    """ Sobol low-discrepancy sequence, randomized by a digital shift depending on the seed"""
+    bits = 32
+
+    @classmethod
+    def directionNumbers(cls, dimension):
+        if dimension > len(SOBOL_DIRECTIONS) + 1:
+            raise ValueError(f"Sobol sampling is only implemented up to {len(SOBOL_DIRECTIONS)+1} parameters ({dimension}). Use lhs or random sampling instead.")
+        directions = [[1 << (cls.bits-1-k) for k in range(cls.bits)]]
+        for s, a, m in SOBOL_DIRECTIONS[:dimension-1]:
+            v = [m[k] << (cls.bits-1-k) for k in range(s)]
+            for k in range(s, cls.bits):
+                value = v[k-s] ^ (v[k-s] >> s)
+                for i in range(1, s):
+                    if (a >> (s-1-i)) & 1:
+                        value ^= v[k-i]
+                v.append(value)
+            directions.append(v)
+        return np.array(directions, dtype=np.uint64)
+
+    def points(self, rng, dimension):
+        directions = self.directionNumbers(dimension)
+        x = rng.integers(0, 1 << self.bits, size=dimension, dtype=np.uint64)
+        index = 0
+        while True:
+            yield x / float(1 << self.bits)
+            # Gray code ordering: flip the direction of the lowest zero bit of the index
+            c = (~index & (index + 1)).bit_length() - 1
+            if c >= self.bits:
+                return
+            x = x ^ directions[:, c]
+            index += 1
+
+
+class SamplerFactory:
+    """ Factory class to create samplers from the sampling configuration"""
+    @staticmethod
+    def create(sampling_config):
+        if sampling_config.method == "lhs":
+            return LatinHypercubeSampler(sampling_config)
+        elif sampling_config.method == "sobol":
+            return SobolSampler(sampling_config)
+        elif sampling_config.method == "random":
+            return RandomSampler(sampling_config)
+        else:
+            raise ValueError(f"Unknown sampling method {sampling_config.method}")
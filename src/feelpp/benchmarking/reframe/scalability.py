@@ -1,6 +1,10 @@
 import reframe.utility.sanity as sn
-import os, re,json, numbers
+import os, re, numbers, mmap
+import numpy as np
 from feelpp.benchmarking.reframe.config.configReader import TemplateProcessor
+from feelpp.benchmarking.reframe.jsonPaths import JsonPathPlan, resolveJsonFile
+from feelpp.benchmarking.reframe.parseCache import PARSE_CACHE, readText
+from feelpp.benchmarking.reframe.customVariables import CustomVariableGraph, aggregate
 
 
 class StringNumber(float):
@@ -21,6 +25,18 @@ class StringNumber(float):
     def __ge__(self, other): return self.value
     def __gt__(self, other): return self.value
 
+SUMMARIES = {
+    "min": np.min,
+    "max": np.max,
+    "mean": np.mean,
+    "sum": np.sum,
+    "std": np.std,
+    "median": np.median,
+    "first": lambda a: a[0],
+    "last": lambda a: a[-1],
+    "count": lambda a: np.int64(a.size)
+}
+
 class Extractor:
     def __init__(self,filepath,stage_name, units):
         self.filepath = filepath
@@ -60,27 +76,133 @@ class Extractor:
         columns,vars = self._extractVariables()
         return self._getPerfVars(columns,vars)
 
+    def extractArrays(self,summary):
+        """ Extracts each column as a single array instead of one performance variable per cell.
+        Only the summary statistics of numeric columns are registered as performance variables, named {stage}_{col}_{stat}
+        Args:
+            summary (list[str]): Statistics to register (keys of SUMMARIES)
+        Returns:
+            tuple(dict(str,sn.deferrable function), dict(str,np.ndarray)): Summary performance variables and arrays, by variable name
+        """
+        columns,vars = self._extractVariables()
+        rows = [[sn.evaluate(v) for v in sn.evaluate(row)] for row in sn.evaluate(vars)]
+        perf_variables = {}
+        arrays = {}
+        for i, col in enumerate(columns):
+            name = f"{self.stage_name}_{col}" if self.stage_name else col
+            values = [row[i] for row in rows]
+            if not all(isinstance(v,numbers.Number) for v in values):
+                arrays[name] = np.asarray([str(v) for v in values])
+                continue
+            arrays[name] = np.asarray(values,dtype=float)
+            perf_variables.update(self._summarize(name, col, arrays[name], summary))
+        return perf_variables, arrays
+
+    def _summarize(self, name, col, array, summary):
+        """ Summary performance variables of a numeric array, named {name}_{stat}"""
+        if array.size == 0:
+            return {}
+        unit = self.units.get(col, self.units["*"])
+        return {
+            f"{name}_{stat}" : sn.make_performance_function(
+                sn.defer(SUMMARIES[stat](array).item()), unit = "" if stat == "count" else unit
+            )
+            for stat in summary
+        }
+
+class ColumnTable:
+    """ Column store of a delimited scalability file (csv, tsv), parsed in a single pass and indexed by its key column (column 0).
+    Parsed tables are kept in the process-wide parse cache, so all test cases of a sweep reading the same file parse it once.
+    """
+    _number_regex = re.compile(r'^-?\d+(\.\d+)?([eE][-+]?\d+)?$')
+
+    def __init__(self, columns, rows):
+        """
+        Args:
+            columns (list[str]): Column names, the first one being the key column
+            rows (list[list]): Table rows, all of the same length as columns
+        """
+        self.columns = columns
+        self.data = {col : [row[j] for row in rows] for j,col in enumerate(columns)}
+        self.nb_rows = len(rows)
+        self.index = {}
+        if columns:
+            for i,key in enumerate(self.data[columns[0]]):
+                self.index.setdefault(self.normalizeKey(key),i)
+
+    @staticmethod
+    def normalizeKey(key):
+        """ Normalizes a key so that 32, 32.0 and "32" point to the same row """
+        try:
+            return float(key)
+        except (TypeError,ValueError):
+            return str(key).strip()
+
+    @classmethod
+    def _castCell(cls,cell):
+        return float(cell) if cls._number_regex.match(cell) else cell
+
+    @classmethod
+    def parseTsv(cls,filepath):
+        """ Parses a whitespace separated file whose header line is prefixed by '# '. Rows not matching the header length are ignored."""
+        with open(filepath,"r") as f:
+            header = f.readline()
+            columns = re.sub(r"\s+"," ",header.replace("# ","")).strip().split(" ")
+            rows = []
+            for line in f:
+                cells = line.split()
+                if len(cells) != len(columns) or cells[0].startswith("#"):
+                    continue
+                rows.append([cells[0]] + [Extractor._tryCastFloat(cell) for cell in cells[1:]])
+        return cls(columns,rows)
+
+    @classmethod
+    def parseCsv(cls,filepath):
+        """ Parses a comma separated file. Empty lines and empty cells are ignored."""
+        rows = []
+        with open(filepath,"r") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                rows.append([cls._castCell(cell.strip()) for cell in line.split(",") if cell.strip()])
+        if not rows:
+            return cls([],[])
+        columns = [str(col) for col in rows[0]]
+        assert all( len(columns) == len(row) for row in rows[1:] ), f"CSV File {filepath} is incorrectly formatted"
+        return cls(columns,rows[1:])
+
+    @classmethod
+    def load(cls,filepath,format):
+        """ Returns the parsed table of a file, re-parsing it only if it changed on disk since it was last loaded
+        Args:
+            filepath (str): Path of the file to parse
+            format (str): "csv" or "tsv"
+        """
+        parsers = { "csv":cls.parseCsv, "tsv":cls.parseTsv }
+        if format not in parsers:
+            raise NotImplementedError(f"Format {format} cannot be loaded as a table")
+        return PARSE_CACHE.get(filepath,format,parsers[format])
+
+    def row(self,key):
+        """ Returns the first row whose key column matches the given key"""
+        position = self.index.get(self.normalizeKey(key))
+        if position is None:
+            raise ValueError(f"Index {key} not found in column {self.columns[0] if self.columns else None}")
+        return [self.data[col][position] for col in self.columns]
+
+    def rows(self):
+        return [list(row) for row in zip(*(self.data[col] for col in self.columns))]
+
+
 class TsvExtractor(Extractor):
     def __init__(self,filepath,stage_name,units,index):
         super().__init__(filepath,stage_name,units)
         self.index = index
 
-    def _getFileContent(self):
-        with open(self.filepath,"r") as f:
-            content = f.readlines()
-        return content
-
     def _extractVariables(self):
-        content = self._getFileContent()
+        table = ColumnTable.load(self.filepath,"tsv")
         #WARNING: This assumes that index is in column 0
-        columns = re.sub(r"\s+"," ",content[0].replace("# ","")).strip().split(" ")
-        vars = sn.extractall_s(
-            patt=rf'^{self.index}[\s]+' + r'([0-9e\-\+\.]+)[\s]+'*(len(columns)-1),
-            string="\n".join(content[1:]),
-            conv=float,
-            tag=range(1,len(columns))
-        )[0]
-        return columns[1:],sn.defer([vars])
+        return table.columns[1:],sn.defer([table.row(self.index)[1:]])
 
 
 class CsvExtractor(Extractor):
@@ -88,67 +210,152 @@ class CsvExtractor(Extractor):
         super().__init__(filepath, stage_name, units)
 
     def _extractVariables(self):
-        number_regex = re.compile(r'^-?\d+(\.\d+)?([eE][-+]?\d+)?$')
-        vars = sn.extractall(
-            r'^(?!\s*$)(.*?)[\s\r\n]*$',
-            self.filepath,
-            0,
-            conv=lambda x: [float(col.strip()) if number_regex.match(col.strip()) else col.strip() for col in x.split(',') if col.strip()]
-        )
-        columns = vars[0]
-        vars = vars[1:]
-        assert all ( len(columns.evaluate()) == len(row) for row in vars), f"CSV File {self.filepath} is incorrectly formatted"
-        return columns,vars
+        table = ColumnTable.load(self.filepath,"csv")
+        return table.columns,sn.defer(table.rows())
 
 
-class JsonExtractor(Extractor):
-    def __init__(self, filepath, stage_name, units, variables_path):
+class BinaryTableReader:
+    """ Readers of binary columnar formats. Only the requested columns are read (all of them if none is given),
+    and files are memory-mapped when the format allows it.
+    Each reader returns a dictionary of 1D arrays, by column name.
+    """
+    @staticmethod
+    def _requireModule(module_name, format):
+        try:
+            return __import__(module_name, fromlist=["_"])
+        except ImportError:
+            raise ImportError(f"{module_name} is required to read {format} files (pip install feelpp-benchmarking[formats])")
+
+    @staticmethod
+    def _select(available, columns, filepath):
+        missing = [col for col in columns if col not in available]
+        if missing:
+            raise ValueError(f"Columns {missing} not found in {filepath}")
+        return columns or list(available)
+
+    @classmethod
+    def readNpy(cls, filepath, columns):
+        """ Structured arrays give one column per field. Plain arrays give one column per array column, named col_0, col_1, ..."""
+        array = np.load(filepath, mmap_mode="r")
+        if array.dtype.names:
+            return { col : array[col] for col in cls._select(array.dtype.names, columns, filepath) }
+        array = array.reshape(array.shape[0],-1) if array.ndim > 0 else array.reshape(1,1)
+        available = [f"col_{j}" for j in range(array.shape[1])]
+        return { col : array[:,available.index(col)] for col in cls._select(available, columns, filepath) }
+
+    @classmethod
+    def readNpz(cls, filepath, columns):
+        with np.load(filepath) as f:
+            return { col : f[col].ravel() for col in cls._select(f.files, columns, filepath) }
+
+    @classmethod
+    def readParquet(cls, filepath, columns):
+        parquet = cls._requireModule("pyarrow.parquet","parquet")
+        table = parquet.read_table(filepath, columns=columns or None, memory_map=True)
+        return { col : table.column(col).to_numpy() for col in table.column_names }
+
+    @classmethod
+    def readArrow(cls, filepath, columns):
+        pa = cls._requireModule("pyarrow","arrow")
+        ipc = cls._requireModule("pyarrow.ipc","arrow")
+        with pa.memory_map(filepath,"r") as source:
+            try:
+                table = ipc.open_file(source).read_all()
+            except pa.ArrowInvalid:
+                source.seek(0)
+                table = ipc.open_stream(source).read_all()
+        return { col : table.column(col).to_numpy() for col in cls._select(table.column_names, columns, filepath) }
+
+    @classmethod
+    def readHdf5(cls, filepath, columns):
+        """ Each top-level dataset is a column"""
+        h5py = cls._requireModule("h5py","hdf5")
+        with h5py.File(filepath,"r") as f:
+            available = [name for name, item in f.items() if isinstance(item, h5py.Dataset)]
+            return { col : np.asarray(f[col][()]).ravel() for col in cls._select(available, columns, filepath) }
+
+    @classmethod
+    def read(cls, filepath, format, columns):
+        readers = { "npy":cls.readNpy, "npz":cls.readNpz, "parquet":cls.readParquet, "arrow":cls.readArrow, "hdf5":cls.readHdf5 }
+        if format not in readers:
+            raise NotImplementedError(f"Format {format} is not a binary table format")
+        return readers[format](filepath, columns)
+
+    @staticmethod
+    def toColumns(arrays):
+        """ Checks that the column arrays have the same length and decodes byte string columns. Numeric columns are kept as they are read (memory-mapped if possible)."""
+        columns = {}
+        for col, array in arrays.items():
+            array = np.asanyarray(array).reshape(-1)
+            if array.dtype.kind == "S":
+                array = np.char.decode(array)
+            elif array.dtype.kind == "O":
+                array = np.asarray([v.decode() if isinstance(v,bytes) else v for v in array], dtype=object)
+            columns[col] = array
+        lengths = { array.shape[0] for array in columns.values() }
+        if len(lengths) > 1:
+            raise ValueError(f"Columns have different lengths : { {col:array.shape[0] for col,array in columns.items()} }")
+        return columns
+
+
+class BinaryTableExtractor(Extractor):
+    """ Extracts binary columnar files. Columns are kept as numpy arrays, and only the cells registered as performance variables are converted to Python values."""
+    def __init__(self, filepath, stage_name, units, format, columns=None):
         super().__init__(filepath, stage_name, units)
-        self.variables_path = variables_path
+        self.format = format
+        self.columns = columns or []
 
-    def _getFileContent(self):
-        with open(self.filepath,"r") as f:
-            content = json.load(f)
-        return content
+    def _loadColumns(self):
+        return PARSE_CACHE.get(
+            self.filepath, (self.format,tuple(self.columns)),
+            lambda filepath: BinaryTableReader.toColumns(BinaryTableReader.read(filepath,self.format,self.columns))
+        )
 
-    def _recursiveExtract(self,varpath, content, fields=None, prefix=""):
-        """ Extract values from a dictionary following a path (varpath) containing multiple wildcards"""
-        if fields is None:
-            fields = {}
+    @staticmethod
+    def _isNumeric(array):
+        return array.dtype.kind in "biuf"
 
-        splitted_keys = varpath.split("*", 1)
-        left_keys = splitted_keys[0].strip(".").split(".")
+    def extract(self):
+        columns = self._loadColumns()
+        nb_rows = next(iter(columns.values())).shape[0] if columns else 0
+        perf_variables = {}
+        for line in range(nb_rows):
+            for col, array in columns.items():
+                perfvar_name = f"{self.stage_name}_{col}" if self.stage_name else col
+                if nb_rows > 1:
+                    perfvar_name = f"{perfvar_name}_{line}"
+                val = array[line]
+                val = val.item() if self._isNumeric(array) else StringNumber(str(val))
+                perf_variables[perfvar_name] = sn.make_performance_function(sn.defer(val),unit=self.units.get(col, self.units["*"]))
+        return perf_variables
 
-        j = content
-        for left_key in left_keys:
-            if left_key:
-                j = j[left_key]
+    def extractArrays(self, summary):
+        perf_variables = {}
+        arrays = {}
+        for col, array in self._loadColumns().items():
+            name = f"{self.stage_name}_{col}" if self.stage_name else col
+            if not self._isNumeric(array):
+                arrays[name] = array.astype(str)
+                continue
+            arrays[name] = np.asarray(array, dtype=float)
+            perf_variables.update(self._summarize(name, col, arrays[name], summary))
+        return perf_variables, arrays
 
-        if len(splitted_keys) == 1:
-            fields[left_keys[-1]] = j
-        else:
-            right_keys = splitted_keys[1].strip(".")
-            if "*" in right_keys:
-                for wildcard, subcontent in j.items():
-                    self._recursiveExtract(right_keys, subcontent, fields, prefix=f"{prefix}{wildcard}.")
-            else:
-                right_keys = right_keys.split(".")
-                for wildcard, subcontent in j.items():
-                    value = subcontent
-                    for right_key in right_keys:
-                        if right_key:
-                            value = value[right_key]
-                    fields[f"{prefix}{wildcard}"] = value
 
-        return fields
+class JsonExtractor(Extractor):
+    def __init__(self, filepath, stage_name, units, variables_path):
+        """
+        Args:
+            variables_path (list[str|JsonPathPlan]): Path expressions, or plans already compiled from them
+        """
+        super().__init__(filepath, stage_name, units)
+        self.plans = [path if isinstance(path,JsonPathPlan) else JsonPathPlan(path) for path in variables_path]
 
     def _extractVariables(self):
         items = {}
-        content = self._getFileContent()
-        for varpath in self.variables_path:
-            fields = self._recursiveExtract(varpath,content)
-            fields = TemplateProcessor.flattenDict(fields)
-            items.update(fields)
+        format = ("json",tuple(plan.expression for plan in self.plans))
+        for fields in PARSE_CACHE.get(self.filepath,format,lambda filepath: resolveJsonFile(filepath,self.plans)):
+            items.update(TemplateProcessor.flattenDict(fields))
         return items.keys(),sn.defer([[sn.defer(v) for v in items.values()]])
 
 
@@ -167,7 +374,7 @@ class RegexExtractor(Extractor):
             tags = self.variable_value_group
             conv = self._tryCastFloat
 
-        raw_results = sn.extractall(rf"{self.pattern}", self.filepath, tags, conv=conv)
+        raw_results = sn.extractall_s(rf"{self.pattern}", PARSE_CACHE.get(self.filepath,"text",readText), tags, conv=conv)
 
         if self.variable_name_group:
             columns = [x[0].strip() for x in raw_results]
@@ -178,6 +385,71 @@ class RegexExtractor(Extractor):
 
         return columns, sn.defer([matches])
 
+class RegexStreamExtractor(RegexExtractor):
+    """ Regex extractor scanning a memory-mapped file in a single pass, so that very large outputs are never loaded in memory.
+    The scan can be restricted to a byte window, and stops as soon as all requested variables have been found.
+    """
+    def __init__(self, filepath, stage_name, units, pattern, variable_name_group, variable_value_group, window=None, variables=None):
+        super().__init__(filepath, stage_name, units, pattern, variable_name_group, variable_value_group)
+        self.window = window
+        self.variables = variables or []
+
+    def _getByteRange(self,size):
+        """ Computes the [start,end) byte range to scan from the window (offset, head, tail)"""
+        if not self.window:
+            return 0,size
+        start = min(self.window.offset or 0, size)
+        if self.window.tail is not None:
+            start = max(start, size - self.window.tail)
+        end = size
+        if self.window.head is not None:
+            end = min(size, start + self.window.head)
+        return start,end
+
+    @staticmethod
+    def _decode(value):
+        return value.decode("utf-8",errors="replace") if isinstance(value,bytes) else value
+
+    def _scan(self):
+        """ Returns the list of (name,value) matches (or values if no variable_name_group is given) found in the byte window"""
+        regex = re.compile(self.pattern.encode(), re.MULTILINE)
+        pending = set(self.variables)
+        results = []
+        with open(self.filepath,"rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return results
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                start,end = self._getByteRange(size)
+                for match in regex.finditer(mm,start,end):
+                    value = self._tryCastFloat(self._decode(match.group(self.variable_value_group)))
+                    if not self.variable_name_group:
+                        results.append(value)
+                        continue
+                    name = self._decode(match.group(self.variable_name_group)).strip()
+                    if self.variables:
+                        if name not in pending:
+                            continue
+                        pending.discard(name)
+                    results.append((name,value))
+                    if self.variables and not pending:
+                        break
+        return results
+
+    def _extractVariables(self):
+        window = (self.window.offset,self.window.head,self.window.tail) if self.window else None
+        format = ("regex_stream",self.pattern,self.variable_name_group,self.variable_value_group,window,tuple(self.variables))
+        raw_results = PARSE_CACHE.get(self.filepath,format,lambda filepath: self._scan())
+
+        if self.variable_name_group:
+            columns = [x[0] for x in raw_results]
+            matches = [x[1] for x in raw_results]
+        else:
+            matches = raw_results
+            columns = [f"match_{i}" for i in range(len(matches))]
+
+        return columns, sn.defer([matches])
+
 class ExtractorFactory:
     """Factory class for extractor strategies"""
     @staticmethod
@@ -192,9 +464,13 @@ class ExtractorFactory:
         elif stage.format == "tsv":
             return TsvExtractor(filepath=filepath,stage_name = stage.name,index=index, units=stage.units)
         elif stage.format == "json":
-            return JsonExtractor(filepath=filepath,stage_name = stage.name, variables_path=stage.variables_path, units=stage.units)
+            return JsonExtractor(filepath=filepath,stage_name = stage.name, variables_path=stage.variables_plan, units=stage.units)
         elif stage.format == "regex":
             return RegexExtractor(filepath=filepath,stage_name = stage.name, pattern=stage.pattern, units=stage.units, variable_name_group=stage.variable_name_group, variable_value_group=stage.variable_value_group)
+        elif stage.format in ["npy","npz","parquet","arrow","hdf5"]:
+            return BinaryTableExtractor(filepath=filepath,stage_name = stage.name, units=stage.units, format=stage.format, columns=stage.columns)
+        elif stage.format == "regex_stream":
+            return RegexStreamExtractor(filepath=filepath,stage_name = stage.name, pattern=stage.pattern, units=stage.units, variable_name_group=stage.variable_name_group, variable_value_group=stage.variable_value_group, window=stage.window, variables=stage.variables)
         else:
             raise NotImplementedError
 
@@ -206,34 +482,44 @@ class ScalabilityHandler:
         self.stages =  scalability_config.stages
         self.custom_variables = scalability_config.custom_variables
         self.stdout = stdout
+        self.arrays = {}
 
     def getPerformanceVariables(self,index=None):
         """ Opens and parses the performance variable values depending on the config setup.
         Args:
             index (numerical | string). Key/index to find in the scalability file, depending on the format.
             e.g. If a csv file is provided, and index=32. Only the row with nProcs==32 is retrieved.
+        Stages in array mode only return their summary variables, their arrays are kept in self.arrays
         """
         perf_variables = {}
+        self.arrays = {}
         for stage in self.stages:
             extractor = ExtractorFactory.create(stage,self.directory,index, self.stdout)
-            perf_variables.update( extractor.extract() )
+            if stage.arrays:
+                summary_variables, arrays = extractor.extractArrays(stage.arrays.summary)
+                perf_variables.update( summary_variables )
+                self.arrays.update( arrays )
+            else:
+                perf_variables.update( extractor.extract() )
 
         return perf_variables
 
+    def saveArrays(self,filepath):
+        """ Saves the arrays of array-mode stages in a .npz sidecar file, that can be loaded lazily (one array per variable)"""
+        if not self.arrays:
+            return
+        if not os.path.exists(os.path.dirname(filepath)):
+            os.makedirs(os.path.dirname(filepath))
+        np.savez(filepath, **self.arrays)
+
     @staticmethod
-    def aggregateCustomVar(op,column_values):
-        ops = {
-            "sum":sum,
-            "min":min,
-            "max":max,
-            "mean": lambda v : sum(v)/len(v)
-        }
-        if op not in ops:
-            raise NotImplementedError(f"Operation {op} is not implemented")
-        return ops[op](column_values)
+    def aggregateCustomVar(op,column_values,q=None):
+        return aggregate(op,column_values,q)
 
     def getCustomPerformanceVariables(self,perfvars):
-        """ Creates custom aggregated performance variables from existing ones
+        """ Creates custom performance variables from existing ones.
+        Custom variables are evaluated as arrays, in the topological order of their dependencies.
+        Multi-valued results (e.g. computed from multi-row groups) create one performance variable per row, suffixed by _{line}
         Args:
             perfvars dict(str,sn.deferrable function): Existing performance variables to use for extraction
 
@@ -241,30 +527,17 @@ class ScalabilityHandler:
             dict(str,sn.deferrable function) Dictionnary containing only the custom performance variables
         """
         custom_perfvars = {}
+        if not self.custom_variables:
+            return custom_perfvars
 
-        computed_vars = {}
-
-        def evaluateCustomVariable(custom_var):
-            if custom_var.name in computed_vars:
-                return computed_vars[custom_var.name]
-
-            column_values = []
-            for col in custom_var.columns:
-                if col in perfvars:
-                    column_values.append(perfvars[col].evaluate())
-                elif col in custom_perfvars:
-                    column_values.append(custom_perfvars[col])
-                else:
-                    raise ValueError(f"Custom variable not found : {custom_var.name}")
-
-            custom_var_value = self.aggregateCustomVar(custom_var.op,column_values)
-            computed_vars[custom_var.name] = custom_var_value
-            return custom_var_value
-
+        values = CustomVariableGraph(self.custom_variables).evaluate(perfvars)
 
         for custom_var in self.custom_variables:
-            custom_perfvars[custom_var.name] = sn.make_performance_function(
-                sn.defer(evaluateCustomVariable(custom_var)),unit=custom_var.unit
-            )
+            value = values[custom_var.name]
+            if value.size == 1:
+                custom_perfvars[custom_var.name] = sn.make_performance_function(sn.defer(value.item()),unit=custom_var.unit)
+            else:
+                for line,v in enumerate(value.tolist()):
+                    custom_perfvars[f"{custom_var.name}_{line}"] = sn.make_performance_function(sn.defer(v),unit=custom_var.unit)
 
-        return custom_perfvars
\ No newline at end of file
+        return custom_perfvars
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, field_validator, model_validator, RootModel, ConfigDict, ValidationError
 from typing import Literal, Union, Optional, List, Dict
-from feelpp.benchmarking.reframe.schemas.parameters import Parameter
+from feelpp.benchmarking.reframe.schemas.parameters import Parameter, Sampling
 from feelpp.benchmarking.reframe.schemas.resources import Resources
 from feelpp.benchmarking.reframe.schemas.scalability import Scalability
 from feelpp.benchmarking.reframe.schemas.platform import Platform
@@ -18,9 +18,77 @@ class AdditionalFiles(BaseModel):
     custom_logs: Optional[List[str]] = []
 
 
+def validateTimeFormat(v):
+    """ Checks that a duration follows the <days>-<hours>:<minutes>:<seconds> format"""
+    pattern = r'^\d+-\d{1,2}:\d{1,2}:\d{1,2}$'
+    if not re.match(pattern, v):
+        raise ValueError(f"Time is not properly formatted (<days>-<hours>:<minutes>:<seconds>) : {v}")
+    days,time = v.split("-")
+    hours,minutes,seconds = time.split(":")
+
+    assert int(days) >= 0
+    assert 24>int(hours)>=0
+    assert 60>int(minutes)>=0
+    assert 60>int(seconds)>=0
+
+    return v
+
+class TimeoutPolicy(BaseModel):
+    safety_factor: Optional[float] = 1.5
+    floor: Optional[str] = "0-00:05:00"
+    ceiling: Optional[str] = None
+
+    @field_validator("safety_factor",mode="after")
+    @classmethod
+    def checkSafetyFactor(cls,v):
+        if v < 1:
+            raise ValueError(f"The safety factor should be greater or equal than 1 ({v})")
+        return v
+
+    @field_validator("floor","ceiling",mode="before")
+    @classmethod
+    def validateTimes(cls,v):
+        if v is None:
+            return v
+        return validateTimeFormat(v)
+
+
+class Prepare(BaseModel):
+    keys: List[str]
+    command: str
+    tasks: Optional[int] = 1
+    timeout: Optional[str] = "0-00:10:00"
+
+    @field_validator("timeout",mode="before")
+    @classmethod
+    def validateTimeout(cls,v):
+        return validateTimeFormat(v)
+
+    @field_validator("keys",mode="after")
+    @classmethod
+    def checkKeys(cls,v):
+        if not v:
+            raise ValueError("The prepare stage should depend on at least one parameter")
+        return v
+
+    @model_validator(mode="after")
+    def checkCommandPlaceholders(self):
+        """ The command can only use {{prepare.directory}} and the placeholders of key parameters (or of their subparameters),
+        as its outputs are shared by all test cases having the same key values"""
+        for placeholder in re.findall(r"{{([^{}]+)}}", self.command):
+            placeholder = placeholder.strip()
+            if placeholder == "prepare.directory":
+                continue
+            match = re.match(r"^parameters\.(.+)\.value$", placeholder)
+            if not match or not any(match.group(1) == key or match.group(1).startswith(f"{key}.") for key in self.keys):
+                raise ValueError(f"The prepare command can only use {{{{prepare.directory}}}} and placeholders of its keys ({self.keys}), got {{{{{placeholder}}}}}")
+        return self
+
+
 class ConfigFile(BaseModel):
     executable: str
     timeout: Optional[str] = "0-00:05:00"
+    timeout_policy: Optional[TimeoutPolicy] = None
     resources: Optional[Resources] = Resources(tasks=1, exclusive_access=False)
     platforms:Optional[Dict[str,Platform]] = {"builtin":Platform()}
     use_case_name: str
@@ -31,6 +99,8 @@ class ConfigFile(BaseModel):
     scalability: Optional[Scalability] = None
     sanity: Optional[Sanity] = Sanity()
     parameters: Optional[List[Parameter]] = []
+    sampling: Optional[Sampling] = None
+    prepare: Optional[Prepare] = None
     additional_files: Optional[AdditionalFiles] = AdditionalFiles()
     json_report: Optional[Union[JsonReportSchemaWithDefaults,List[DefaultPlot]]] = JsonReportSchemaWithDefaults()
 
@@ -40,6 +110,13 @@ class ConfigFile(BaseModel):
             return self.model_extra[item]
         raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{item}'")
 
+    def refreshDefaults(self, original):
+        """ Computes time-dependent defaults (the report datetime) again, for configs restored from the config cache
+        Returns:
+            bool: True if the config changed
+        """
+        return self.json_report.refreshDatetime(original.json_report)
+
     @field_validator("json_report", mode="before")
     @classmethod
     def coerce_report(cls, v):
@@ -52,18 +129,7 @@ class ConfigFile(BaseModel):
     @field_validator("timeout",mode="before")
     @classmethod
     def validateTimeout(cls,v):
-        pattern = r'^\d+-\d{1,2}:\d{1,2}:\d{1,2}$'
-        if not re.match(pattern, v):
-            raise ValueError(f"Time is not properly formatted (<days>-<hours>:<minutes>:<seconds>) : {v}")
-        days,time = v.split("-")
-        hours,minutes,seconds = time.split(":")
-
-        assert int(days) >= 0
-        assert 24>int(hours)>=0
-        assert 60>int(minutes)>=0
-        assert 60>int(seconds)>=0
-
-        return v
+        return validateTimeFormat(v)
 
     @model_validator(mode="after")
     def checkPlotAxisParameters(self):
@@ -89,6 +155,17 @@ class ConfigFile(BaseModel):
 
         return self
 
+    @model_validator(mode="after")
+    def checkPrepareKeys(self):
+        """ Checks that the prepare stage depends on existing parameters"""
+        if not self.prepare:
+            return self
+        parameter_names = [outer.name for outer in self.parameters]
+        for key in self.prepare.keys:
+            if key.split(".")[0] not in parameter_names:
+                raise ValueError(f"Prepare key {key} is not a parameter ({parameter_names})")
+        return self
+
     @field_validator("platforms",mode="before")
     @classmethod
     def checkPlatforms(cls,v):
@@ -1,5 +1,6 @@
-from pydantic import model_validator, ValidationError, field_validator
+from pydantic import model_validator, ValidationError, field_validator, PrivateAttr
 from typing import List,Dict, Optional
+from datetime import datetime
 from feelpp.benchmarking.json_report.figures.schemas.plot import Plot, PlotAxis
 from feelpp.benchmarking.json_report.schemas.jsonReport import JsonReportSchema
 
@@ -33,6 +34,10 @@ DEFAULT_DATA = [
 class JsonReportSchemaWithDefaults(JsonReportSchema):
     data: List[Dict] = []
 
+    #Whether the datetime and title were computed when the configuration was validated
+    _default_datetime: bool = PrivateAttr(default=False)
+    _default_title: bool = PrivateAttr(default=False)
+
     @staticmethod
     def addToDefault(v:list):
         if not v:
@@ -97,8 +102,27 @@ class JsonReportSchemaWithDefaults(JsonReportSchema):
 
     @model_validator(mode="after")
     def setDefaultTitle(self):
+        self._default_datetime = "datetime" not in self.model_fields_set
         if self.title is None:
             self.title = f"{self.datetime}"
+            self._default_title = True
 
         return self
 
+    def refreshDatetime(self, original):
+        """ Sets the datetime to the current time, and the default title with it, unless they are provided by the configuration.
+        Used when the report configuration is restored from the config cache instead of being validated again.
+        Args:
+            original (JsonReportSchema): Report configuration as loaded from the configuration files
+        Returns:
+            bool: True if the datetime changed
+        """
+        if not original._default_datetime:
+            return False
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        if original._default_title:
+            self.title = now
+        changed = now != self.datetime
+        self.datetime = now
+        return changed
+
@@ -22,6 +22,38 @@ class Container(BaseModel):
         return v
 
 
+class Bundling(BaseModel):
+    """ Grouping of compatible test cases (same partition, environment and number of nodes) into a single scheduler allocation"""
+    max_cases: Optional[int] = 32
+    concurrent_steps: Optional[int] = 1
+
+    @field_validator("max_cases","concurrent_steps",mode="after")
+    @classmethod
+    def checkPositive(cls,v):
+        if v <= 0:
+            raise ValueError(f"Bundling values should be strictly positive ({v})")
+        return v
+
+
+class JobArrayConfig(BaseModel):
+    """ Submission of test cases with identical resources as a single scheduler job array"""
+    max_tasks: Optional[int] = 1000
+    max_concurrent: Optional[int] = None
+
+    @field_validator("max_tasks","max_concurrent",mode="after")
+    @classmethod
+    def checkPositive(cls,v):
+        if v is not None and v <= 0:
+            raise ValueError(f"Job array values should be strictly positive ({v})")
+        return v
+
+
+class NodeLocalStaging(BaseModel):
+    """ Copy of the container image and input file dependencies to node-local storage at job start"""
+    directory: Optional[str] = "/tmp"
+    image: Optional[bool] = True
+    inputs: Optional[bool] = True
+
 class MachineConfig(BaseModel):
     machine:str
     targets:Optional[Union[str,List[str]]] = None
@@ -31,10 +63,14 @@ class MachineConfig(BaseModel):
     reports_base_dir: Optional[str] = "./reports/"
     input_dataset_base_dir:Optional[str] = None
     input_user_dir:Optional[str] = None
+    input_store_max_size:Optional[float] = None
     output_app_dir:str
     access:Optional[List[str]] = []
     env_variables:Optional[Dict] = {}
     containers:Optional[Dict[str,Container]] = {}
+    bundling:Optional[Bundling] = None
+    job_array:Optional[JobArrayConfig] = None
+    node_local_staging:Optional[NodeLocalStaging] = None
 
     platform:Optional[Literal["apptainer","docker","builtin"]] = "builtin"
     partitions: Optional[List[str]] = []
@@ -44,6 +80,12 @@ class MachineConfig(BaseModel):
     #TODO: maybe skipJsonSchema or something like that.
     environment_map: Optional[Dict[str,List[str]]] = {}
 
+    @model_validator(mode="after")
+    def checkSubmissionMode(self):
+        if self.bundling and self.job_array:
+            raise ValueError("Bundling and job arrays cannot be used at the same time")
+        return self
+
     @model_validator(mode="after")
     def parseTargets(self):
         if not self.targets:
@@ -108,6 +150,13 @@ class MachineConfig(BaseModel):
 
         return v
 
+    @field_validator("input_store_max_size",mode="after")
+    @classmethod
+    def checkInputStoreMaxSize(cls,v):
+        if v is not None and v < 0:
+            raise ValueError(f"The input store maximum size should be positive ({v})")
+        return v
+
     @model_validator(mode="after")
     def checkInputUserDir(self):
         if self.input_user_dir:
@@ -1,6 +1,6 @@
 from __future__ import annotations
 from pydantic import BaseModel, model_validator, field_validator
-from typing import  Union, Optional, List, Any, Dict
+from typing import  Union, Optional, List, Any, Dict, Literal
 
 
 class NSteps(BaseModel):
@@ -61,6 +61,46 @@ class Repeat(BaseModel):
     value: Any
     count: int
 
+class Adaptive(BaseModel):
+    """ Refinement of a scalar parameter from the results of previous campaigns"""
+    min:Union[float,int]
+    max:Union[float,int]
+    n_initial:int = 3
+    spacing:Literal["linear","geometric"] = "geometric"
+    integer:bool = True
+    perfvar:str
+    lower_is_better:bool = True
+    target:Literal["efficiency","value"] = "efficiency"
+    threshold:Optional[float] = None
+    points_per_iteration:int = 2
+    budget:int
+    history:Optional[str] = None
+
+    @field_validator("n_initial",mode="after")
+    @classmethod
+    def checkInitialPoints(cls,v):
+        if v < 2:
+            raise ValueError(f"Adaptive parameters need at least 2 initial points ({v})")
+        return v
+
+    @field_validator("points_per_iteration",mode="after")
+    @classmethod
+    def checkPositivePoints(cls,v):
+        if v <= 0:
+            raise ValueError(f"Number of points per iteration should be strictly positive ({v})")
+        return v
+
+    @model_validator(mode="after")
+    def checkBounds(self):
+        if self.min >= self.max:
+            raise ValueError("Adaptive min should be lower than max")
+        if self.spacing == "geometric" and self.min <= 0:
+            raise ValueError("Geometric adaptive spacing needs strictly positive bounds")
+        if self.budget < self.n_initial:
+            raise ValueError(f"Budget ({self.budget}) should be greater or equal than the number of initial points ({self.n_initial})")
+        return self
+
+
 class Parameter(BaseModel):
     name:str
     mode:str = None
@@ -75,6 +115,7 @@ class Parameter(BaseModel):
     repeat:Optional[Repeat] = None
     zip:Optional[List[Parameter]] = None
     geometric: Optional[Geometric] = None
+    adaptive: Optional[Adaptive] = None
 
     @model_validator(mode="after")
     def setMode(self):
@@ -92,9 +133,25 @@ class Parameter(BaseModel):
             self.mode = "sequence"
         elif self.repeat is not None:
             self.mode = "repeat"
+        elif self.adaptive is not None:
+            self.mode = "adaptive"
         else:
             raise NotImplementedError("Parameters need an implemented generator")
 
-        assert len([mode for mode in [self.linspace,self.geomspace,self.geometric,self.range,self.zip,self.sequence,self.repeat] if mode is not None]) == 1, "Parameter can only have one generator"
+        assert len([mode for mode in [self.linspace,self.geomspace,self.geometric,self.range,self.zip,self.sequence,self.repeat,self.adaptive] if mode is not None]) == 1, "Parameter can only have one generator"
+
+        return self
+
+
+class Sampling(BaseModel):
+    """ Selection of a fixed number of combinations of the parameter space"""
+    method:Literal["lhs","sobol","random"] = "lhs"
+    n_samples:int
+    seed:Optional[int] = 0
 
-        return self
\ No newline at end of file
+    @field_validator("n_samples",mode="after")
+    @classmethod
+    def checkPositiveSamples(cls,v):
+        if v <= 0:
+            raise ValueError(f"Number of samples should be strictly positive ({v})")
+        return v
@@ -5,6 +5,7 @@ import os
 class Image(BaseModel):
     url: Optional[str] = None
     filepath:str
+    checksum: Optional[str] = None
 
     @field_validator("filepath", mode="after")
     @classmethod
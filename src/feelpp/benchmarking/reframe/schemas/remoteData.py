@@ -17,9 +17,16 @@ class RemoteGirderData(BaseModel):
 
 class RemoteData(BaseRemoteData):
     girder: Optional[RemoteGirderData] = None
+    checksum: Optional[str] = None
 
     @model_validator(mode="after")
     def checkRemoteDataPlatform(self):
         if all(plat is None for plat in [self.girder]):
             raise ValueError("A remote data platform should be specified, valid options are ['girder'] ")
         return self
+
+    @model_validator(mode="after")
+    def checkChecksumResource(self):
+        if self.checksum and self.girder and not self.girder.file:
+            raise ValueError("A checksum can only be given for a single file resource")
+        return self
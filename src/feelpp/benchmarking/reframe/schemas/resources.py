@@ -1,12 +1,25 @@
-from pydantic import model_validator, BaseModel
+from pydantic import model_validator, field_validator, BaseModel
 from typing import Optional,Union
 
+class MemoryPolicy(BaseModel):
+    headroom: Optional[float] = 1.2
+
+    @field_validator("headroom",mode="after")
+    @classmethod
+    def checkHeadroom(cls,v):
+        if v < 1:
+            raise ValueError(f"The memory headroom should be greater or equal than 1 ({v})")
+        return v
+
 class Resources(BaseModel):
     tasks: Optional[Union[str,int]] = None
     tasks_per_node: Optional[Union[str,int]] = None
     gpus_per_node: Optional[Union[str,int]] = None
     nodes: Optional[Union[str,int]] = None
+    cpus_per_task: Optional[Union[str,int]] = None
+    placement: Optional[str] = None
     memory: Optional[Union[str,int]] = 0
+    memory_policy: Optional[MemoryPolicy] = None
     exclusive_access: Optional[Union[str,bool]] = True
 
     @model_validator(mode="after")
@@ -1,17 +1,52 @@
-from pydantic import model_validator,field_validator, BaseModel
+from pydantic import model_validator,field_validator, BaseModel, PrivateAttr
 from typing import Optional,Literal,Dict,Union,List
+from feelpp.benchmarking.reframe.jsonPaths import JsonPathPlan
+from feelpp.benchmarking.reframe.customVariables import CustomExpression
+
+
+FORMAT_ALIASES = { "h5":"hdf5", "feather":"arrow", "pq":"parquet" }
+
+class ByteWindow(BaseModel):
+    offset: Optional[int] = 0
+    head: Optional[int] = None
+    tail: Optional[int] = None
+
+    @model_validator(mode="after")
+    def checkWindow(self):
+        if self.head is not None and self.tail is not None:
+            raise ValueError("Only one of head or tail can be specified")
+        for field in ["offset","head","tail"]:
+            value = getattr(self,field)
+            if value is not None and value < 0:
+                raise ValueError(f"{field} should be positive ({value})")
+        return self
+
+
+class StageArrays(BaseModel):
+    summary: Optional[List[Literal["min","max","mean","sum","std","median","first","last","count"]]] = ["min","max","mean","last"]
 
 
 class Stage(BaseModel):
     name:Optional[str] = None
     filepath:str
-    format:Optional[Literal["csv","tsv","json","regex"]] = None
+    format:Optional[Literal["csv","tsv","json","regex","regex_stream","npy","npz","parquet","arrow","hdf5"]] = None
     variables_path:Optional[Union[str,List[str]]] = []
     units: Optional[Dict[str,str]] = {}
 
     pattern: Optional[str] = None
     variable_value_group: Optional[Union[str,int]] = None
     variable_name_group: Optional[Union[str,int]] = None
+    window: Optional[ByteWindow] = None
+    variables: Optional[List[str]] = []
+    arrays: Optional[StageArrays] = None
+    columns: Optional[List[str]] = []
+
+    _variables_plan: List[JsonPathPlan] = PrivateAttr(default_factory=list)
+
+    @property
+    def variables_plan(self):
+        """ Extraction plans compiled from variables_path at validation time"""
+        return self._variables_plan
 
     @field_validator("name",mode="after")
     @classmethod
@@ -20,16 +55,29 @@ class Stage(BaseModel):
             return ""
         return v
 
+    @field_validator("arrays",mode="before")
+    @classmethod
+    def parseArrays(cls,v):
+        if isinstance(v,bool):
+            return {} if v else None
+        return v
+
     @field_validator("units",mode="before")
     @classmethod
     def parseUnits(cls,v):
         v["*"] = v.get("*","s")
         return v
 
+    @field_validator("format",mode="before")
+    @classmethod
+    def normalizeFormat(cls,v):
+        return FORMAT_ALIASES.get(v,v)
+
     @model_validator(mode="after")
     def inferFormat(self):
         if not self.format:
-            self.format = self.filepath.split(".")[-1]
+            extension = self.filepath.split(".")[-1]
+            self.format = FORMAT_ALIASES.get(extension,extension)
         return self
 
     @model_validator(mode="after")
@@ -39,7 +87,8 @@ class Stage(BaseModel):
                 raise ValueError("variables_path must be specified if format == json")
             if type(self.variables_path) == str:
                 self.variables_path = [self.variables_path]
-        elif self.format == "regex":
+            self._variables_plan = [JsonPathPlan(path) for path in self.variables_path]
+        elif self.format in ["regex","regex_stream"]:
             if not self.pattern:
                 raise ValueError("regex must be specified if format == regex")
             if not self.variable_value_group:
@@ -47,14 +96,38 @@ class Stage(BaseModel):
         else:
             if self.variables_path:
                 raise ValueError("variables_path cannot be specified with other format than json")
+
+        if self.columns and self.format not in ["npy","npz","parquet","arrow","hdf5"]:
+            raise ValueError("columns can only be specified for binary formats (npy, npz, parquet, arrow, hdf5)")
+        if self.format != "regex_stream" and (self.window or self.variables):
+            raise ValueError("window and variables can only be specified if format == regex_stream")
+        if self.variables and not self.variable_name_group:
+            raise ValueError("variables require variable_name_group to be specified")
         return self
 
 class CustomVariable(BaseModel):
     name:str
-    columns:List[str]
-    op: Literal["sum","min","max","mean"]
+    columns:Optional[List[str]] = []
+    op: Optional[Literal["sum","min","max","mean","std","median","percentile","argmax","argmin","imbalance"]] = None
+    q: Optional[float] = None
+    expression: Optional[str] = None
     unit: str
 
+    @model_validator(mode="after")
+    def checkDefinition(self):
+        if self.expression:
+            if self.op or self.columns:
+                raise ValueError("expression cannot be combined with op and columns")
+            #Expressions containing placeholders are checked once they are resolved
+            if not ("{{" in self.expression or "}}" in self.expression):
+                CustomExpression.parse(self.expression)
+        else:
+            if not self.op or not self.columns:
+                raise ValueError("Either expression or (op, columns) must be specified")
+            if self.op == "percentile" and self.q is None:
+                raise ValueError("q must be specified for the percentile operation")
+        return self
+
 class Scalability(BaseModel):
     directory: Optional[str] = None
     stages: List[Stage]
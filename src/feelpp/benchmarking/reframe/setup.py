@@ -1,9 +1,20 @@
 
 from feelpp.benchmarking.reframe.parameters import ParameterHandler
 from feelpp.benchmarking.reframe.config.configReader import ConfigReader, TemplateProcessor, FileHandler
+from feelpp.benchmarking.reframe.config.configCache import ConfigCache
 from feelpp.benchmarking.reframe.schemas.benchmarkSchemas import ConfigFile
 from feelpp.benchmarking.reframe.schemas.machines import MachineConfig
 from feelpp.benchmarking.reframe.resources import ResourceHandler
+from feelpp.benchmarking.reframe.commandBuilder import CommandBuilder
+from feelpp.benchmarking.reframe.affinity import AffinityProbe
+from feelpp.benchmarking.reframe.bundling import BundleRunner
+from feelpp.benchmarking.reframe.estimator import HistoryModel, MemoryModel, flattenParams, parseTimeout
+from feelpp.benchmarking.reframe.memory import MemoryProbe
+from feelpp.benchmarking.reframe.staging import StagingStore
+from feelpp.benchmarking.reframe.nodeStaging import NodeStaging
+from feelpp.benchmarking.reframe.launchers import LauncherCommands
+from feelpp.benchmarking.reframe.prepare import PrepareStage
+from feelpp.benchmarking.reframe.resultCache import ResultCache
 
 
 import reframe as rfm
@@ -25,17 +36,21 @@ class ReframeSetup(rfm.RunOnlyRegressionTest):
     #TODO: Find a way to avoid env variables
 
     #====================== INIT READERS ==================#
+    #Readers are restored from the config cache filled by the launcher, instead of being validated again in each ReFrame process
+    config_cache = ConfigCache.fromEnvironment()
     machine_reader = ConfigReader(
         str(os.environ.get("MACHINE_CONFIG_FILEPATH")),
         MachineConfig, "machine",
-        "--dry-run" in sys.argv
+        "--dry-run" in sys.argv,
+        cache=config_cache
     )
 
     app_reader = ConfigReader(
         str(os.environ.get("APP_CONFIG_FILEPATH")),
         ConfigFile, "app",
         "--dry-run" in sys.argv,
-        [machine_reader]
+        [machine_reader],
+        cache=config_cache
     )
     #======================================================#
 
@@ -43,11 +58,36 @@ class ReframeSetup(rfm.RunOnlyRegressionTest):
     platform = variable(str, value=machine_reader.config.platform)
     check_params = variable(dict)
 
+    #CPU affinity of each rank, and whether ranks are correctly pinned (only recorded if a placement is requested)
+    affinity = variable(dict, value={})
+    pinning_ok = variable(bool, type(None), value=None)
+
+    #Peak memory (Gb) used on each node (only recorded if a memory policy is configured)
+    memory_peak = variable(dict, value={})
+
+    #Key of the test case in the result cache
+    cache_key = variable(str, value="")
+
     execution_policy = variable(str,value=machine_reader.config.execution_policy)
 
-    parameter_handler = ParameterHandler(app_reader.config.parameters)
-    for param_name,param_values in parameter_handler.parameters.items():
-        locals()[param_name]=parameter(param_values)
+    history_dir = CommandBuilder.buildReportBaseDir(machine_reader.config, os.path.basename(app_reader.config.executable).split(".")[0], app_reader.config.use_case_name)
+    parameter_handler = ParameterHandler(app_reader.config.parameters, history_dir, app_reader.config.sampling)
+    history_model = HistoryModel(history_dir) if app_reader.config.timeout_policy else None
+    memory_model = MemoryModel(history_dir) if app_reader.config.resources.memory_policy else None
+    result_cache = ResultCache(CommandBuilder.buildCacheDir(machine_reader.config, os.path.basename(app_reader.config.executable).split(".")[0], app_reader.config.use_case_name))
+    prepare_stage = PrepareStage.fromConfig(app_reader.config, machine_reader.config)
+    config_digest = ResultCache.configDigest(os.environ.get("APP_CONFIG_FILEPATH"), os.environ.get("MACHINE_CONFIG_FILEPATH"))
+    #Inside a job bundle or array task, only the bundled test cases are run
+    if BundleRunner.selectedCombinations() is not None:
+        parameter_handler.selectCombinations(BundleRunner.selectedCombinations())
+    if parameter_handler.isCombined():
+        #Only valid (or sampled) combinations are exposed to ReFrame, as a single parameter. Individual values are accessible as properties.
+        parameter_combination = parameter(list(parameter_handler.combinations()), fmt=ParameterHandler.formatCombination, loggable=False)
+        for param_name in parameter_handler.parameters:
+            locals()[param_name] = property(lambda self, name=param_name: self.parameter_combination[name])
+    else:
+        for param_name,param_values in parameter_handler.parameters.items():
+            locals()[param_name]=parameter(param_values)
 
 
     @run_after('init')
@@ -63,11 +103,6 @@ class ReframeSetup(rfm.RunOnlyRegressionTest):
         self.valid_prog_environs = self.machine_reader.config.prog_environments
 
 
-    @run_after('init')
-    def pruneParameterSpace(self):
-        self.parameter_handler.pruneParameterSpace(self)
-
-
 
     @run_after('setup')
     def dispatchReaders(self):
@@ -75,12 +110,6 @@ class ReframeSetup(rfm.RunOnlyRegressionTest):
         self.machine_reader = deepcopy(self.machine_reader)
         self.app_reader = deepcopy(self.app_reader)
 
-    @run_after('setup')
-    def setInstanceHash(self):
-        """Updates the setup with testcase related values"""
-        self.app_reader.updateConfig({ "instance" : str(self.hashcode) })
-        self.machine_reader.updateConfig({ "instance" : str(self.hashcode) })
-
     @run_after('setup')
     def setPlatform(self):
         platform = self.app_reader.config.platforms[self.machine_reader.config.platform]
@@ -100,15 +129,32 @@ class ReframeSetup(rfm.RunOnlyRegressionTest):
             self.skip(f"Skiping: {self.current_environ.name } is not specified for partition {current_partition_shortname} : {self.machine_reader.config.environment_map[current_partition_shortname]}")
 
 
+    @run_after('setup')
+    def checkResultCache(self):
+        """ Computes the cache key of the test case, and skips it if its result is cached and the campaign is resumed"""
+        image_digest = None
+        if self.machine_reader.config.platform != "builtin":
+            image_digest = ResultCache.fileDigest(self.app_reader.config.platforms[self.machine_reader.config.platform].image.filepath)
+        self.cache_key = ResultCache.key(
+            self.config_digest,
+            { param_name: getattr(self,param_name) for param_name in self.parameter_handler.nested_parameter_keys },
+            self.current_partition.name,
+            self.current_environ.name,
+            image_digest
+        )
+        if os.environ.get(ResultCache.resume_env_var):
+            self.skip_if(self.result_cache.has(self.cache_key), "Result is cached from a previous campaign")
+
     @run_before('run')
     def setupParameters(self):
-        for param_name,subparameters in self.parameter_handler.nested_parameter_keys.items():
-            value = getattr(self,param_name)
-            self.app_reader.updateConfig({ f"parameters.{param_name}.value":str(value) })
-            self.machine_reader.updateConfig({ f"parameters.{param_name}.value":str(value) })
-            for subparameter in subparameters:
-                self.app_reader.updateConfig({ f"parameters.{param_name}.{subparameter}.value":str(value[subparameter]) })
-                self.machine_reader.updateConfig({ f"parameters.{param_name}.{subparameter}.value":str(value[subparameter]) })
+        """Updates the setup with testcase related values (instance hash and parameter values), so that each reader is validated once per test"""
+        combination = { param_name: getattr(self,param_name) for param_name in self.parameter_handler.nested_parameter_keys }
+        placeholders = { "instance" : CommandBuilder.instanceName(self.hashcode) }
+        placeholders.update(self.parameter_handler.buildPlaceholders(combination))
+        if self.prepare_stage:
+            placeholders["prepare.directory"] = self.prepare_stage.directory(self.prepare_stage.keyValues(combination))
+        self.app_reader.updateConfig(placeholders)
+        self.machine_reader.updateConfig(placeholders)
 
     @run_before('run')
     def setCheckParams(self):
@@ -119,12 +165,14 @@ class ReframeSetup(rfm.RunOnlyRegressionTest):
 
     @run_before('run')
     def copyInputFileDependencies(self):
-        """ If input_user_dir exists, copies all files from input_user_dir to input_dataset_base_dir preservign the structure"""
+        """ If input_user_dir exists, stages all files from input_user_dir to input_dataset_base_dir preserving the structure.
+        Files are materialized from a content-addressed store (see StagingStore), so unchanged inputs are not copied again, and changed inputs are updated."""
         if not self.machine_reader.config.input_user_dir or not self.app_reader.config.input_file_dependencies:
             return
 
         DEBUG(f"==========================================================")
-        DEBUG(f"     COPYING FILES FROM {self.machine_reader.config.input_user_dir} to {self.machine_reader.config.input_dataset_base_dir}   ")
+        DEBUG(f"     STAGING FILES FROM {self.machine_reader.config.input_user_dir} to {self.machine_reader.config.input_dataset_base_dir}   ")
+        store = StagingStore(os.path.join(self.machine_reader.config.input_dataset_base_dir, StagingStore.dirname))
         for input_dep_name,input_dep in self.app_reader.config.input_file_dependencies.items():
             DEBUG(f"\t {input_dep}")
             source = os.path.join(self.machine_reader.config.input_user_dir, input_dep)
@@ -132,11 +180,8 @@ class ReframeSetup(rfm.RunOnlyRegressionTest):
                 raise FileNotFoundError(f"Did not found input dependency {input_dep_name}")
 
             destination = os.path.join(self.machine_reader.config.input_dataset_base_dir, input_dep)
-
-            if os.path.exists(destination):
-                DEBUG(f"{destination} exists, {input_dep} will not be copied...")
-                continue
-            FileHandler.copyResource(source,os.path.dirname(destination) if os.path.isfile(source) else destination)
+            store.acquire(destination, self.stagedir)
+            store.stage(source, destination)
         DEBUG("============================================================")
 
     @run_before('run')
@@ -156,8 +201,32 @@ class ReframeSetup(rfm.RunOnlyRegressionTest):
 
     @run_before('run')
     def setResources(self):
-        ResourceHandler.setResources(self.app_reader.config.resources, self)
-        self.num_cpus_per_task = 1
+        resources = self.app_reader.config.resources
+        if resources.memory_policy:
+            #The memory requirement is sized from the memory measured on previous runs
+            params = flattenParams(self.check_params)
+            if resources.cpus_per_task:
+                params["cpus_per_task"] = int(resources.cpus_per_task)
+            memory = self.memory_model.requirement(self.current_partition.name, params, int(resources.memory or 0), resources.memory_policy.headroom)
+            resources = resources.model_copy(update={"memory":memory})
+        ResourceHandler.setResources(resources, self)
+        if self.app_reader.config.resources.cpus_per_task:
+            self.check_params.setdefault("cpus_per_task", self.num_cpus_per_task)
+
+    @run_before('run')
+    def setTimeLimit(self):
+        """ Sets the job time limit from the predicted wall time of the test, if a timeout policy is configured"""
+        policy = self.app_reader.config.timeout_policy
+        if not policy:
+            return
+        self.time_limit = self.history_model.timeLimit(
+            self.current_partition.name,
+            dict(flattenParams(self.check_params), num_tasks=self.num_tasks),
+            parseTimeout(self.app_reader.config.timeout),
+            policy.safety_factor,
+            parseTimeout(policy.floor),
+            parseTimeout(policy.ceiling) if policy.ceiling else None
+        )
 
     @run_before('run')
     def cleanupDirectories(self):
@@ -170,6 +239,22 @@ class ReframeSetup(rfm.RunOnlyRegressionTest):
         self.job.launcher.options += self.current_partition.get_resource('launcher_options')
         self.job.options += self.machine_reader.config.access
         self.job.options += ['--threads-per-core=1']
+        if os.environ.get(BundleRunner.bundle_env_var):
+            self.job.launcher.options += BundleRunner.stepOptions(self)
+
+    @run_before('run')
+    def setAffinityProbe(self):
+        """ Records the CPU affinity of each rank with the job launcher, before running the application"""
+        if not self.app_reader.config.resources.placement:
+            return
+        self.prerun_cmds.append(AffinityProbe.command(self.job.launcher.run_command(self.job), AffinityProbe.filename))
+
+    @run_before('run')
+    def setMemoryProbe(self):
+        """ Records the peak memory used on each node, after running the application"""
+        if not self.app_reader.config.resources.memory_policy:
+            return
+        self.postrun_cmds.append(MemoryProbe.command(LauncherCommands.perNode(self.job.launcher, self.job, self.num_nodes), MemoryProbe.filename))
 
     @run_before('run')
     def setExecutable(self):
@@ -179,4 +264,33 @@ class ReframeSetup(rfm.RunOnlyRegressionTest):
         else:
             self.container_platform.command = f"{self.app_reader.config.executable} {' '.join(self.app_reader.config.options + self.app_reader.config.platforms[self.machine_reader.config.platform].append_app_options)}"
 
+    @run_before('run')
+    def setNodeLocalStaging(self):
+        """ Copies the image and input file dependencies to node-local storage at job start, and makes the application use the local copies"""
+        staging_config = self.machine_reader.config.node_local_staging
+        if not staging_config:
+            return
+        staging = NodeStaging(staging_config.directory, CommandBuilder.instanceName(self.hashcode))
+        is_container = self.machine_reader.config.platform != "builtin"
+        if staging_config.image and is_container:
+            self.container_platform.image = staging.add(self.container_platform.image)
+        if staging_config.inputs:
+            for input_dep in self.app_reader.config.input_file_dependencies.values():
+                staging.add(
+                    input_dep if os.path.isabs(input_dep) else os.path.join(self.machine_reader.config.input_dataset_base_dir, input_dep),
+                    os.path.join("inputs", input_dep.lstrip("/"))
+                )
+        if not staging.paths:
+            return
+
+        if is_container:
+            self.container_platform.command = staging.rewrite(self.container_platform.command)
+            self.container_platform.options = self.container_platform.options + [f"--bind {staging.root}"]
+        else:
+            self.executable_opts = [staging.rewrite(opt) for opt in self.executable_opts]
+
+        per_node_launcher = LauncherCommands.perNode(self.job.launcher, self.job, self.num_nodes)
+        self.prerun_cmds = staging.prerunCommands(per_node_launcher, NodeStaging.filename) + self.prerun_cmds
+        self.postrun_cmds += staging.postrunCommands(per_node_launcher)
+
 
@@ -0,0 +1,233 @@
+import os, json, shutil, hashlib, fcntl, stat, threading, time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+
+class StagingStore:
+    """ Content-addressed store used to stage input file dependencies in the dataset directory.
+    Each source file is hashed once (hashes are cached by path, size and modification time) and copied once into the store, as a read-only object named after its SHA-256.
+    Staged files are hard links to the store objects, or reflinks/copies if the destination is on another filesystem, so staging the same input again is almost free.
+    Staged paths are reference counted by their holders (test cases), and removed when the last holder releases them.
+    Objects that are not staged anymore are garbage collected (see collect). The store can also be deleted when no benchmark is running.
+    """
+    ficlone = 0x40049409 #FICLONE ioctl request (Linux)
+    dirname = ".staging"
+
+    def __init__(self, store_dir, max_workers=8):
+        """
+        Args:
+            store_dir (str): Directory of the store. Should be on the same filesystem as the staged paths for hard links to be used.
+            max_workers (int): Number of files of a directory tree staged in parallel
+        """
+        self.store_dir = store_dir
+        self.max_workers = max_workers
+        os.makedirs(os.path.join(self.store_dir, "objects"), exist_ok=True)
+
+    @contextmanager
+    def lock(self):
+        """ Exclusive lock on the store metadata (hash index and references), shared between processes"""
+        with open(os.path.join(self.store_dir, ".lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def readMetadata(self, name):
+        filepath = os.path.join(self.store_dir, f"{name}.json")
+        if not os.path.exists(filepath):
+            return {}
+        with open(filepath, "r") as f:
+            return json.load(f)
+
+    def writeMetadata(self, name, value):
+        filepath = os.path.join(self.store_dir, f"{name}.json")
+        with open(f"{filepath}.tmp", "w") as f:
+            json.dump(value, f)
+        os.replace(f"{filepath}.tmp", filepath)
+
+    @staticmethod
+    def fileDigest(filepath):
+        digest = hashlib.sha256()
+        with open(filepath, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def signature(filepath):
+        """ Identifies a version of a file without reading it"""
+        st = os.stat(filepath)
+        return [st.st_size, st.st_mtime_ns, st.st_ino]
+
+    def objectPath(self, digest):
+        return os.path.join(self.store_dir, "objects", digest[:2], digest)
+
+    @classmethod
+    def reflink(cls, source, destination):
+        """ Copy-on-write clone of a file. Raises OSError if the filesystem does not support it."""
+        with open(source, "rb") as src, open(destination, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), cls.ficlone, src.fileno())
+
+    @classmethod
+    def copyFile(cls, source, destination):
+        """ Copies a file, as a reflink if possible"""
+        try:
+            cls.reflink(source, destination)
+            shutil.copystat(source, destination)
+        except OSError:
+            shutil.copy2(source, destination)
+
+    def addObject(self, source, index):
+        """ Adds a file to the store, if its content is not there yet
+        Args:
+            source (str): Path of the file
+            index (dict): Hash index (source path -> signature and digest), updated with the file digest
+        Returns:
+            str: Path of the store object
+        """
+        source = os.path.abspath(source)
+        signature = self.signature(source)
+        entry = index.get(source)
+        if entry and entry["signature"] == signature:
+            digest = entry["digest"]
+        else:
+            digest = self.fileDigest(source)
+            index[source] = { "signature": signature, "digest": digest }
+
+        object_path = self.objectPath(digest)
+        if os.path.exists(object_path):
+            #Marks the object as recently used, for the garbage collection
+            try:
+                os.utime(object_path)
+            except OSError:
+                pass
+        else:
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            tmp_path = f"{object_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            self.copyFile(source, tmp_path)
+            os.chmod(tmp_path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+            #The first writer of an object wins, so that files with the same content staged concurrently share the same object
+            try:
+                os.link(tmp_path, object_path)
+            except FileExistsError:
+                pass
+            except OSError:
+                os.replace(tmp_path, object_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        return object_path
+
+    def linkFile(self, object_path, destination):
+        """ Materializes a store object at destination (hard link, or reflink/copy accross filesystems). Up to date destinations are kept."""
+        if os.path.exists(destination):
+            if os.path.samefile(object_path, destination):
+                return
+            if os.path.isdir(destination) and not os.path.islink(destination):
+                shutil.rmtree(destination)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        tmp_path = f"{destination}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.link(object_path, tmp_path)
+        except OSError:
+            self.copyFile(object_path, tmp_path)
+        os.replace(tmp_path, destination)
+
+    def stageFile(self, source, destination, index):
+        try:
+            self.linkFile(self.addObject(source, index), destination)
+        except FileNotFoundError:
+            #The object was garbage collected by another process in the meantime
+            self.linkFile(self.addObject(source, index), destination)
+
+    def stage(self, source, destination):
+        """ Stages a file or a directory tree. Files of a tree are staged in parallel.
+        Files of destination that do not exist in source are kept.
+        Args:
+            source (str): Path of the input file or directory
+            destination (str): Path where the input should be materialized
+        """
+        with self.lock():
+            index = self.readMetadata("index")
+
+        if os.path.isdir(source):
+            pairs = []
+            for dirpath, _, filenames in os.walk(source):
+                for filename in filenames:
+                    relpath = os.path.relpath(os.path.join(dirpath, filename), source)
+                    pairs.append((os.path.join(source, relpath), os.path.join(destination, relpath)))
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for future in [executor.submit(self.stageFile, src, dst, index) for src, dst in pairs]:
+                    future.result()
+        else:
+            self.stageFile(source, destination, index)
+
+        with self.lock():
+            self.writeMetadata("index", { **self.readMetadata("index"), **index })
+
+    def acquire(self, destination, holder):
+        """ Registers holder as a user of a staged path"""
+        destination = os.path.abspath(destination)
+        with self.lock():
+            refs = self.readMetadata("refs")
+            refs[destination] = sorted(set(refs.get(destination, [])) | {holder})
+            self.writeMetadata("refs", refs)
+
+    def release(self, destination, holder):
+        """ Unregisters holder as a user of a staged path, and removes the path if it has no more users
+        Returns:
+            bool: True if the path was removed
+        """
+        destination = os.path.abspath(destination)
+        with self.lock():
+            refs = self.readMetadata("refs")
+            holders = [h for h in refs.get(destination, []) if h != holder]
+            if holders:
+                refs[destination] = holders
+                self.writeMetadata("refs", refs)
+                return False
+            refs.pop(destination, None)
+            self.writeMetadata("refs", refs)
+            if os.path.isdir(destination) and not os.path.islink(destination):
+                shutil.rmtree(destination)
+            elif os.path.lexists(destination):
+                os.remove(destination)
+            return True
+
+    def collect(self, max_bytes=None, grace=3600):
+        """ Removes store objects that are not staged anymore (objects without other hard links).
+        Objects of outdated versions of the inputs are always removed. If max_bytes is given, least recently used objects are also removed until the store fits in max_bytes.
+        Entries of the hash index whose source does not exist anymore are dropped.
+        Args:
+            max_bytes (int): Maximum size of the store objects, in bytes. Not limited if None.
+            grace (float): Objects used less than grace seconds ago are kept, as other processes may be staging them
+        Returns:
+            int: Number of removed objects
+        """
+        with self.lock():
+            index = { source: entry for source, entry in self.readMetadata("index").items() if os.path.exists(source) }
+            current = { entry["digest"] for entry in index.values() }
+            objects = []
+            for dirpath, _, filenames in os.walk(os.path.join(self.store_dir, "objects")):
+                for filename in filenames:
+                    if not filename.endswith(".tmp"):
+                        st = os.stat(os.path.join(dirpath, filename))
+                        objects.append((st.st_mtime, filename, st.st_size, st.st_nlink))
+
+            total = sum(size for _, _, size, _ in objects)
+            removed = 0
+            now = time.time()
+            for mtime, digest, size, nlink in sorted(objects):
+                if nlink > 1 or now - mtime < grace:
+                    continue
+                if digest in current and (max_bytes is None or total <= max_bytes):
+                    continue
+                try:
+                    os.remove(self.objectPath(digest))
+                except FileNotFoundError:
+                    continue
+                total -= size
+                removed += 1
+            self.writeMetadata("index", index)
+        return removed
@@ -1,5 +1,6 @@
 import reframe.utility.sanity as sn
 import re
+from feelpp.benchmarking.reframe.parseCache import PARSE_CACHE, readText
 
 class ValidationHandler:
     """ Class to handle test validation and sanity functions"""
@@ -7,10 +8,28 @@ class ValidationHandler:
         self.success = sanity_config.success
         self.errors = sanity_config.error
 
+    @staticmethod
+    def _getContent(stdout):
+        """ Returns the path and the content of an output file (can be sn.stdout), read through the process-wide parse cache"""
+        filepath = str(sn.evaluate(stdout))
+        return filepath, PARSE_CACHE.get(filepath,"text",readText)
+
+    @staticmethod
+    def _message(pattern,found,filepath):
+        #Braces are escaped as ReFrame formats sanity messages
+        msg = f"pattern {pattern!r} {'found' if found else 'not found'} in {filepath!r}"
+        return msg.replace("{","{{").replace("}","}}")
+
     def check_success(self,stdout):
         """ Checks that all given regex patterns are found in an output (can be sn.stdout) """
-        return all(sn.assert_found(rf"{re.escape(pattern)}",stdout) for pattern in self.success)
+        if not self.success:
+            return True
+        filepath, content = self._getContent(stdout)
+        return all(sn.assert_found_s(rf"{re.escape(pattern)}",content,self._message(pattern,False,filepath)) for pattern in self.success)
 
     def check_errors(self,stdout):
         """ Checks that no given regex patterns are found in an output (can be sn.stdout) """
-        return all(sn.assert_not_found(rf"{re.escape(pattern)}",stdout) for pattern in self.errors)
\ No newline at end of file
+        if not self.errors:
+            return True
+        filepath, content = self._getContent(stdout)
+        return all(sn.assert_not_found_s(rf"{re.escape(pattern)}",content,self._message(pattern,True,filepath)) for pattern in self.errors)
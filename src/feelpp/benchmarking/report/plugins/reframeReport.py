@@ -81,7 +81,7 @@ class ReframeReportPlugin:
                     }])
 
 
-                testcase_df = pd.DataFrame.from_dict(testcase,orient="index").T.drop(columns=["perfvalues","check_params"]+list(testcase["check_params"].keys()))
+                testcase_df = pd.DataFrame.from_dict(testcase,orient="index").T.drop(columns=["perfvalues","check_params","affinity","memory_peak"]+list(testcase["check_params"].keys()),errors="ignore")
                 testcase_df = testcase_df.rename(columns={c:f"testcases.{c}" for c in testcase_df})
                 param_dict = {}
                 for dim, v in testcase["check_params"].items():
@@ -1,5 +1,6 @@
 from feelpp.benchmarking.jsonWithComments import JSONWithCommentsDecoder
-import json, os
+import json, os, fcntl
+from contextlib import contextmanager
 
 class WebsiteConfigCreator:
     def __init__(self,basepath):
@@ -55,6 +56,18 @@ class WebsiteConfigCreator:
                 component_map=dict()
             )
 
+    @staticmethod
+    @contextmanager
+    def lock(basepath):
+        """ Exclusive lock on the website configuration of basepath, for processes updating it concurrently"""
+        os.makedirs(basepath, exist_ok=True)
+        with open(os.path.join(basepath,".website_config.lock"),"w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
     def updateExecutionMapping(self,application, machine,use_case, report_itempath):
         if machine not in self.config["component_map"]:
             self.config["component_map"][machine] = {}
@@ -0,0 +1,252 @@
+""" Tests for job bundling"""
+
+import json, os, runpy
+import pytest
+from types import SimpleNamespace
+from feelpp.benchmarking.reframe.bundling import Bundle, BundlePlanner, BundleRunner, JobArray, JobArrayPlanner, JobArrayRunner
+from feelpp.benchmarking.reframe.estimator import CostEstimator
+from feelpp.benchmarking.reframe.parameters import ParameterHandler
+from feelpp.benchmarking.reframe.config.configReader import ConfigReader
+from feelpp.benchmarking.reframe.schemas.benchmarkSchemas import ConfigFile
+from feelpp.benchmarking.reframe.schemas.machines import MachineConfig, Bundling, JobArrayConfig
+from feelpp.benchmarking.reframe.schemas.parameters import Parameter
+from pydantic import ValidationError
+
+
+class CommandBuilderMocker:
+    def buildCommand(self, timeout, config_filepath=None, system=None, environment=None, report_filepath=None):
+        return f"reframe -C {config_filepath} --system={system} -p '^{environment}$' --report-file={report_filepath} -J '#SBATCH --time={timeout}'"
+
+
+@pytest.fixture
+def readers(tmp_path):
+    machine_config = tmp_path/"machine.json"
+    machine_config.write_text(json.dumps({
+        "machine":"mockMachine", "targets":["default:builtin:env1","default:builtin:env2"], "output_app_dir":str(tmp_path),
+        "access":["--account=1234"], "bundling":{"max_cases":2,"concurrent_steps":2}
+    }))
+    app_config = tmp_path/"app.json"
+    app_config.write_text(json.dumps({
+        "executable":"app", "use_case_name":"case", "timeout":"0-00:10:00",
+        "resources":{ "tasks":"{{parameters.tasks.value}}", "tasks_per_node":"{{parameters.tasks_per_node.value}}" },
+        "parameters":[
+            {"name":"tasks","sequence":[128,256]}, {"name":"solver","sequence":["cg","gmres","bicgstab"]},
+            {"name":"tasks_per_node","sequence":[128,64],"conditions":{"64":[{"tasks":[256]}]}}
+        ]
+    }))
+    rfm_config = tmp_path/"reframe.py"
+    rfm_config.write_text(
+        "site_configuration = {'systems':[{'name':'mockMachine','partitions':[{'name':'default','scheduler':'slurm','launcher':'srun',"
+        "'access':['--partition=cpu'],'max_jobs':100,'processor':{'num_cpus':128}}]}]}"
+    )
+    machine_reader = ConfigReader(str(machine_config),MachineConfig,"machine",dry_run=True)
+    app_reader = ConfigReader(str(app_config),ConfigFile,"app",dry_run=True,additional_readers=[machine_reader])
+    return machine_reader, app_reader, str(rfm_config)
+
+
+@pytest.fixture
+def bundles(readers):
+    machine_reader, app_reader, rfm_config = readers
+    estimator = CostEstimator(app_reader, machine_reader, ParameterHandler(app_reader.config.parameters), rfm_config, None)
+    return BundlePlanner(estimator, machine_reader.config.bundling).plan()
+
+
+class TestBundling:
+
+    def test_validation(self):
+        with pytest.raises(ValidationError, match="strictly positive"):
+            Bundling(max_cases=0)
+
+    def test_plan(self, bundles):
+        """ Test cases are grouped by partition, environment and number of nodes, in chunks of max_cases"""
+        assert len(bundles) == 12
+        for bundle in bundles:
+            assert {c["tasks"] // c["tasks_per_node"] for c in bundle.combinations} == {bundle.num_nodes}
+        assert sorted((b.environment, b.num_nodes, len(b.combinations)) for b in bundles) == [
+            (environment, nodes, size) for environment in ["env1","env2"] for nodes in [1,2,4] for size in [1,2]
+        ]
+
+    def test_allocation(self):
+        """ Test cases run in waves of concurrent_steps, on concurrent_steps times the nodes of a test case"""
+        bundle = Bundle(0, "default", "env", 2, [{}]*5, [600,300,600,900,300], concurrent_steps=2)
+        assert bundle.allocation_nodes == 4
+        assert bundle.time_limit == 600 + 900 + 300
+        assert Bundle(0, "default", "env", 2, [{}], [600], concurrent_steps=4).allocation_nodes == 2
+
+    def test_prepare(self, readers, bundles, tmp_path):
+        """ A local scheduler configuration, and the combinations and batch script of each bundle are written"""
+        machine_reader, app_reader, rfm_config = readers
+        runner = BundleRunner(CommandBuilderMocker(), machine_reader.config, rfm_config, str(tmp_path/"report"))
+        scripts = runner.prepare(bundles, app_reader.config.timeout)
+
+        partition = runpy.run_path(str(tmp_path/"report"/"bundles"/"reframe_config.py"))["site_configuration"]["systems"][0]["partitions"][0]
+        assert partition["scheduler"] == "local" and partition["launcher"] == "srun" and partition["max_jobs"] == 2
+
+        with open(tmp_path/"report"/"bundles"/"bundle_1"/"combinations.json") as f:
+            assert json.load(f) == bundles[1].combinations
+
+        with open(scripts[1]) as f:
+            script = f.read()
+        assert f"#SBATCH --nodes={bundles[1].allocation_nodes}" in script
+        assert "#SBATCH --time=0-00:10:00" in script
+        assert "#SBATCH --partition=cpu" in script and "#SBATCH --account=1234" in script
+        assert "export FEELPP_BENCHMARKING_BUNDLE=allocation" in script
+        assert f"--system=mockMachine:default -p '^{bundles[1].environment}$'" in script
+        assert f"--report-file={tmp_path/'report'/'bundles'/'bundle_1'/'bundle_report.json'}" in script
+
+    def test_mergeReports(self, tmp_path):
+        """ Test cases are concatenated and counters summed. Missing reports are ignored"""
+        for i in range(2):
+            with open(tmp_path/f"r{i}.json","w") as f:
+                json.dump({
+                    "session_info":{"num_cases":2,"num_failures":i,"time_end":f"2024-01-0{i+1}"},
+                    "runs":[{"num_cases":2,"num_failures":i,"testcases":[{"name":f"t{i}a"},{"name":f"t{i}b"}]}]
+                },f)
+        merged = BundleRunner.mergeReports([tmp_path/"r0.json",tmp_path/"missing.json",tmp_path/"r1.json"], tmp_path/"merged.json")
+        assert merged["session_info"] == {"num_cases":4,"num_failures":1,"time_end":"2024-01-02"}
+        assert merged["runs"][0]["num_cases"] == 4
+        assert [t["name"] for t in merged["runs"][0]["testcases"]] == ["t0a","t0b","t1a","t1b"]
+        with open(tmp_path/"merged.json") as f:
+            assert json.load(f) == merged
+        assert BundleRunner.mergeReports([tmp_path/"missing.json"], tmp_path/"none.json") is None
+        assert not os.path.exists(tmp_path/"none.json")
+
+    def test_stepOptions(self):
+        test = SimpleNamespace(num_nodes=2, num_tasks=256, num_tasks_per_node=128, num_cpus_per_task=1)
+        assert BundleRunner.stepOptions(test) == ["--nodes=2","--ntasks=256","--exact","--ntasks-per-node=128","--cpus-per-task=1"]
+
+    def test_selectCombinations(self):
+        """ Only the selected combinations are run"""
+        handler = ParameterHandler([Parameter(name="a",sequence=[1,2,3]),Parameter(name="b",sequence=["x","y"])])
+        handler.selectCombinations([{"a":2,"b":"y"},{"a":3,"b":"x"}])
+        assert handler.isCombined()
+        assert list(handler.combinations()) == [{"a":2,"b":"y"},{"a":3,"b":"x"}]
+        with pytest.raises(ValueError, match="unknown or inactive parameters"):
+            handler.selectCombinations([{"c":1}])
+
+
+@pytest.fixture
+def fake_slurm(tmp_path, monkeypatch):
+    """ Fake sbatch and squeue commands. Submitted jobs are listed by squeue only once."""
+    bin_dir = tmp_path/"bin"
+    bin_dir.mkdir()
+    (bin_dir/"sbatch").write_text(f"#!/bin/sh\necho \"$@\" >> {tmp_path/'submitted'}\necho \"4242;cluster\"\n")
+    (bin_dir/"squeue").write_text(
+        f"#!/bin/sh\nif [ -e {tmp_path/'polled'} ]; then exit 0; fi\ntouch {tmp_path/'polled'}\necho \"4242_[0-1]\"\n"
+    )
+    for command in ["sbatch","squeue"]:
+        os.chmod(bin_dir/command, 0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}:{os.environ['PATH']}")
+    monkeypatch.setattr(BundleRunner, "poll_interval", 0)
+    return tmp_path
+
+
+class TestWait:
+
+    def writeSqueue(self, bin_dir, script):
+        (bin_dir/"squeue").write_text(f"#!/bin/sh\n{script}\n")
+        os.chmod(bin_dir/"squeue", 0o755)
+
+    def test_transientErrors(self, fake_slurm, monkeypatch):
+        """ squeue errors are retried, and jobs are complete once squeue does not know them"""
+        counter = fake_slurm/"count"
+        self.writeSqueue(fake_slurm/"bin",
+            f"echo x >> {counter}\n"
+            f"if [ $(wc -l < {counter}) -le 2 ]; then echo 'slurm_load_jobs error: Socket timed out' >&2; exit 1; fi\n"
+            f"if [ $(wc -l < {counter}) -le 3 ]; then echo 4242; exit 0; fi\n"
+            "echo 'slurm_load_jobs error: Invalid job id specified' >&2; exit 1"
+        )
+        BundleRunner(None, None, None, str(fake_slurm)).wait(["4242"])
+        assert len(counter.read_text().split()) == 4
+
+    def test_persistentErrors(self, fake_slurm, monkeypatch):
+        self.writeSqueue(fake_slurm/"bin", "echo 'slurm_load_jobs error: Unable to contact slurm controller' >&2; exit 1")
+        monkeypatch.setattr(BundleRunner, "max_poll_failures", 3)
+        with pytest.raises(RuntimeError, match="squeue failed 3 times"):
+            BundleRunner(None, None, None, str(fake_slurm)).wait(["4242"])
+
+
+class TestJobArrays:
+
+    @pytest.fixture
+    def arrays(self, readers):
+        machine_reader, app_reader, rfm_config = readers
+        estimator = CostEstimator(app_reader, machine_reader, ParameterHandler(app_reader.config.parameters), rfm_config, None)
+        return JobArrayPlanner(estimator, JobArrayConfig(max_tasks=2, max_concurrent=1)).plan()
+
+    def test_validation(self):
+        with pytest.raises(ValidationError, match="strictly positive"):
+            JobArrayConfig(max_concurrent=0)
+        with pytest.raises(ValidationError, match="cannot be used at the same time"):
+            MachineConfig(machine="m", targets="default:builtin:default", output_app_dir=".", bundling={}, job_array={})
+
+    def test_plan(self, arrays):
+        """ Test cases differing only in application parameters share an array"""
+        assert all(isinstance(a, JobArray) for a in arrays)
+        assert len(arrays) == 12
+        for array in arrays:
+            assert len({(c["tasks"],c["tasks_per_node"]) for c in array.combinations}) == 1
+        test = {"partition":"default","num_nodes":2,"num_tasks":256,"num_tasks_per_node":128,"num_cpus_per_task":1}
+        assert JobArrayPlanner.groupKey(test,"env") != JobArrayPlanner.groupKey(dict(test,num_cpus_per_task=2),"env")
+        assert BundlePlanner.groupKey(test,"env") == BundlePlanner.groupKey(dict(test,num_cpus_per_task=2),"env")
+
+    def test_script(self, readers, arrays, tmp_path):
+        machine_reader, app_reader, rfm_config = readers
+        runner = JobArrayRunner(CommandBuilderMocker(), machine_reader.config, rfm_config, str(tmp_path/"report"))
+        scripts = runner.prepare(arrays, app_reader.config.timeout)
+        with open(scripts[0]) as f:
+            script = f.read()
+        assert "#SBATCH --array=0-1%1" in script
+        assert f"#SBATCH --nodes={arrays[0].num_nodes}" in script
+        assert f"#SBATCH --output={tmp_path/'report'/'bundles'/'array_0'/'task_%a.out'}" in script
+        assert "export FEELPP_BENCHMARKING_BUNDLE=array" in script
+        assert "--report-file=" + str(tmp_path/"report"/"bundles"/"array_0"/"task_report_${SLURM_ARRAY_TASK_ID}.json") in script
+        partition = runpy.run_path(str(tmp_path/"report"/"bundles"/"reframe_config.py"))["site_configuration"]["systems"][0]["partitions"][0]
+        assert partition["max_jobs"] == 1
+
+    def test_selectedCombinations(self, tmp_path, monkeypatch):
+        """ Array tasks select the combination of their index"""
+        assert BundleRunner.selectedCombinations() is None
+        (tmp_path/"combinations.json").write_text(json.dumps([{"a":1},{"a":2}]))
+        monkeypatch.setenv("FEELPP_BENCHMARKING_COMBINATIONS", str(tmp_path/"combinations.json"))
+        monkeypatch.setenv("FEELPP_BENCHMARKING_BUNDLE", "allocation")
+        assert BundleRunner.selectedCombinations() == [{"a":1},{"a":2}]
+        monkeypatch.setenv("FEELPP_BENCHMARKING_BUNDLE", "array")
+        monkeypatch.setenv("SLURM_ARRAY_TASK_ID", "1")
+        assert BundleRunner.selectedCombinations() == [{"a":2}]
+
+    def test_run(self, readers, fake_slurm):
+        """ Arrays are submitted, polled until they leave the queue, and task reports are merged"""
+        machine_reader, app_reader, rfm_config = readers
+        array = JobArray(0, "default", "env1", 1, [{"tasks":128},{"tasks":128}], [600,600])
+        runner = JobArrayRunner(CommandBuilderMocker(), machine_reader.config, rfm_config, str(fake_slurm/"report"))
+        os.makedirs(fake_slurm/"report"/"bundles"/"array_0")
+        for i in range(2):
+            (fake_slurm/"report"/"bundles"/"array_0"/f"task_report_{i}.json").write_text(json.dumps({
+                "session_info":{"num_cases":1}, "runs":[{"num_cases":1,"testcases":[{"name":f"t{i}"}]}]
+            }))
+        merged = runner.run([array], app_reader.config.timeout)
+
+        assert (fake_slurm/"submitted").read_text().split() == ["--parsable", str(fake_slurm/"report"/"bundles"/"array_0"/"bundle.sh")]
+        assert os.path.exists(fake_slurm/"polled")
+        assert [t["name"] for t in merged["runs"][0]["testcases"]] == ["t0","t1"]
+        assert os.path.exists(fake_slurm/"report"/"reframe_report.json")
+        assert runner.exitCode(merged) == 0
+
+    def test_exitCode(self, readers, fake_slurm):
+        """ Failed test cases and jobs without report make the campaign fail"""
+        machine_reader, app_reader, rfm_config = readers
+        array = JobArray(0, "default", "env1", 1, [{"tasks":128},{"tasks":128}], [600,600])
+        runner = JobArrayRunner(CommandBuilderMocker(), machine_reader.config, rfm_config, str(fake_slurm/"report"))
+        os.makedirs(fake_slurm/"report"/"bundles"/"array_0")
+        (fake_slurm/"report"/"bundles"/"array_0"/"task_report_0.json").write_text(json.dumps({
+            "session_info":{"num_cases":1,"num_failures":0}, "runs":[{"num_cases":1,"testcases":[{"name":"t0"}]}]
+        }))
+        merged = runner.run([array], app_reader.config.timeout)
+        assert runner.missing_reports == [str(fake_slurm/"report"/"bundles"/"array_0"/"task_report_1.json")]
+        assert runner.exitCode(merged) == 1
+
+        runner.missing_reports = []
+        assert runner.exitCode(merged) == 0
+        assert runner.exitCode({"session_info":{"num_failures":1}}) == 1
+        assert runner.exitCode(None) == 1
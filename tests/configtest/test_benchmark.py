@@ -1,6 +1,6 @@
 """ Tests for the configSchemas module """
 import pytest
-from feelpp.benchmarking.reframe.schemas.benchmarkSchemas import Sanity,Scalability,Resources,ConfigFile,Platform
+from feelpp.benchmarking.reframe.schemas.benchmarkSchemas import Sanity,Scalability,Resources,ConfigFile,Platform,TimeoutPolicy
 from pydantic import ValidationError
 
 
@@ -11,6 +11,14 @@ class TestPlatform:
 class TestAdditionalFiles:
     pass
 
+class TestTimeoutPolicy:
+    def test_validation(self):
+        assert TimeoutPolicy().floor == "0-00:05:00"
+        with pytest.raises(ValidationError,match="safety factor"):
+            TimeoutPolicy(safety_factor=0.5)
+        with pytest.raises(ValidationError,match="not properly formatted"):
+            TimeoutPolicy(ceiling="2:00:00")
+
 class TestConfigFile:
     """Tests for the ConfigFile Schema"""
 
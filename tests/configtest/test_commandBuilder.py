@@ -81,27 +81,22 @@ class TestCommandBuilder:
         assert os.path.dirname(cfg_filepath).split("/")[-1] == machine_config.machine
 
 
-    def test_createReportFolder(self,cmd_builder,machine_config):
-        """ Tests the createReportFolder method of the CommandBuilder"""
+    def test_createReportFolder(self,cmd_builder,machine_config,parser,tmp_path):
+        """ Tests the createReportFolder method of the CommandBuilder. Campaigns started in the same second get distinct folders."""
         executable ="test_executable"
         use_case ="test_use_case"
-        expected_path = f"{machine_config.reports_base_dir}/{executable}/{use_case}/{machine_config.machine}/"+cmd_builder.current_date
+        cmd_builder = CommandBuilder(MockMachineConfig(machine=machine_config.machine,reports_base_dir=str(tmp_path)),parser)
+        expected_path = f"{tmp_path}/{executable}/{use_case}/{machine_config.machine}/"+cmd_builder.current_date
 
-        with patch("os.path.exists", return_value=False):
-            with patch("os.makedirs") as mock_makedirs:
-                result = cmd_builder.createReportFolder(executable, use_case)
-                print(result)
-                print(expected_path)
+        result = cmd_builder.createReportFolder(executable, use_case)
+        assert os.path.normpath(result) == os.path.normpath(expected_path)
+        assert os.path.isdir(result)
 
-                assert os.path.normpath(result) == os.path.normpath(expected_path)
-                mock_makedirs.assert_called_once_with(expected_path)
-
-        with patch("os.path.exists", return_value=True):
-            with patch("os.makedirs") as mock_makedirs:
-                result = cmd_builder.createReportFolder(executable, use_case)
-                mock_makedirs.assert_not_called()
-
-                assert os.path.normpath(result) == os.path.normpath(expected_path)
+        other = CommandBuilder(cmd_builder.machine_config,parser)
+        other.current_date = cmd_builder.current_date
+        result = other.createReportFolder(executable, use_case)
+        assert os.path.normpath(result) == os.path.normpath(f"{expected_path}_1")
+        assert os.path.isdir(result)
 
     def test_buildExecutionMode(self,cmd_builder,parser):
         """Tests the buildExecutionMode method of the CommandBuilder"""
@@ -135,4 +130,13 @@ class TestCommandBuilder:
         )
         expected_command += "--dry-run --exec-policy serial" if parser.args.dry_run else "-r"
 
-        assert expected_command == cmd_builder.buildCommand(timeout)
\ No newline at end of file
+        assert expected_command == cmd_builder.buildCommand(timeout)
+
+    def test_configKey(self,cmd_builder,machine_config,monkeypatch):
+        """ Configurations run by the orchestrator use their own ReFrame prefix and instance names"""
+        monkeypatch.delenv(CommandBuilder.config_key_env_var,raising=False)
+        assert cmd_builder.buildReframePrefix() == machine_config.reframe_base_dir
+        assert CommandBuilder.instanceName("abc") == "abc"
+        monkeypatch.setenv(CommandBuilder.config_key_env_var,"a_1234")
+        assert cmd_builder.buildReframePrefix() == os.path.join(machine_config.reframe_base_dir,"a_1234")
+        assert CommandBuilder.instanceName("abc") == "a_1234_abc"
@@ -0,0 +1,120 @@
+""" Tests for the persistent cache of validated configurations"""
+
+import os, pickle, json
+import pytest
+from unittest.mock import patch
+from pydantic import BaseModel
+from feelpp.benchmarking.reframe.config.configReader import ConfigReader
+from feelpp.benchmarking.reframe.config.configCache import ConfigCache
+
+
+class CachedMachine(BaseModel):
+    machine: str
+    path: str
+
+class CachedApp(BaseModel):
+    executable: str
+    output: str
+
+
+@pytest.fixture
+def configs(tmp_path):
+    machine = tmp_path / "machine.json"
+    machine.write_text('{"machine":"mock", "path":"$CONFIG_CACHE_TEST_DIR/out"}')
+    app = tmp_path / "app.json"
+    app.write_text('{"executable":"app", "output":"{{machine.path}}/{{executable}}/{{instance}}"}')
+    return str(machine), str(app)
+
+
+class TestConfigCache:
+
+    def test_restore(self, configs, tmp_path, monkeypatch):
+        monkeypatch.setenv("CONFIG_CACHE_TEST_DIR", "/scratch")
+        cache = ConfigCache(str(tmp_path / "cache"))
+        machine_reader = ConfigReader(configs[0], CachedMachine, "machine", cache=cache)
+        app_reader = ConfigReader(configs[1], CachedApp, "app", additional_readers=[machine_reader], cache=cache)
+        assert app_reader.config.output == "/scratch/out/app/{{instance}}"
+        assert len(os.listdir(tmp_path / "cache")) == 2
+
+        with patch.object(ConfigReader, "load", side_effect=AssertionError("Config should be cached")):
+            cached_machine = ConfigReader(configs[0], CachedMachine, "machine", cache=cache)
+            cached_app = ConfigReader(configs[1], CachedApp, "app", additional_readers=[cached_machine], cache=cache)
+        assert cached_machine.config == machine_reader.config
+        assert cached_app.config == app_reader.config
+
+        #Restored readers can still be updated
+        cached_app.updateConfig({"instance":"1"})
+        assert cached_app.config.output == "/scratch/out/app/1"
+        assert cached_app.cache_key is None
+
+    @pytest.mark.parametrize("json_report", [{}, {"datetime":"2024-01-01 00:00:00"}, {"title":"Report"}])
+    def test_refreshDatetime(self, json_report, tmp_path):
+        """ The report datetime (and default title) is not frozen by the cache, unless it is provided"""
+        from feelpp.benchmarking.reframe.schemas.benchmarkSchemas import ConfigFile
+        config = tmp_path / "benchmark.json"
+        config.write_text(json.dumps({"executable":"app", "use_case_name":"case", "json_report":json_report}))
+        cache = ConfigCache(str(tmp_path / "cache"))
+        reader = ConfigReader(str(config), ConfigFile, "app", cache=cache)
+
+        state = cache.load(reader.cache_key)
+        state["config"].json_report.datetime = "2000-01-01 00:00:00"
+        if "title" not in json_report:
+            state["config"].json_report.title = "2000-01-01 00:00:00"
+        cache.store(reader.cache_key, state)
+
+        restored = ConfigReader(str(config), ConfigFile, "app", cache=cache).config.json_report
+        if "datetime" in json_report:
+            assert restored.datetime == "2000-01-01 00:00:00"
+        else:
+            assert restored.datetime != "2000-01-01 00:00:00"
+        assert restored.title == json_report.get("title", restored.datetime)
+
+    def test_key(self, configs, monkeypatch):
+        monkeypatch.setenv("CONFIG_CACHE_TEST_DIR", "/scratch")
+        paths = [{"":configs[0]}]
+        key = ConfigCache.key(paths, CachedMachine, "machine", False)
+        assert key == ConfigCache.key(paths, CachedMachine, "machine", False)
+        assert key != ConfigCache.key(paths, CachedMachine, "machine", True)
+        assert key != ConfigCache.key(paths, CachedApp, "machine", False)
+        assert key != ConfigCache.key(paths, CachedMachine, "machine", False, ["other"])
+
+        #Referenced environment variables are part of the key, other ones are not
+        monkeypatch.setenv("CONFIG_CACHE_UNRELATED", "1")
+        assert key == ConfigCache.key(paths, CachedMachine, "machine", False)
+        monkeypatch.setenv("CONFIG_CACHE_TEST_DIR", "/work")
+        assert key != ConfigCache.key(paths, CachedMachine, "machine", False)
+
+        with open(configs[0], "w") as f:
+            f.write('{"machine":"changed", "path":"/out"}')
+        assert key != ConfigCache.key(paths, CachedMachine, "machine", False)
+        assert ConfigCache.key([{"":"/missing.json"}], CachedMachine, "machine", False) is None
+
+    def test_invalidEntry(self, configs, tmp_path):
+        cache = ConfigCache(str(tmp_path / "cache"))
+        reader = ConfigReader(configs[0], CachedMachine, "machine", cache=cache)
+        with open(cache.path(reader.cache_key), "wb") as f:
+            f.write(b"corrupted")
+        with pytest.warns(UserWarning, match="Ignoring invalid config cache entry"):
+            assert cache.load(reader.cache_key) is None
+        with pytest.warns(UserWarning):
+            assert ConfigReader(configs[0], CachedMachine, "machine", cache=cache).config == reader.config
+        with open(cache.path(reader.cache_key), "rb") as f:
+            assert pickle.load(f)["config"] == reader.config
+
+    def test_unwritableCache(self, tmp_path):
+        (tmp_path / "cache").write_text("not a directory")
+        with pytest.warns(UserWarning, match="Cannot write config cache entry"):
+            ConfigCache(str(tmp_path / "cache")).store("a", {"key":"a"})
+
+    def test_prune(self, tmp_path):
+        cache = ConfigCache(str(tmp_path / "cache"), max_entries=2)
+        for key in ["a", "b", "c"]:
+            cache.store(key, {"key":key})
+        assert sorted(os.listdir(tmp_path / "cache")) == ["b.pickle", "c.pickle"]
+
+    def test_fromEnvironment(self, tmp_path, monkeypatch):
+        monkeypatch.setenv(ConfigCache.dir_env_var, str(tmp_path))
+        monkeypatch.delenv(ConfigCache.disable_env_var, raising=False)
+        assert ConfigCache.fromEnvironment().cache_dir == str(tmp_path)
+        monkeypatch.setenv(ConfigCache.disable_env_var, "1")
+        assert ConfigCache.fromEnvironment() is None
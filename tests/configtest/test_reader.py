@@ -1,7 +1,7 @@
 """ tests for the configReader module"""
 
 import pytest, os,tempfile, json
-from feelpp.benchmarking.reframe.config.configReader import ConfigReader, TemplateProcessor
+from feelpp.benchmarking.reframe.config.configReader import ConfigReader, TemplateProcessor, TemplateIndex
 from pydantic import BaseModel, field_validator
 from typing import Optional, Dict
 from unittest.mock import mock_open, patch, MagicMock
@@ -167,6 +167,37 @@ class TestTemplateProcessor:
         assert result == expected_output
 
 
+class TestTemplateIndex:
+    """Tests for the TemplateIndex class"""
+    data = {
+        "a": "{{x}} and {{ y }}",
+        "b": ["plain", {"c": "{{y}}"}],
+        "d": "{{x.{{y}}.z}}",
+        "e": "$HOME/path",
+        "f": 3
+    }
+
+    def test_affected(self):
+        index = TemplateIndex(self.data, TemplateProcessor().template_pattern)
+        assert index.affected({"x":1}) == {("a",), ("d",), ("e",)}
+        assert index.affected({"y":1, "other":2}) == {("a",), ("b",1,"c"), ("d",), ("e",)}
+        assert index.affected({"other":2}) == {("d",), ("e",)}
+        assert index.affected() == {("a",), ("b",1,"c"), ("d",), ("e",)}
+
+    def test_update(self):
+        index = TemplateIndex(self.data, TemplateProcessor().template_pattern)
+        index.remove(("a",))
+        index.add(("a",), "1 and {{y}}")
+        assert ("a",) not in index.affected({"x":1})
+        assert ("a",) in index.affected({"y":1})
+
+    def test_set(self):
+        data = TemplateIndex.set(self.data, ("b",1,"c"), "value")
+        assert TemplateIndex.get(data, ("b",1,"c")) == "value"
+        assert self.data["b"][1]["c"] == "{{y}}"
+        assert data["b"][0] is self.data["b"][0] and data["a"] is self.data["a"]
+
+
 class MockConfigFile(BaseModel):
     field1: str
     field2: int
@@ -238,3 +269,34 @@ class TestConfigReader:
         config_reader = self.initConfig(initial_configs,dry_run=False)
         config_reader.updateConfig(flattened_replace=flattened_replace)
         assert config_reader.config == expected
+
+    def test_incrementalUpdates(self):
+        """Tests that updates only re-resolve affected fields, and keep unresolved placeholders for later updates"""
+        config_reader = self.initConfig(['{"field1":"{{a}}-{{b}}", "field2":2, "field3":0.3, "field4":{"x":"{{b}}"}}'],dry_run=False)
+        with patch.object(MockConfigFile, "model_validate", wraps=MockConfigFile.model_validate) as validate:
+            config_reader.updateConfig({"unused":"value"})
+            assert validate.call_count == 0
+            config_reader.updateConfig({"a":"1"})
+            assert config_reader.config.field1 == "1-{{b}}"
+            config_reader.updateConfig({"b":"2"})
+            assert validate.call_count == 2
+        assert config_reader.config == MockConfigFile(field1="1-2",field2=2,field3=0.3,field4={"x":"2"})
+
+        config_reader.resetConfig()
+        assert config_reader.config.field1 == "{{a}}-{{b}}"
+        config_reader.updateConfig({"a":"3","b":"4"})
+        assert config_reader.config.field1 == "3-4"
+
+    def test_updateWithPlotsConfig(self):
+        """Tests repeated updates on a benchmark config merged with a plots config, whose validators modify their input"""
+        from feelpp.benchmarking.reframe.schemas.benchmarkSchemas import ConfigFile
+        from feelpp.benchmarking.reframe.schemas.machines import MachineConfig
+        machine_reader = ConfigReader("./examples/machines/default.json", MachineConfig, "machine", dry_run=True)
+        app_reader = ConfigReader(
+            [{"":"./examples/fibonacci/benchmark.json"},{"json_report":"./examples/fibonacci/plots.json"}],
+            ConfigFile, "app", dry_run=True, additional_readers=[machine_reader]
+        )
+        contents = app_reader.config.json_report.model_dump()["contents"]
+        app_reader.updateConfig({"instance":"1"})
+        app_reader.updateConfig({"parameters.method.value":"iterative", "parameters.n.value":"10"})
+        assert app_reader.config.json_report.model_dump()["contents"] == contents
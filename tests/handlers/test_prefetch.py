@@ -0,0 +1,238 @@
+""" Tests for the prefetch of images and remote input dependencies, against a local HTTP stand-in for Girder"""
+
+import os, json, re, hashlib, threading
+import pytest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from feelpp.benchmarking.dashboardRenderer.handlers.download import DownloadHandler
+from feelpp.benchmarking.dashboardRenderer.handlers.girder import GirderHandler
+from feelpp.benchmarking.reframe.prefetch import Prefetcher
+from feelpp.benchmarking.reframe.schemas.remoteData import RemoteData
+from feelpp.benchmarking.reframe.schemas.platform import Image
+
+
+class GirderStandIn(BaseHTTPRequestHandler):
+    """ Minimal Girder REST API: authentication, file, item and folder listing, and file download with Range support"""
+    files = {}
+    items = {}
+    folders = {}
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, body, status=200, headers=None):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def replyJson(self, value):
+        self.reply(json.dumps(value).encode(), headers={"Content-Type":"application/json"})
+
+    def document(self, file_id):
+        content = self.files[file_id]["content"]
+        return {"_id":file_id, "name":self.files[file_id]["name"], "size":len(content), "sha512":hashlib.sha512(content).hexdigest()}
+
+    def do_POST(self):
+        self.replyJson({"authToken":{"token":"token"}, "user":{}})
+
+    def do_GET(self):
+        path, _, query = self.path.removeprefix("/api/v1/").partition("?")
+        params = dict(p.split("=") for p in query.split("&") if p)
+        if int(params.get("offset",0)) > 0:
+            return self.replyJson([])
+        if match := re.fullmatch(r"file/(\w+)/download", path):
+            self.requests.append({"file":match.group(1), "range":self.headers.get("Range"), "token":self.headers.get("Girder-Token")})
+            content = self.files[match.group(1)]["content"]
+            if self.headers.get("Range"):
+                offset = int(re.fullmatch(r"bytes=(\d+)-", self.headers["Range"]).group(1))
+                return self.reply(content[offset:], status=206)
+            return self.reply(content)
+        if match := re.fullmatch(r"file/(\w+)", path):
+            return self.replyJson(self.document(match.group(1)))
+        if match := re.fullmatch(r"item/(\w+)/files", path):
+            return self.replyJson([self.document(f) for f in self.items[match.group(1)]["files"]])
+        if match := re.fullmatch(r"item/(\w+)", path):
+            return self.replyJson({"_id":match.group(1), "name":self.items[match.group(1)]["name"]})
+        if path == "item":
+            return self.replyJson([{"_id":i, "name":item["name"]} for i, item in self.items.items() if item["folder"] == params["folderId"]])
+        if path == "folder":
+            return self.replyJson([{"_id":f, "name":folder["name"]} for f, folder in self.folders.items() if folder["parent"] == params["parentId"]])
+        self.reply(b"", status=404)
+
+
+@pytest.fixture
+def girder(monkeypatch):
+    GirderStandIn.files = {
+        "f1": {"name":"mesh.msh", "content":b"mesh" * 1000},
+        "f2": {"name":"a.txt", "content":b"a"},
+        "f3": {"name":"b.txt", "content":b"b"},
+        "f4": {"name":"c.txt", "content":b"c"},
+    }
+    GirderStandIn.items = {
+        "i1": {"name":"multi", "files":["f2","f3"], "folder":"d1"},
+        "i2": {"name":"c.txt", "files":["f4"], "folder":"d2"},
+    }
+    GirderStandIn.folders = { "d2": {"name":"sub", "parent":"d1"} }
+    GirderStandIn.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), GirderStandIn)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv("GIRDER_API_URL", f"http://127.0.0.1:{server.server_address[1]}/api/v1")
+    monkeypatch.setenv("GIRDER_API_KEY", "key")
+    yield GirderStandIn
+    server.shutdown()
+    server.server_close()
+
+
+class TestDownloadHandler:
+
+    def test_parseChecksum(self):
+        assert DownloadHandler.parseChecksum("SHA512:ABC") == ("sha512","abc")
+        assert DownloadHandler.parseChecksum("abc") == ("sha256","abc")
+        with pytest.raises(ValueError):
+            DownloadHandler.parseChecksum("unknown:abc")
+
+    def test_checksumMatches(self, tmp_path):
+        filepath = tmp_path / "file"
+        assert not DownloadHandler.checksumMatches(str(filepath), "sha256:abc")
+        filepath.write_bytes(b"content")
+        assert DownloadHandler.checksumMatches(str(filepath), hashlib.sha256(b"content").hexdigest())
+        assert DownloadHandler.checksumMatches(str(filepath), f"md5:{hashlib.md5(b'content').hexdigest()}")
+        assert not DownloadHandler.checksumMatches(str(filepath), "sha256:abc")
+
+
+class TestGirderFetch:
+
+    def test_download(self, girder, tmp_path):
+        handler = GirderHandler(str(tmp_path))
+        [(file, filepath)] = handler.listFiles("file", "f1", "data/mesh.msh")
+        assert filepath == os.path.join(str(tmp_path), "data/mesh.msh")
+        assert handler.fetchFile(file, filepath) == "downloaded"
+        with open(filepath, "rb") as f:
+            assert f.read() == girder.files["f1"]["content"]
+        assert girder.requests == [{"file":"f1", "range":None, "token":"token"}]
+        assert not os.path.exists(f"{filepath}.part")
+
+    def test_skipMatchingFile(self, girder, tmp_path):
+        handler = GirderHandler(str(tmp_path))
+        [(file, filepath)] = handler.listFiles("file", "f1", "mesh.msh")
+        with open(filepath, "wb") as f:
+            f.write(girder.files["f1"]["content"])
+        assert handler.fetchFile(file, filepath) == "skipped"
+        assert girder.requests == []
+
+    def test_redownloadChangedFile(self, girder, tmp_path):
+        handler = GirderHandler(str(tmp_path))
+        [(file, filepath)] = handler.listFiles("file", "f1", "mesh.msh")
+        with open(filepath, "wb") as f:
+            f.write(b"x" * 4000)
+        assert handler.fetchFile(file, filepath) == "downloaded"
+        with open(filepath, "rb") as f:
+            assert f.read() == girder.files["f1"]["content"]
+
+    def test_resume(self, girder, tmp_path):
+        handler = GirderHandler(str(tmp_path))
+        [(file, filepath)] = handler.listFiles("file", "f1", "mesh.msh")
+        with open(f"{filepath}.part", "wb") as f:
+            f.write(girder.files["f1"]["content"][:1500])
+        assert handler.fetchFile(file, filepath) == "downloaded"
+        with open(filepath, "rb") as f:
+            assert f.read() == girder.files["f1"]["content"]
+        assert girder.requests[0]["range"] == "bytes=1500-"
+
+    def test_checksumMismatch(self, girder, tmp_path):
+        handler = GirderHandler(str(tmp_path))
+        [(file, filepath)] = handler.listFiles("file", "f1", "mesh.msh")
+        with pytest.raises(ValueError, match="Checksum mismatch"):
+            handler.fetchFile(file, filepath, checksum="sha256:abc")
+        assert not os.path.exists(filepath)
+        assert not os.path.exists(f"{filepath}.part")
+
+    def test_listFilesRelativeBaseDir(self, girder, tmp_path, monkeypatch):
+        """ The download directory is only prepended once to the files of nested folders"""
+        monkeypatch.chdir(tmp_path)
+        handler = GirderHandler("data")
+        files = { file["_id"]: filepath for file, filepath in handler.listFiles("folder", "d1", "dest") }
+        assert files == { "f2":os.path.join("data","dest","multi","a.txt"), "f3":os.path.join("data","dest","multi","b.txt"), "f4":os.path.join("data","dest","sub","c.txt") }
+
+        prefetcher = Prefetcher()
+        prefetcher.addRemoteDependencies({ "data": RemoteData(girder={"folder":"d1"}, destination="dest") }, handler)
+        assert sorted(prefetcher.tasks) == ["data:multi/a.txt", "data:multi/b.txt", "data:sub/c.txt"]
+        prefetcher.run()
+        assert (tmp_path / "data" / "dest" / "sub" / "c.txt").read_bytes() == b"c"
+
+    def test_listFiles(self, girder, tmp_path):
+        handler = GirderHandler(str(tmp_path))
+        files = { file["_id"]: os.path.relpath(filepath, str(tmp_path)) for file, filepath in handler.listFiles("folder", "d1", "dest") }
+        assert files == { "f2":"dest/multi/a.txt", "f3":"dest/multi/b.txt", "f4":"dest/sub/c.txt" }
+        files = { file["_id"]: os.path.relpath(filepath, str(tmp_path)) for file, filepath in handler.listFiles("item", "i2", "dest") }
+        assert files == { "f4":"dest/c.txt" }
+
+
+class TestPrefetcher:
+
+    def test_remoteDependencies(self, girder, tmp_path):
+        prefetcher = Prefetcher(max_workers=2)
+        prefetcher.addRemoteDependencies({
+            "mesh": RemoteData(girder={"file":"f1"}, destination=str(tmp_path / "mesh.msh")),
+            "data": RemoteData(girder={"folder":"d1"}, destination=str(tmp_path / "data")),
+        }, GirderHandler(None))
+        statuses = prefetcher.run()
+        assert statuses == { "mesh":"downloaded", "data:multi/a.txt":"downloaded", "data:multi/b.txt":"downloaded", "data:sub/c.txt":"downloaded" }
+        assert (tmp_path / "data" / "sub" / "c.txt").read_bytes() == b"c"
+        assert set(prefetcher.run().values()) == {"skipped"}
+
+    def test_imagesOverlapDownloads(self, girder, tmp_path):
+        started = threading.Barrier(2, timeout=5)
+        def pullImage(executable, image):
+            started.wait()
+            return "pulled"
+        def fetchFile(file, filepath, checksum):
+            started.wait()
+            return "downloaded"
+        prefetcher = Prefetcher()
+        prefetcher.tasks = { "image:apptainer": (pullImage, "apptainer", None), "mesh": (fetchFile, None, None, None) }
+        assert prefetcher.run() == { "image:apptainer":"pulled", "mesh":"downloaded" }
+
+    def test_failures(self, tmp_path):
+        def fail():
+            raise ValueError("boom")
+        prefetcher = Prefetcher()
+        prefetcher.tasks = { "ok": (lambda: "downloaded",), "ko": (fail,) }
+        with pytest.raises(RuntimeError, match=r"ko \(boom\)"):
+            prefetcher.run()
+
+    def test_pullImage(self, tmp_path):
+        filepath = tmp_path / "image.sif"
+        filepath.write_bytes(b"image")
+        image = Image(url="oras://registry/image:latest", filepath=str(filepath), checksum=hashlib.sha256(b"image").hexdigest())
+        assert Prefetcher.pullImage("false", image) == "skipped"
+        image = Image(url="oras://registry/image:latest", filepath=str(filepath), checksum="sha256:abc")
+        with pytest.raises(ValueError, match="Checksum mismatch"):
+            Prefetcher.pullImage("true", image)
+
+    def test_pullImageOnce(self, tmp_path):
+        """ Without checksum, images are only pulled again if the url or the local file changed"""
+        filepath = tmp_path / "image.sif"
+        executable = f"touch {filepath}; true"
+        image = Image(url="oras://registry/image:latest", filepath=str(filepath))
+        assert Prefetcher.pullImage(executable, image) == "pulled"
+        assert Prefetcher.pullImage("false", image) == "skipped"
+
+        image = Image(url="oras://registry/image:v2", filepath=str(filepath))
+        assert Prefetcher.pullImage(executable, image) == "pulled"
+        assert Prefetcher.pullImage("false", image) == "skipped"
+
+        filepath.write_bytes(b"modified")
+        assert not Prefetcher.isPulled(image)
+
+
+class TestRemoteDataSchema:
+
+    def test_checksumOnlyForFiles(self):
+        assert RemoteData(girder={"file":"f1"}, destination="a", checksum="sha256:abc").checksum == "sha256:abc"
+        with pytest.raises(ValueError, match="single file"):
+            RemoteData(girder={"folder":"d1"}, destination="a", checksum="sha256:abc")
@@ -0,0 +1,80 @@
+""" Tests for the concurrent orchestration of benchmark configurations"""
+
+import os, sys, runpy
+import pytest
+from argparse import Namespace
+from feelpp.benchmarking.reframe.orchestrator import Orchestrator
+
+
+def buildArgs(**kwargs):
+    args = dict(
+        machine_config="/m.json", benchmark_config=["/configs/a.json","/configs/b.json","/configs/c.json"], plots_config=None,
+        custom_rfm_config=None, move_results=None, verbose=0, dry_run=False, resume=False, reframe_args=""
+    )
+    args.update(kwargs)
+    return Namespace(**args)
+
+
+class FakeOrchestrator(Orchestrator):
+    """ Runs a python snippet printing the configuration name, and exiting with 1 for config b"""
+    def buildCommand(self, config_filepath, rfm_config_path=None):
+        name = self.prefix(config_filepath)
+        return [sys.executable, "-c", f"import sys; print('start'); print('{rfm_config_path}'); sys.exit({int(name == 'b')})"]
+
+
+class TestOrchestrator:
+
+    def test_buildArgs(self):
+        orchestrator = Orchestrator(buildArgs(dry_run=True, verbose=2, reframe_args="--list"), 2)
+        assert orchestrator.buildArgs("/configs/a.json", "/tmp/rfm.py") == [
+            "--machine-config","/m.json","--benchmark-config","/configs/a.json","--custom-rfm-config","/tmp/rfm.py","-vv","--dry-run","--reframe-args=--list"
+        ]
+
+    def test_jobsBudget(self, tmp_path):
+        """ The jobs budget is split between concurrent processes through a derived ReFrame configuration"""
+        rfm_config = tmp_path/"reframe.py"
+        rfm_config.write_text("site_configuration = {'systems':[{'name':'m','partitions':[{'name':'p1'},{'name':'p2','max_jobs':100}]}]}")
+        orchestrator = Orchestrator(buildArgs(), 2, max_jobs=9, rfm_config_path=str(rfm_config), machine="m", work_dir=str(tmp_path/"work"))
+        assert orchestrator.jobsPerProcess() == 4
+        partitions = runpy.run_path(orchestrator.writeSiteConfiguration())["site_configuration"]["systems"][0]["partitions"]
+        assert [p["max_jobs"] for p in partitions] == [4,4]
+        assert Orchestrator(buildArgs(), 2).writeSiteConfiguration() is None
+        assert Orchestrator(buildArgs(benchmark_config=["/a.json"]), 8, max_jobs=4).jobsPerProcess() == 4
+
+        orchestrator = Orchestrator(buildArgs(benchmark_config=["/a.json","/b.json","/c.json","/d.json"]), 4, max_jobs=2)
+        assert orchestrator.max_concurrent == 2
+        assert orchestrator.jobsPerProcess() * orchestrator.max_concurrent <= 2
+
+    def test_run(self, capsys):
+        """ Outputs are prefixed by the configuration name and exit codes are aggregated"""
+        exit_codes = FakeOrchestrator(buildArgs(), 3).run()
+        assert exit_codes == {"/configs/a.json":0,"/configs/b.json":1,"/configs/c.json":0}
+        assert Orchestrator.exitCode(exit_codes) == 1
+        assert Orchestrator.exitCode({"a":0}) == 0
+
+        lines = capsys.readouterr().out.splitlines()
+        for name in ["a","b","c"]:
+            assert [line for line in lines if line.startswith(f"[{name}]")] == [f"[{name}] start", f"[{name}] None"]
+
+        summary = Orchestrator.summary(exit_codes)
+        assert "failed (1)" in summary and summary.count("success") == 2
+
+    def test_isolatedConfigs(self, tmp_path, capsys):
+        """ Configurations sharing a parameter space (thus ReFrame hashcodes) and started in the same second do not share directories"""
+        class IsolationOrchestrator(Orchestrator):
+            def buildCommand(self, config_filepath, rfm_config_path=None):
+                return [sys.executable, "-c", "; ".join([
+                    "from types import SimpleNamespace",
+                    "from feelpp.benchmarking.reframe.commandBuilder import CommandBuilder",
+                    f"builder = CommandBuilder(SimpleNamespace(machine='m', reports_base_dir='{tmp_path}', reframe_base_dir='{tmp_path}/reframe'), None)",
+                    "builder.current_date = '2026_01_01T00_00_00'",
+                    "print(builder.buildReframePrefix(), CommandBuilder.instanceName('samehash'), builder.createReportFolder('app','case'))",
+                ])]
+
+        configs = [str(tmp_path/"x"/"case.json"), str(tmp_path/"y"/"case.json")]
+        assert IsolationOrchestrator(buildArgs(benchmark_config=configs), 2).run() == {config:0 for config in configs}
+        outputs = [line.split("] ",1)[1].split() for line in capsys.readouterr().out.splitlines()]
+        prefixes, instances, report_folders = zip(*outputs)
+        assert len(set(prefixes)) == len(set(instances)) == len(set(report_folders)) == 2
+        assert all(instance.startswith("case_") and instance.endswith("_samehash") for instance in instances)
+        assert sorted(os.listdir(tmp_path/"app"/"case"/"m")) == ["2026_01_01T00_00_00","2026_01_01T00_00_00_1"]
@@ -0,0 +1,94 @@
+""" Tests for the adaptive parameter refinement"""
+
+import json, os
+import pytest
+from feelpp.benchmarking.reframe.parameters import ParameterFactory, AdaptiveParameter, ParameterHandler
+from feelpp.benchmarking.reframe.schemas.parameters import Parameter
+from pydantic import ValidationError
+
+
+def writeReport(dirpath, name, perfvalues, perfvar="total", param_name="nodes"):
+    """ Writes a minimal reframe_report.json, with one testcase by parameter value
+    Args:
+        dirpath (str): Directory where the report folder is created
+        name (str): Name of the report folder
+        perfvalues (dict): Performance value by parameter value. None values correspond to tests without performance values.
+    """
+    os.makedirs(os.path.join(dirpath,name))
+    testcases = [
+        {
+            "check_params": {param_name: x},
+            "perfvalues": {f"system:partition:{perfvar}": [v, 0, None, None, "s", "pass"]} if v is not None else {}
+        }
+        for x, v in perfvalues.items()
+    ]
+    with open(os.path.join(dirpath,name,"reframe_report.json"),"w") as f:
+        json.dump({"runs":[{"testcases":testcases}]},f)
+
+
+def buildAdaptive(history_dir, **adaptive):
+    config = {"min":1,"max":64,"n_initial":3,"perfvar":"total","budget":10}
+    config.update(adaptive)
+    return ParameterFactory.create(Parameter(name="nodes",adaptive=config), history_dir)
+
+
+class TestAdaptiveParameter:
+
+    def test_factory(self, tmp_path):
+        assert isinstance(buildAdaptive(str(tmp_path)), AdaptiveParameter)
+
+    @pytest.mark.parametrize(("spacing","integer","expected"),[
+        ("geometric", True, [1,8,64]),
+        ("linear", True, [1,32,64]),
+        ("linear", False, [1.0,32.5,64.0])
+    ])
+    def test_initialSweep(self, tmp_path, spacing, integer, expected):
+        """ Without history, the coarse initial sweep is generated"""
+        assert list(buildAdaptive(str(tmp_path),spacing=spacing,integer=integer).parametrize()) == expected
+
+    def test_pendingInitialPoints(self, tmp_path):
+        """ Initial points that were not run yet are generated before any refinement"""
+        writeReport(tmp_path,"r1",{1:100.0,64:10.0})
+        assert list(buildAdaptive(str(tmp_path)).parametrize()) == [8]
+
+    def test_efficiencyRefinement(self, tmp_path):
+        """ New points are inserted where the parallel efficiency changes the most"""
+        # Efficiency: 1 -> 1, 8 -> 1, 64 -> 0.25
+        writeReport(tmp_path,"r1",{1:64.0,8:8.0,64:4.0})
+        assert list(buildAdaptive(str(tmp_path),points_per_iteration=1).parametrize()) == [23]
+        assert list(buildAdaptive(str(tmp_path),points_per_iteration=2).parametrize()) == [23,3]
+
+    def test_thresholdRefinement(self, tmp_path):
+        """ With a threshold, only intervals where the target crosses it are refined"""
+        writeReport(tmp_path,"r1",{1:64.0,8:8.0,64:4.0})
+        assert list(buildAdaptive(str(tmp_path),threshold=0.5).parametrize()) == [23]
+        assert list(buildAdaptive(str(tmp_path),threshold=2).parametrize()) == []
+
+    def test_history(self, tmp_path):
+        """ All reports of the history are combined, and failed points are not run again"""
+        writeReport(tmp_path,"r1",{1:64.0,8:8.0,64:4.0})
+        writeReport(tmp_path,"r2",{23:None,3:21.0})
+        assert 23 not in list(buildAdaptive(str(tmp_path)).parametrize())
+
+    def test_budget(self, tmp_path):
+        writeReport(tmp_path,"r1",{1:64.0,8:8.0,64:4.0})
+        assert list(buildAdaptive(str(tmp_path),budget=4,points_per_iteration=3).parametrize()) == [23]
+        assert list(buildAdaptive(str(tmp_path),budget=3).parametrize()) == []
+
+    def test_handlerExhausted(self, tmp_path):
+        writeReport(tmp_path,"r1",{1:64.0,8:8.0,64:4.0})
+        handler = ParameterHandler([Parameter(name="nodes",adaptive={"min":1,"max":64,"perfvar":"total","budget":3})], str(tmp_path))
+        assert handler.adaptive_parameters == ["nodes"]
+        assert handler.isExhausted()
+
+    @pytest.mark.parametrize(("adaptive","match"),[
+        ({"min":64,"max":1}, "min should be lower than max"),
+        ({"min":0,"max":64}, "strictly positive bounds"),
+        ({"n_initial":1}, "at least 2 initial points"),
+        ({"budget":2}, "Budget"),
+    ])
+    def test_validation(self, adaptive, match):
+        config = {"min":1,"max":64,"n_initial":3,"perfvar":"total","budget":10}
+        config.update(adaptive)
+        with pytest.raises(ValidationError, match=match):
+            Parameter(name="nodes",adaptive=config)
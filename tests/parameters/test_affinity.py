@@ -0,0 +1,41 @@
+""" Tests for the CPU affinity probe"""
+
+import pytest
+from feelpp.benchmarking.reframe.affinity import AffinityProbe
+
+
+class TestAffinityProbe:
+
+    @pytest.mark.parametrize(("cpu_list","expected"),[
+        ("0-3", [0,1,2,3]), ("0,8", [0,8]), ("0-1,8,10-11", [0,1,8,10,11]), ("5\n", [5])
+    ])
+    def test_expandCpuList(self, cpu_list, expected):
+        assert AffinityProbe.expandCpuList(cpu_list) == expected
+
+    def test_command(self):
+        command = AffinityProbe.command("srun --cpu-bind=cores", "affinity.log")
+        assert command.startswith("srun --cpu-bind=cores sh -c '")
+        assert "/proc/self/status" in command
+        assert command.endswith("> affinity.log")
+
+    def test_parse(self, tmp_path):
+        probe_output = tmp_path/"affinity.log"
+        probe_output.write_text("node1 1 2-3\nnode1 0 0-1\nsrun: warning\nnode2 2 0-1\n")
+        ranks = AffinityProbe.parse(str(probe_output))
+        assert ranks == [
+            {"host":"node1","rank":0,"cpus":[0,1]},
+            {"host":"node1","rank":1,"cpus":[2,3]},
+            {"host":"node2","rank":2,"cpus":[0,1]}
+        ]
+        assert AffinityProbe.summarize(ranks) == {"0":"node1:0-1","1":"node1:2-3","2":"node2:0-1"}
+        assert AffinityProbe.check(ranks, max_cpus=2) == []
+        assert AffinityProbe.parse(str(tmp_path/"missing.log")) == []
+
+    def test_misPinned(self):
+        ranks = [
+            {"host":"node1","rank":0,"cpus":[0,1,2,3]},
+            {"host":"node1","rank":1,"cpus":[2,3]},
+        ]
+        issues = AffinityProbe.check(ranks, max_cpus=2)
+        assert issues == ["Rank 0 is allowed on 4 CPUs (expected at most 2)", "Ranks 0 and 1 share CPU 2 on node1"]
+        assert AffinityProbe.check(ranks, exclusive=False) == []
@@ -0,0 +1,97 @@
+""" Tests for the campaign cost estimator"""
+
+import json, os
+import pytest
+from feelpp.benchmarking.reframe.estimator import CostEstimator, HistoryModel, parseTimeout, formatTimeout
+from feelpp.benchmarking.reframe.parameters import ParameterHandler
+from feelpp.benchmarking.reframe.config.configReader import ConfigReader
+from feelpp.benchmarking.reframe.schemas.benchmarkSchemas import ConfigFile, TimeoutPolicy
+from feelpp.benchmarking.reframe.schemas.machines import MachineConfig
+
+
+def writeHistory(dirpath, testcases):
+    """ Writes a reframe_report.json file from a list of (check_params, num_tasks, time_run) tuples"""
+    os.makedirs(dirpath, exist_ok=True)
+    with open(os.path.join(dirpath,"reframe_report.json"),"w") as f:
+        json.dump({"runs":[{"testcases":[
+            {"partition":"default","result":"pass","check_params":params,"num_tasks":tasks,"time_run":time}
+            for params, tasks, time in testcases
+        ]}]},f)
+
+
+@pytest.fixture
+def estimator(tmp_path):
+    machine_config = tmp_path/"machine.json"
+    machine_config.write_text(json.dumps({ "machine":"mockMachine", "targets":["default:builtin:default"], "output_app_dir":str(tmp_path) }))
+    app_config = tmp_path/"app.json"
+    app_config.write_text(json.dumps({
+        "executable":"app", "use_case_name":"case", "timeout":"0-01:00:00",
+        "resources":{ "tasks":"{{parameters.tasks.value}}" },
+        "parameters":[ {"name":"tasks","sequence":[128,256,512]}, {"name":"solver","sequence":["cg","gmres"]} ]
+    }))
+    rfm_config = tmp_path/"reframe.py"
+    rfm_config.write_text("site_configuration = {'systems':[{'name':'mockMachine','partitions':[{'name':'default','processor':{'num_cpus':128}}]}]}")
+
+    machine_reader = ConfigReader(str(machine_config),MachineConfig,"machine",dry_run=True)
+    app_reader = ConfigReader(str(app_config),ConfigFile,"app",dry_run=True,additional_readers=[machine_reader])
+    history_dir = str(tmp_path/"reports")
+    return CostEstimator(app_reader, machine_reader, ParameterHandler(app_reader.config.parameters), str(rfm_config), history_dir)
+
+
+class TestEstimator:
+
+    def test_timeouts(self):
+        assert parseTimeout("1-02:03:04") == 93784
+        assert formatTimeout(93784) == "1-02:03:04"
+        assert formatTimeout(299.5) == "0-00:05:00"
+
+    def test_expandTests(self, estimator):
+        """ Resources are resolved for each combination of the parameter space"""
+        tests = list(estimator.expandTests())
+        assert len(tests) == 6
+        assert [(t["params"]["tasks"],t["num_nodes"]) for t in tests if t["params"]["solver"] == "cg"] == [(128,1),(256,2),(512,4)]
+        assert all(t["timeout"] == 3600 for t in tests)
+
+    def test_noHistory(self, estimator):
+        """ Without history, the configured timeout is used as prediction"""
+        estimates = estimator.estimate()
+        assert all(e["method"] == "none" and e["time"] == 3600 for e in estimates)
+        assert sum(e["node_hours"] for e in estimates) == pytest.approx(2*(1+2+4))
+
+    def test_history(self, estimator, tmp_path):
+        """ Exact matches use measured times, other tests are predicted by regression on numerical parameters"""
+        writeHistory(tmp_path/"reports"/"r1", [
+            ({"tasks":128,"solver":"cg"}, 128, 400.0),
+            ({"tasks":256,"solver":"cg"}, 256, 200.0),
+            ({"tasks":128,"solver":"gmres"}, 128, 800.0),
+        ])
+        estimator.model = HistoryModel(str(tmp_path/"reports"))
+        estimates = { (e["params"]["tasks"],e["params"]["solver"]): e for e in estimator.estimate() }
+
+        assert estimates[(128,"cg")]["method"] == "exact" and estimates[(128,"cg")]["time"] == 400
+        assert estimates[(512,"cg")]["method"] == "regression"
+        assert estimates[(512,"cg")]["time"] == pytest.approx(100)
+        assert estimates[(512,"cg")]["suggested_timeout"] == 300
+        assert estimates[(128,"gmres")]["time"] == 800
+
+        summary = estimator.summary(list(estimates.values()))
+        assert "Longest job : 800.0s" in summary
+        assert "Suggested timeout : 0-00:20:00 (configured : 0-01:00:00)" in summary
+
+    def test_timeLimit(self, tmp_path):
+        """ Time limits are predicted times with a safety factor, rounded up to the minute and bounded"""
+        writeHistory(tmp_path/"reports", [ ({"tasks":128},128,400.0), ({"tasks":256},256,200.0) ])
+        model = HistoryModel(str(tmp_path/"reports"))
+        assert model.timeLimit("default", {"tasks":128,"num_tasks":128}, 3600) == 600
+        assert model.timeLimit("default", {"tasks":128,"num_tasks":128}, 3600, safety_factor=2, floor=60, ceiling=700) == 700
+        assert model.timeLimit("default", {"tasks":512,"num_tasks":512}, 3600, floor=60) == 180
+        assert model.timeLimit("default", {"tasks":512,"num_tasks":512}, 3600) == 300
+        assert HistoryModel(None).timeLimit("default", {"tasks":128,"num_tasks":128}, 3600) == 3600
+
+    def test_timeoutPolicy(self, estimator, tmp_path):
+        """ The configured timeout policy is used to compute suggested timeouts"""
+        writeHistory(tmp_path/"reports"/"r1", [ ({"tasks":128,"solver":"cg"}, 128, 400.0) ])
+        estimator.model = HistoryModel(str(tmp_path/"reports"))
+        estimator.app_reader.config.timeout_policy = TimeoutPolicy(safety_factor=1.2, floor="0-00:01:00")
+        estimates = { (e["params"]["tasks"],e["params"]["solver"]): e for e in estimator.estimate() }
+        assert estimates[(128,"cg")]["suggested_timeout"] == 480
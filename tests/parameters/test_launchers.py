@@ -0,0 +1,36 @@
+""" Tests for the launcher-specific commands"""
+
+import pytest
+from feelpp.benchmarking.reframe.launchers import LauncherCommands
+
+
+class LauncherMocker:
+    """ Mocks a ReFrame launcher"""
+    def __init__(self, registered_name, base_command):
+        self.registered_name = registered_name
+        self.base_command = base_command
+
+    def run_command(self, job):
+        return self.base_command
+
+
+class TestLauncherCommands:
+
+    @pytest.mark.parametrize(("name","base_command","num_nodes","expected"), [
+        ("srun", "srun --exact", 4, "srun --exact --nodes=4 --ntasks=4 --ntasks-per-node=1"),
+        ("mpirun-openmpi", "mpirun -np 128", 4, "mpirun -np 4 --map-by ppr:1:node"),
+        ("mpirun-intelmpi", "mpirun -np 128", 4, "mpirun -np 4 -ppn 1"),
+        ("mpiexec", "mpiexec -n 4", 1, ""),
+        ("local", "", 1, ""),
+    ])
+    def test_perNode(self, name, base_command, num_nodes, expected):
+        assert LauncherCommands.perNode(LauncherMocker(name, base_command), None, num_nodes) == expected
+
+    @pytest.mark.parametrize("name", ["mpiexec", "mpirun", "local"])
+    def test_unsupportedLauncher(self, name):
+        with pytest.raises(ValueError, match=f"not supported with the {name} launcher"):
+            LauncherCommands.perNode(LauncherMocker(name, name), None, 2)
+
+    def test_shell(self):
+        assert LauncherCommands.shell("srun --nodes=2", "echo 'a'") == "srun --nodes=2 sh -c 'echo '\"'\"'a'\"'\"''"
+        assert LauncherCommands.shell("", "hostname") == "sh -c hostname"
@@ -0,0 +1,63 @@
+""" Tests for the peak memory probe and memory model"""
+
+import json, os, subprocess
+import pytest
+from feelpp.benchmarking.reframe.memory import MemoryProbe
+from feelpp.benchmarking.reframe.estimator import MemoryModel
+from feelpp.benchmarking.reframe.schemas.resources import MemoryPolicy
+from pydantic import ValidationError
+
+
+def writeHistory(dirpath, testcases):
+    """ Writes a reframe_report.json file from a list of (check_params, num_tasks, memory_peak) tuples"""
+    os.makedirs(dirpath, exist_ok=True)
+    with open(os.path.join(dirpath,"reframe_report.json"),"w") as f:
+        json.dump({"runs":[{"testcases":[
+            {"partition":"default","result":"pass","check_params":params,"num_tasks":tasks,"memory_peak":memory_peak}
+            for params, tasks, memory_peak in testcases
+        ]}]},f)
+
+
+class TestMemoryProbe:
+
+    def test_command(self, tmp_path):
+        command = MemoryProbe.command("srun --nodes=4 --ntasks=4 --ntasks-per-node=1", "memory.log")
+        assert command.startswith("srun --nodes=4 --ntasks=4 --ntasks-per-node=1 sh -c '")
+        assert command.endswith("> memory.log")
+
+        #Single node jobs run the probe without launcher
+        subprocess.run(["sh","-c",MemoryProbe.command("", "memory.log")], cwd=tmp_path, check=True)
+        assert len((tmp_path/"memory.log").read_text().split()) == 2
+
+    def test_probe(self):
+        """ The probe is a valid shell script, printing the host and a number of bytes"""
+        output = subprocess.run(["sh","-c",MemoryProbe.probe], capture_output=True, text=True, check=True).stdout.split()
+        assert len(output) == 2 and output[1].isdigit()
+
+    def test_parse(self, tmp_path):
+        probe_output = tmp_path/"memory.log"
+        probe_output.write_text(f"node1 {2*1024**3}\nnode2 {3*1024**3}\nnode3 0\nsrun: warning\n")
+        assert MemoryProbe.parse(str(probe_output)) == {"node1":2.0,"node2":3.0}
+        assert MemoryProbe.parse(str(tmp_path/"missing.log")) == {}
+
+
+class TestMemoryModel:
+
+    def test_validation(self):
+        with pytest.raises(ValidationError, match="headroom"):
+            MemoryPolicy(headroom=0.9)
+
+    def test_requirement(self, tmp_path):
+        """ Total memory is the sum of node peaks. Unseen sizes are extrapolated, and the default is used without history"""
+        writeHistory(tmp_path, [
+            ({"elements":1000,"tasks":128}, 128, {"node1":10.0}),
+            ({"elements":2000,"tasks":128}, 128, {"node1":10.0,"node2":10.0}),
+            ({"elements":2000,"tasks":256}, 256, {"node1":11.0,"node2":11.0}),
+        ])
+        model = MemoryModel(str(tmp_path))
+        assert all("num_tasks" not in params for _, params, _ in model.records)
+        assert model.requirement("default", {"elements":1000,"tasks":128}, 0) == 12
+        assert model.requirement("default", {"elements":2000,"tasks":256}, 0, headroom=1) == 22
+        predicted, method = model.predict("default", {"elements":4000,"tasks":128})
+        assert method == "regression" and predicted == pytest.approx(40, rel=0.05)
+        assert MemoryModel(None).requirement("default", {"elements":1000}, 100) == 100
@@ -0,0 +1,72 @@
+""" Tests for the constrained parameter space generation"""
+
+import itertools
+import pytest
+from feelpp.benchmarking.reframe.parameters import ParameterHandler
+from feelpp.benchmarking.reframe.schemas.parameters import Parameter
+
+
+def buildHandler(parameters):
+    return ParameterHandler([Parameter(**p) for p in parameters])
+
+
+class TestParameterHandler:
+    """ Tests the lazy constrained cartesian product of the ParameterHandler"""
+
+    memory_mesh = [
+        {"name":"memory","sequence":[512,1024,2048]},
+        {"name":"mesh","sequence":["M1","M2","M3"],"conditions":{ "M1":[{"memory":[512]}], "M2":[{"memory":[1024]}], "M3":[{"memory":[2048]}] }}
+    ]
+
+    def test_noConditions(self):
+        """ Without conditions, the full cartesian product is generated, in declaration order"""
+        handler = buildHandler([ {"name":"a","sequence":[1,2]}, {"name":"b","sequence":["x","y","z"]} ])
+        assert not handler.hasConditions()
+        assert list(handler.constrainedProduct()) == [ {"a":a,"b":b} for a,b in itertools.product([1,2],["x","y","z"]) ]
+        assert handler.count() == 6
+
+    def test_conditions(self):
+        """ Only combinations satisfying the conditions are generated"""
+        handler = buildHandler(self.memory_mesh)
+        assert handler.hasConditions()
+        assert list(handler.constrainedProduct()) == [
+            {"memory":512,"mesh":"M1"}, {"memory":1024,"mesh":"M2"}, {"memory":2048,"mesh":"M3"}
+        ]
+        assert handler.count() == 3
+
+    def test_nestedFilters(self):
+        """ Filters can refer to subparameters, and a condition is valid if any of its filter sets is satisfied"""
+        handler = buildHandler([
+            {"name":"resources","sequence":[{"tasks":1,"nodes":1},{"tasks":4,"nodes":1},{"tasks":8,"nodes":2}]},
+            {"name":"solver","sequence":["direct","iterative"],"conditions":{
+                "direct":[{"resources.tasks":[1]},{"resources.nodes":[2]}]
+            }}
+        ])
+        assert [ (c["resources"]["tasks"],c["solver"]) for c in handler.constrainedProduct() ] == [
+            (1,"direct"), (1,"iterative"), (4,"iterative"), (8,"direct"), (8,"iterative")
+        ]
+
+    def test_earlyPruning(self):
+        """ Conditions are evaluated as soon as their parameters are set, so invalid prefixes are not expanded"""
+        handler = buildHandler([
+            {"name":"a","sequence":[1,2,3],"conditions":{ "2":[{"a":[1]}], "3":[{"a":[1]}] }},
+            {"name":"b","range":{"min":0,"max":99,"step":1}},
+            {"name":"c","range":{"min":0,"max":99,"step":1}}
+        ])
+        calls = []
+        check = ParameterHandler.checkConditions
+        def countingCheck(param_config, combination):
+            calls.append(dict(combination))
+            return check(param_config, combination)
+        handler.checkConditions = countingCheck
+
+        assert handler.count() == 100*100
+        assert len(calls) == 3
+
+    def test_unknownFilter(self):
+        handler = buildHandler([ {"name":"a","sequence":[1,2],"conditions":{"1":[{"b":[1]}]}} ])
+        with pytest.raises(ValueError, match="unknown or inactive parameters"):
+            list(handler.constrainedProduct())
+
+    def test_formatCombination(self):
+        assert ParameterHandler.formatCombination({"memory":512,"mesh":"M1"}) == "memory=512,mesh=M1"
@@ -0,0 +1,114 @@
+""" Tests for the prepare stage of benchmarks"""
+
+import os, json, subprocess
+import pytest
+from feelpp.benchmarking.reframe.prepare import PrepareStage
+from feelpp.benchmarking.reframe.schemas.benchmarkSchemas import Prepare, ConfigFile
+
+
+@pytest.fixture
+def stage(tmp_path):
+    return PrepareStage(
+        Prepare(keys=["mesh.name","tasks"], command="partition --mesh {{parameters.mesh.name.value}} --parts {{parameters.tasks.value}} --odir {{prepare.directory}}"),
+        str(tmp_path / ".prepare" / "case")
+    )
+
+
+class TestPrepareStage:
+    combinations = [
+        {"mesh":{"name":"M1","path":"/m1.geo"}, "tasks":1, "solver":"gmres"},
+        {"mesh":{"name":"M1","path":"/m1.geo"}, "tasks":1, "solver":"cg"},
+        {"mesh":{"name":"M1","path":"/m1.geo"}, "tasks":2, "solver":"gmres"},
+        {"mesh":{"name":"M2","path":"/m2.geo"}, "tasks":2, "solver":"gmres"},
+    ]
+
+    def test_keys(self, stage):
+        assert stage.keyValues(self.combinations[0]) == {"mesh.name":"M1", "tasks":1}
+        assert stage.keys(self.combinations) == [
+            {"mesh.name":"M1", "tasks":1}, {"mesh.name":"M1", "tasks":2}, {"mesh.name":"M2", "tasks":2}
+        ]
+        assert PrepareStage.formatKey({"mesh.name":"M1", "tasks":1}) == "mesh.name=M1,tasks=1"
+
+    def test_directory(self, stage, tmp_path):
+        directory = stage.directory({"mesh.name":"M1", "tasks":1})
+        assert os.path.dirname(directory) == str(tmp_path / ".prepare" / "case")
+        assert directory == stage.directory({"tasks":1, "mesh.name":"M1"})
+        assert directory != stage.directory({"mesh.name":"M1", "tasks":2})
+        other_command = PrepareStage(Prepare(keys=["mesh.name","tasks"], command="other"), stage.base_dir)
+        assert directory != other_command.directory({"mesh.name":"M1", "tasks":1})
+
+    def test_command(self, tmp_path):
+        stage = PrepareStage(Prepare(keys=["mesh","tasks"], command="partition {{parameters.mesh.path.value}} {{parameters.tasks.value}} {{prepare.directory}}"), str(tmp_path))
+        key_values = stage.keyValues(self.combinations[0])
+        assert stage.command(key_values) == f"partition /m1.geo 1 {stage.directory(key_values)}"
+
+    def test_runOnce(self, stage, tmp_path):
+        """ The stage script runs the command only if the outputs are not complete"""
+        key_values = {"mesh.name":"M1", "tasks":1}
+        counter = tmp_path / "counter"
+        command = f"echo run >> {counter}"
+        script = "\n".join(stage.prerunCommands(key_values) + [command] + stage.postrunCommands(key_values))
+        for _ in range(2):
+            subprocess.run(["bash", "-c", script], check=True)
+        assert stage.isComplete(key_values)
+        assert counter.read_text() == "run\n"
+
+    def test_failedCommand(self, stage):
+        key_values = {"mesh.name":"M1", "tasks":1}
+        script = "\n".join(stage.prerunCommands(key_values) + ["false"] + stage.postrunCommands(key_values))
+        subprocess.run(["bash", "-c", script])
+        assert not stage.isComplete(key_values)
+
+    def test_pruneReport(self, tmp_path):
+        report = {
+            "session_info": {"num_cases":5, "num_failures":1, "num_aborted":1, "num_skipped":1},
+            "runs": [{
+                "num_cases":5, "num_failures":1, "num_aborted":1, "num_skipped":1,
+                "testcases": [
+                    {"name":"PrepareTest %prepare_key=tasks=1", "result":"pass"},
+                    {"name":"PrepareTest %prepare_key=tasks=2", "result":"fail"},
+                    {"name":"PrepareTest %prepare_key=tasks=4", "result":"abort"},
+                    {"name":"RegressionTest %tasks=1", "result":"pass"},
+                    {"name":"RegressionTest %tasks=2", "result":"skip"},
+                ]
+            }]
+        }
+        filepath = tmp_path / "reframe_report.json"
+        filepath.write_text(json.dumps(report))
+        assert PrepareStage.pruneReport(str(filepath)) == 3
+        pruned = json.loads(filepath.read_text())
+        assert [t["name"] for t in pruned["runs"][0]["testcases"]] == ["RegressionTest %tasks=1", "RegressionTest %tasks=2"]
+        assert (pruned["runs"][0]["num_cases"], pruned["runs"][0]["num_failures"], pruned["runs"][0]["num_aborted"], pruned["runs"][0]["num_skipped"]) == (2, 0, 0, 1)
+        assert pruned["session_info"] == {"num_cases":2, "num_failures":0, "num_aborted":0, "num_skipped":1}
+
+
+class TestPrepareSchema:
+
+    def test_unknownKey(self):
+        config = {
+            "executable":"app", "use_case_name":"case",
+            "parameters":[{"name":"tasks","sequence":[1,2]}],
+            "prepare":{"keys":["tasks"], "command":"partition"}
+        }
+        assert ConfigFile(**config).prepare.keys == ["tasks"]
+        config["prepare"]["keys"] = ["mesh"]
+        with pytest.raises(ValueError, match="Prepare key mesh is not a parameter"):
+            ConfigFile(**config)
+        config["prepare"]["keys"] = []
+        with pytest.raises(ValueError, match="at least one parameter"):
+            ConfigFile(**config)
+
+    @pytest.mark.parametrize("command", [
+        "partition {{parameters.solver.value}}",
+        "partition {{parameters.mesh.path.value}}",
+        "partition {{output_directory}}",
+        "partition {{parameters.{{key}}.value}}",
+    ])
+    def test_commandPlaceholders(self, command):
+        """ The command can only depend on the keys, as its outputs are cached by key"""
+        with pytest.raises(ValueError, match="can only use"):
+            Prepare(keys=["mesh.name","tasks"], command=command)
+
+    def test_keyPlaceholders(self):
+        Prepare(keys=["mesh","tasks"], command="partition {{ parameters.mesh.path.value }} {{parameters.tasks.value}} {{prepare.directory}}")
+        Prepare(keys=["mesh.name"], command="partition {{parameters.mesh.name.value}}")
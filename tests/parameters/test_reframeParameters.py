@@ -22,6 +22,7 @@ def setup_environment():
     """Set environment variables required for ReFrame tests."""
     os.environ["MACHINE_CONFIG_FILEPATH"] = "./tests/data/configs/mockMachineConfig.json"
     os.environ["APP_CONFIG_FILEPATH"] = "./tests/data/configs/mockAppConfig.json"
+    os.environ["FEELPP_BENCHMARKING_NO_CONFIG_CACHE"] = "1"
 
 
 class TestReframeParameters:
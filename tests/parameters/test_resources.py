@@ -1,11 +1,13 @@
 import pytest
-from feelpp.benchmarking.reframe.resources import TaskAndTaskPerNodeStrategy, NodesAndTasksPerNodeStrategy, TasksAndNodesStrategy, TasksStrategy, MemoryEnforcer, ExclusiveAccessEnforcer, ResourceHandler, GpusPerNodeStrategy
+from feelpp.benchmarking.reframe.resources import TaskAndTaskPerNodeStrategy, NodesAndTasksPerNodeStrategy, TasksAndNodesStrategy, TasksStrategy, MemoryEnforcer, ExclusiveAccessEnforcer, ResourceHandler, GpusPerNodeStrategy, CpusPerTaskStrategy, PlacementStrategy
 
 
 class ResourcesMocker:
     """ Mocks the resources object """
-    def __init__(self, tasks = None, tasks_per_node = None, nodes = None, memory = None, exclusive_access = None, gpus_per_node = None):
+    def __init__(self, tasks = None, tasks_per_node = None, nodes = None, memory = None, exclusive_access = None, gpus_per_node = None, cpus_per_task = None, placement = None):
         self.tasks = tasks
+        self.cpus_per_task = cpus_per_task
+        self.placement = placement
         self.tasks_per_node = tasks_per_node
         self.nodes = nodes
         self.memory = memory
@@ -15,21 +17,29 @@ class ResourcesMocker:
 
 class RfmTestMocker:
     """ Mocks the rfm_test object (a ReFrame Test) """
-    def __init__(self, num_cpus, memory_per_node):
-        self.current_partition = self.Partition(num_cpus=num_cpus, memory_per_node=memory_per_node)
+    def __init__(self, num_cpus, memory_per_node, num_sockets = None, num_numa_nodes = None):
+        self.current_partition = self.Partition(num_cpus=num_cpus, memory_per_node=memory_per_node, num_sockets=num_sockets, num_numa_nodes=num_numa_nodes)
         self.job = self.Job()
+        self.env_vars = {}
 
     class Job:
         def __init__(self):
             self.options = []
+            self.launcher = self.Launcher()
+
+        class Launcher:
+            def __init__(self):
+                self.options = []
     class Partition:
-        def __init__(self, num_cpus, memory_per_node):
-            self.processor = self.Processor(num_cpus=num_cpus)
+        def __init__(self, num_cpus, memory_per_node, num_sockets = None, num_numa_nodes = None):
+            self.processor = self.Processor(num_cpus=num_cpus, num_sockets=num_sockets, num_numa_nodes=num_numa_nodes)
             self.extras = {"memory_per_node": memory_per_node}
 
         class Processor:
-            def __init__(self, num_cpus):
+            def __init__(self, num_cpus, num_sockets = None, num_numa_nodes = None):
                 self.num_cpus = num_cpus
+                self.num_sockets = num_sockets
+                self.num_numa_nodes = num_numa_nodes
 
 
 class TestResourcesStrategies:
@@ -146,6 +156,76 @@ class TestResourcesStrategies:
         if not fails:
             assert rfm_test.num_gpus_per_node == gpus_per_node
 
+    @pytest.mark.parametrize(("tasks","cpus_per_task","expected_nodes","expected_tasks_per_node"), [
+        (32, 4, 1, 32), (64, 4, 2, 32), (16, 8, 1, 16), (4, 64, 2, 2), (1, 128, 1, 1)
+    ])
+    def test_tasksStrategyWithCpusPerTask(self, tasks, cpus_per_task, expected_nodes, expected_tasks_per_node):
+        """ Tests that the TasksStrategy places tasks according to the number of CPUs per task"""
+        rfm_test = RfmTestMocker(num_cpus=128, memory_per_node=1000)
+        resources = ResourcesMocker(tasks=tasks, cpus_per_task=cpus_per_task)
+        self.strategyTest(TasksStrategy(), resources, rfm_test, False)
+        self.strategyTest(CpusPerTaskStrategy(), resources, rfm_test, False)
+        assert rfm_test.num_nodes == expected_nodes
+        assert rfm_test.num_tasks_per_node == expected_tasks_per_node
+
+    @pytest.mark.parametrize(("tasks_per_node","cpus_per_task","fails"), [
+        (32, 4, False), (16, 8, False), (128, 1, False), (64, 4, True), (32, 0, True)
+    ])
+    def test_cpusPerTaskStrategy(self, tasks_per_node, cpus_per_task, fails):
+        """ Tests the CpusPerTaskStrategy
+        Checks that threads are validated against the node capacity, and that OpenMP variables are set
+        """
+        rfm_test = RfmTestMocker(num_cpus=128, memory_per_node=1000)
+        rfm_test.env_vars["OMP_PLACES"] = "threads"
+        resources = ResourcesMocker(tasks_per_node=tasks_per_node, nodes=2, cpus_per_task=cpus_per_task)
+        NodesAndTasksPerNodeStrategy().configure(resources, rfm_test)
+        self.strategyTest(CpusPerTaskStrategy(), resources, rfm_test, fails)
+        assert rfm_test.num_cpus_per_task == cpus_per_task
+        assert rfm_test.env_vars["OMP_NUM_THREADS"] == str(cpus_per_task)
+        assert rfm_test.env_vars["OMP_PROC_BIND"] == "close"
+        assert rfm_test.env_vars["OMP_PLACES"] == "threads"
+
+    @pytest.mark.parametrize(("placement","tasks_per_node","expected_options","fails"), [
+        ("block", 128, ["--distribution=block:block", "--cpu-bind=cores"], False),
+        ("socket", 128, ["--distribution=block:cyclic", "--cpu-bind=cores"], False),
+        ("numa", 64, ["--distribution=block:cyclic", "--cpu-bind=ldoms"], False),
+        ("socket", 3, ["--distribution=block:cyclic", "--cpu-bind=cores"], True),
+        ("numa", 12, ["--distribution=block:cyclic", "--cpu-bind=ldoms"], True),
+    ])
+    def test_placementStrategy(self, placement, tasks_per_node, expected_options, fails):
+        """ Tests the PlacementStrategy
+        Checks that distribution and binding options are set, and that tasks can be evenly distributed accross domains
+        """
+        rfm_test = RfmTestMocker(num_cpus=128, memory_per_node=1000, num_sockets=2, num_numa_nodes=8)
+        resources = ResourcesMocker(tasks_per_node=tasks_per_node, nodes=1, placement=placement)
+        NodesAndTasksPerNodeStrategy().configure(resources, rfm_test)
+        self.strategyTest(PlacementStrategy(), resources, rfm_test, fails)
+        assert rfm_test.job.launcher.options == expected_options
+        if placement == "socket" and not fails:
+            assert rfm_test.num_tasks_per_socket == tasks_per_node // 2
+
+    def test_placementTopology(self):
+        """ Tests that the processor topology is required for socket and NUMA placements"""
+        rfm_test = RfmTestMocker(num_cpus=128, memory_per_node=1000)
+        resources = ResourcesMocker(tasks_per_node=64, nodes=1, placement="numa")
+        NodesAndTasksPerNodeStrategy().configure(resources, rfm_test)
+        self.strategyTest(PlacementStrategy(), resources, rfm_test, True)
+        with pytest.raises(ValueError, match="Unknown placement"):
+            PlacementStrategy().configure(ResourcesMocker(tasks=1, placement="scatter"), rfm_test)
+
+    def test_placementLauncher(self):
+        """ Tests that placements are rejected with launchers other than srun"""
+        rfm_test = RfmTestMocker(num_cpus=128, memory_per_node=1000, num_sockets=2)
+        resources = ResourcesMocker(tasks_per_node=64, nodes=1, placement="socket")
+        NodesAndTasksPerNodeStrategy().configure(resources, rfm_test)
+        rfm_test.job.launcher.registered_name = "mpiexec"
+        with pytest.raises(ValueError, match="requires the srun launcher"):
+            PlacementStrategy().configure(resources, rfm_test)
+        assert rfm_test.job.launcher.options == []
+        rfm_test.job.launcher.registered_name = "srun"
+        PlacementStrategy().configure(resources, rfm_test)
+        assert rfm_test.job.launcher.options == ["--distribution=block:cyclic", "--cpu-bind=cores"]
+
     @pytest.mark.parametrize(("tasks","memory","expected_nodes","expected_tasks_per_node"), [
         (128, 900, 1, 128), (128, 1000, 1, 128), (128, 1100, 2, None), (128, 2100, 3, None),
         (64, 500, 1, 64), (64, 1000, 1, 64), (64, 1100, 2, None),
@@ -215,6 +295,7 @@ class TestResourceHandler:
         ({"tasks": 128, "exclusive_access":False}, False),
         ({"tasks": 128, "memory":100,"exclusive_access":False}, False),
         ({"tasks":64,"gpus_per_node": 2, "memory":100,"exclusive_access":False}, False),
+        ({"tasks":64,"cpus_per_task": 4,"exclusive_access":True}, False),
     ])
     def test_setResources(self, args, fails):
         """ Tests the ResourceHandler setResources method
@@ -0,0 +1,78 @@
+""" Tests for the parameter space samplers"""
+
+import numpy as np
+import pytest
+from feelpp.benchmarking.reframe.parameters import ParameterHandler
+from feelpp.benchmarking.reframe.sampling import SamplerFactory, SobolSampler, LatinHypercubeSampler, RandomSampler
+from feelpp.benchmarking.reframe.schemas.parameters import Parameter, Sampling
+from pydantic import ValidationError
+
+
+def buildHandler(parameters, **sampling):
+    return ParameterHandler([Parameter(**p) for p in parameters], sampling=Sampling(**sampling))
+
+
+large_space = [ {"name":f"p{i}","range":{"min":0,"max":9,"step":1}} for i in range(10) ]
+
+
+class TestSampling:
+
+    @pytest.mark.parametrize(("method","sampler_type"),[
+        ("lhs",LatinHypercubeSampler), ("sobol",SobolSampler), ("random",RandomSampler)
+    ])
+    def test_factory(self, method, sampler_type):
+        assert isinstance(SamplerFactory.create(Sampling(method=method,n_samples=2)), sampler_type)
+
+    @pytest.mark.parametrize("method",["lhs","sobol","random"])
+    def test_sampleSize(self, method):
+        """ The requested number of distinct combinations is selected, deterministically for a given seed"""
+        handler = buildHandler(large_space, method=method, n_samples=20, seed=3)
+        combinations = list(handler.combinations())
+        assert len(combinations) == 20 == handler.count()
+        assert len({tuple(c.values()) for c in combinations}) == 20
+        assert combinations == list(buildHandler(large_space, method=method, n_samples=20, seed=3).combinations())
+        assert combinations != list(buildHandler(large_space, method=method, n_samples=20, seed=4).combinations())
+
+    def test_latinHypercubeCoverage(self):
+        """ With as many samples as values, each value of each parameter is selected exactly once"""
+        combinations = list(buildHandler(large_space, method="lhs", n_samples=10).combinations())
+        for name in [p["name"] for p in large_space]:
+            assert sorted(c[name] for c in combinations) == list(range(10))
+
+    def test_sobolPoints(self):
+        """ Without shift, the first points of the sequence are the reference Sobol points"""
+        sampler = SobolSampler(Sampling(method="sobol",n_samples=4))
+        class NoShift:
+            def integers(self, low, high, size, dtype):
+                return np.zeros(size, dtype=dtype)
+        points = sampler.points(NoShift(), 3)
+        assert np.allclose([next(points) for _ in range(4)], [[0,0,0],[0.5,0.5,0.5],[0.75,0.25,0.25],[0.25,0.75,0.75]])
+
+    def test_sobolDimension(self):
+        sampler = SobolSampler(Sampling(method="sobol",n_samples=4))
+        with pytest.raises(ValueError, match="Sobol sampling is only implemented"):
+            sampler.directionNumbers(30)
+
+    @pytest.mark.parametrize("method",["lhs","sobol","random"])
+    def test_conditions(self, method):
+        """ Sampled combinations respect parameter conditions"""
+        parameters = large_space + [{"name":"solver","sequence":["direct","iterative"],"conditions":{"direct":[{"p0":[0,1,2]}]}}]
+        handler = buildHandler(parameters, method=method, n_samples=30)
+        combinations = list(handler.combinations())
+        assert len(combinations) == 30
+        assert all(c["p0"] in [0,1,2] for c in combinations if c["solver"] == "direct")
+
+    def test_smallSpace(self):
+        """ If the space is smaller than the number of samples, all valid combinations are returned"""
+        handler = buildHandler([
+            {"name":"a","sequence":[1,2,3]},
+            {"name":"b","sequence":["x","y"],"conditions":{"y":[{"a":[1]}]}}
+        ], n_samples=10)
+        assert handler.isCombined()
+        assert list(handler.combinations()) == [{"a":1,"b":"x"},{"a":1,"b":"y"},{"a":2,"b":"x"},{"a":3,"b":"x"}]
+
+    def test_validation(self):
+        with pytest.raises(ValidationError, match="strictly positive"):
+            Sampling(n_samples=0)
+        with pytest.raises(ValidationError):
+            Sampling(method="halton",n_samples=2)
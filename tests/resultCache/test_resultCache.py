@@ -0,0 +1,91 @@
+""" Tests for the test case result cache"""
+
+import json, os
+import pytest
+from feelpp.benchmarking.reframe.resultCache import ResultCache
+
+
+def writeConfig(filepath, content):
+    with open(filepath,"w") as f:
+        json.dump(content,f)
+    return str(filepath)
+
+
+def writeReport(report_folder, testcases):
+    os.makedirs(report_folder, exist_ok=True)
+    with open(os.path.join(report_folder,"reframe_report.json"),"w") as f:
+        json.dump({"session_info":{"num_cases":len(testcases),"num_skipped":sum(t["result"]=="skip" for t in testcases)},"runs":[{
+            "num_cases":len(testcases), "num_skipped":sum(t["result"]=="skip" for t in testcases), "testcases":testcases
+        }]},f)
+
+
+class TestResultCache:
+
+    app_config = {"executable":"app","use_case_name":"case","options":["--n {{parameters.n.value}}"],"parameters":[{"name":"n","sequence":[1,2]}],"timeout":"0-00:10:00"}
+    machine_config = {"machine":"m","targets":"default:builtin:default","reports_base_dir":"./reports","execution_policy":"serial"}
+
+    def test_configDigest(self, tmp_path):
+        """ Only fields changing results are part of the digest. Parameter definitions are not, so that sweeps can be extended"""
+        machine = writeConfig(tmp_path/"machine.json", self.machine_config)
+        digest = ResultCache.configDigest(writeConfig(tmp_path/"app.json", self.app_config), machine)
+
+        extended = dict(self.app_config, parameters=[{"name":"n","sequence":[1,2,3]}], timeout="0-01:00:00")
+        assert ResultCache.configDigest(writeConfig(tmp_path/"app2.json", extended), machine) == digest
+
+        changed = dict(self.app_config, options=["--n {{parameters.n.value}}","--verbose"])
+        assert ResultCache.configDigest(writeConfig(tmp_path/"app3.json", changed), machine) != digest
+
+        machine_async = writeConfig(tmp_path/"machine2.json", dict(self.machine_config, execution_policy="async", reports_base_dir="/other"))
+        assert ResultCache.configDigest(str(tmp_path/"app.json"), machine_async) == digest
+
+    def test_configDigestWithComments(self, tmp_path):
+        """ Configurations with comments are parsed, so that extending a sweep keeps the same digest"""
+        machine = writeConfig(tmp_path/"machine.json", self.machine_config)
+        (tmp_path/"app.json").write_text(
+            '{\n    "executable":"app", "use_case_name":"case",\n    //Application options\n    "options":["--n {{parameters.n.value}}"],\n'
+            '    "parameters":[{"name":"n","sequence":[1,2]}],\n}'
+        )
+        digest = ResultCache.configDigest(str(tmp_path/"app.json"), machine)
+        (tmp_path/"app2.json").write_text(
+            '{\n    "executable":"app", "use_case_name":"case",\n    /* Other comment */\n    "options":["--n {{parameters.n.value}}"],\n'
+            '    "parameters":[{"name":"n","sequence":[1,2,3]}]\n}'
+        )
+        assert ResultCache.configDigest(str(tmp_path/"app2.json"), machine) == digest
+
+    def test_key(self, tmp_path):
+        key = ResultCache.key("digest", {"n":1,"m":{"a":2}}, "default", "env")
+        assert key == ResultCache.key("digest", {"m":{"a":2},"n":1}, "default", "env")
+        assert key != ResultCache.key("digest", {"n":2,"m":{"a":2}}, "default", "env")
+        assert key != ResultCache.key("digest", {"n":1,"m":{"a":2}}, "gpu", "env")
+        assert key != ResultCache.key("digest", {"n":1,"m":{"a":2}}, "default", "env", ResultCache.fileDigest(writeConfig(tmp_path/"image.sif",{})))
+        assert ResultCache.fileDigest(str(tmp_path/"missing.sif")) is None
+
+    def test_update(self, tmp_path):
+        """ Passed results are stored with their files, and skipped cached test cases are restored in later reports"""
+        cache = ResultCache(str(tmp_path/"cache"))
+        first = tmp_path/"reports"/"first"
+        writeReport(first, [
+            {"name":"t1","hashcode":"h1","cache_key":"k1","result":"pass","perfvalues":{"a":1}},
+            {"name":"t2","hashcode":"h2","cache_key":"k2","result":"fail"},
+        ])
+        os.makedirs(first/"logs")
+        (first/"logs"/"h1.adoc").write_text("logs of t1")
+        (first/"logs"/"h2.adoc").write_text("logs of t2")
+        assert cache.update(str(first)) == (0,1)
+        assert cache.has("k1") and not cache.has("k2")
+
+        second = tmp_path/"reports"/"second"
+        writeReport(second, [
+            {"name":"t1","hashcode":"h1","cache_key":"k1","result":"skip"},
+            {"name":"t2","hashcode":"h2","cache_key":"k2","result":"pass"},
+            {"name":"t3","hashcode":"h3","cache_key":"k3","result":"skip"},
+        ])
+        assert cache.update(str(second)) == (1,1)
+        with open(second/"reframe_report.json") as f:
+            report = json.load(f)
+        assert report["runs"][0]["testcases"][0] == {"name":"t1","hashcode":"h1","cache_key":"k1","result":"pass","perfvalues":{"a":1}}
+        assert report["runs"][0]["testcases"][2]["result"] == "skip"
+        assert report["runs"][0]["num_skipped"] == 1
+        assert report["session_info"]["num_skipped"] == 1
+        assert (second/"logs"/"h1.adoc").read_text() == "logs of t1"
+        assert cache.has("k2")
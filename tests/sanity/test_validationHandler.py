@@ -2,6 +2,7 @@
 
 import pytest
 from feelpp.benchmarking.reframe.validation import ValidationHandler
+from feelpp.benchmarking.reframe.parseCache import PARSE_CACHE
 from unittest.mock import patch
 import reframe.utility.sanity as sn
 from reframe.core.exceptions import SanityError
@@ -14,14 +15,16 @@ class MockSanityConfig:
 
 
 @pytest.fixture
-def sample_stdout():
-    """ Fixture for a sample stoud"""
-    return """
+def sample_stdout(tmp_path):
+    """ Fixture for a sample stoud file"""
+    stdout = tmp_path / "rfm_job.out"
+    stdout.write_text("""
         This is a test containing pattern1 and [pattern1] and \\[pattern1\\].
         It matches the pattern 'pattern.*' and includes a number 123.
         It should not contain errorpattern or [errorpattern] or \\[errorpattern\\].
         There are no 3-digit errors in this output.
-    """
+    """)
+    return str(stdout)
 
 def generatSuccessPatternTestCases():
     #TODO: Add more cases
@@ -52,7 +55,7 @@ class TestValidationHandler:
     # THIS SHOULD BE DESCRIBED IN AN ISSUE AND ADD RESPECTIVE UNIT TESTS WHEN IMPLEMENTED
 
     @pytest.mark.parametrize("pattern, expected_result", generatSuccessPatternTestCases())
-    def test_checkSuccess(self,pattern,expected_result,sample_stdout,monkeypatch):
+    def test_checkSuccess(self,pattern,expected_result,sample_stdout):
         """
         Tests the check_success method of the ValudationHandler.
         Checks that the pattern is found (or not) in the sample_stdout.
@@ -60,8 +63,6 @@ class TestValidationHandler:
         """
         validation_handler = ValidationHandler(MockSanityConfig(success=[pattern],error=[]))
 
-        monkeypatch.setattr(sn, 'assert_found', sn.assert_found_s)
-
         if expected_result:
             result = validation_handler.check_success(sample_stdout)
             assert result == expected_result
@@ -70,7 +71,7 @@ class TestValidationHandler:
                 validation_handler.check_success(sample_stdout)
 
     @pytest.mark.parametrize("pattern, expected_result", generateErrorPatternTestCases())
-    def test_checkErrors(self,pattern,expected_result,sample_stdout,monkeypatch):
+    def test_checkErrors(self,pattern,expected_result,sample_stdout):
         """
         Tests the check_errors method of the ValudationHandler
         Checks that the pattern is found (or not) in the sample_stdout.
@@ -78,8 +79,6 @@ class TestValidationHandler:
         """
         validation_handler = ValidationHandler(MockSanityConfig(success=[],error=[pattern]))
 
-        monkeypatch.setattr(sn, 'assert_not_found', sn.assert_not_found_s)
-
         if expected_result:
             result = validation_handler.check_errors(sample_stdout)
             assert result == expected_result
@@ -87,4 +86,11 @@ class TestValidationHandler:
             with pytest.raises(SanityError):
                 validation_handler.check_errors(sample_stdout)
 
-
+    def test_sharedParseCache(self,sample_stdout):
+        """ Checks that the output is read once for all success and error patterns"""
+        PARSE_CACHE.clear()
+        validation_handler = ValidationHandler(MockSanityConfig(success=["pattern1","123"],error=["noerrorpattern"]))
+        assert validation_handler.check_success(sample_stdout)
+        assert validation_handler.check_errors(sample_stdout)
+        assert PARSE_CACHE.misses == 1
+        assert PARSE_CACHE.hits == 1
@@ -0,0 +1,74 @@
+"""Tests for the feelpp.benchmarking.reframe.jsonPaths module"""
+
+import pytest
+import tempfile, json
+from feelpp.benchmarking.reframe import jsonPaths
+from feelpp.benchmarking.reframe.jsonPaths import JsonPathPlan, resolveJsonFile
+from feelpp.benchmarking.reframe.schemas.scalability import Stage
+
+
+@pytest.fixture
+def journal():
+    """ Fixture for a JSON file containing nested per-rank timers"""
+    values = {
+        "metadata": { "name":"journal", "ranks":[0,1] },
+        "timers": {
+            "rank0": { "solve": { "total":1.5, "calls":3 }, "assembly": { "total":0.5 } },
+            "rank1": { "solve": { "total":2.5, "calls":3 }, "assembly": { "total":0.25 } }
+        },
+        "total": 4.0
+    }
+    file = tempfile.NamedTemporaryFile(suffix=".json")
+    with open(file.name,"w") as f:
+        json.dump(values,f)
+    yield file.name
+    file.close()
+
+
+@pytest.fixture(params=["stream","memory"])
+def parser_mode(request,monkeypatch):
+    """ Runs tests with the incremental (ijson) parser and with the in-memory fallback"""
+    if request.param == "stream":
+        pytest.importorskip("ijson")
+    else:
+        monkeypatch.setattr(jsonPaths,"ijson",None)
+    return request.param
+
+
+class TestJsonPathPlan:
+
+    @pytest.mark.parametrize(("expression","steps"),[
+        ("*",[None]),
+        ("total",["total"]),
+        ("timers.*.solve.total",["timers",None,"solve","total"]),
+        ("hardware.*.mem.*",["hardware",None,"mem",None]),
+        ("timers.rank0*",["timers","rank0",None]),
+    ])
+    def test_compile(self,expression,steps):
+        """ Tests that expressions are split once into keys and wildcards"""
+        assert JsonPathPlan(expression).steps == steps
+
+    def test_stageCompilesPlans(self):
+        """ Tests that plans are compiled when the stage is validated"""
+        stage = Stage(filepath="journal.json",format="json",variables_path=["timers.*.solve.total","total"])
+        assert [plan.steps for plan in stage.variables_plan] == [["timers",None,"solve","total"],["total"]]
+        assert Stage(filepath="out.csv").variables_plan == []
+
+    def test_resolve(self,journal,parser_mode):
+        """ Tests that both parsers select the same subtrees, named after wildcards or leaf keys"""
+        plans = [JsonPathPlan(p) for p in ["timers.*.solve.total","timers.rank1.*","total","metadata","timers.*"]]
+        results = resolveJsonFile(journal,plans)
+        assert results[0] == {"rank0":1.5,"rank1":2.5}
+        assert results[1] == {"solve":{"total":2.5,"calls":3},"assembly":{"total":0.25}}
+        assert results[2] == {"total":4.0}
+        assert results[3] == {"metadata":{"name":"journal","ranks":[0,1]}}
+        assert list(results[4].keys()) == ["rank0","rank1"]
+
+        assert resolveJsonFile(journal,[]) == []
+
+    def test_missingKey(self,journal,parser_mode):
+        """ Tests that a missing key raises a KeyError"""
+        with pytest.raises(KeyError):
+            resolveJsonFile(journal,[JsonPathPlan("timers.*.assembly.calls")])
+        with pytest.raises(KeyError):
+            resolveJsonFile(journal,[JsonPathPlan("unknown")])
@@ -0,0 +1,84 @@
+"""Tests for the feelpp.benchmarking.reframe.parseCache module"""
+
+import pytest
+from feelpp.benchmarking.reframe.parseCache import ParseCache
+
+
+class TestParseCache:
+
+    @staticmethod
+    def countingParser(calls):
+        def parser(filepath):
+            calls.append(filepath)
+            with open(filepath) as f:
+                return f.read()
+        return parser
+
+    def test_hitsAndInvalidation(self,tmp_path):
+        """ Tests that a file is parsed once per format, and re-parsed when it changes"""
+        cache = ParseCache(maxsize=4)
+        calls = []
+        filepath = tmp_path / "out.txt"
+        filepath.write_text("first")
+
+        assert cache.get(str(filepath),"text",self.countingParser(calls)) == "first"
+        assert cache.get(str(filepath),"text",self.countingParser(calls)) == "first"
+        assert len(calls) == 1
+        assert cache.hits == 1
+
+        cache.get(str(filepath),("other",1),self.countingParser(calls))
+        assert len(calls) == 2
+
+        filepath.write_text("second version")
+        assert cache.get(str(filepath),"text",self.countingParser(calls)) == "second version"
+        assert len(calls) == 3
+        assert len(cache) == 2
+
+    def test_lruEviction(self,tmp_path):
+        """ Tests that the least recently used entries are evicted first"""
+        cache = ParseCache(maxsize=2)
+        calls = []
+        files = []
+        for i in range(3):
+            files.append(tmp_path / f"out_{i}.txt")
+            files[-1].write_text(str(i))
+
+        cache.get(str(files[0]),"text",self.countingParser(calls))
+        cache.get(str(files[1]),"text",self.countingParser(calls))
+        cache.get(str(files[0]),"text",self.countingParser(calls))
+        cache.get(str(files[2]),"text",self.countingParser(calls))
+        assert len(cache) == 2
+
+        cache.get(str(files[0]),"text",self.countingParser(calls))
+        assert len(calls) == 3
+        cache.get(str(files[1]),"text",self.countingParser(calls))
+        assert len(calls) == 4
+
+    def test_byteBound(self,tmp_path):
+        """ Tests that the cache is bounded by the total size of the cached files, and that files larger than the bound are not cached"""
+        cache = ParseCache(maxsize=10,maxbytes=10)
+        calls = []
+        small = [tmp_path / f"small_{i}.txt" for i in range(3)]
+        for filepath in small:
+            filepath.write_text("abcd")
+        large = tmp_path / "large.txt"
+        large.write_text("a"*11)
+
+        for filepath in small:
+            cache.get(str(filepath),"text",self.countingParser(calls))
+        assert len(cache) == 2
+        assert cache.nbytes == 8
+
+        assert cache.get(str(large),"text",self.countingParser(calls)) == "a"*11
+        cache.get(str(large),"text",self.countingParser(calls))
+        assert calls.count(str(large)) == 2
+        assert len(cache) == 2
+        assert cache.nbytes == 8
+
+        small[2].write_text("ab")
+        cache.get(str(small[2]),"text",self.countingParser(calls))
+        assert cache.nbytes == 6
+
+    def test_missingFile(self,tmp_path):
+        with pytest.raises(FileNotFoundError):
+            ParseCache().get(str(tmp_path / "missing.txt"),"text",lambda filepath: None)
@@ -2,23 +2,31 @@
 
 import pytest
 import tempfile, json
-from feelpp.benchmarking.reframe.scalability import ScalabilityHandler, CsvExtractor,TsvExtractor,JsonExtractor,RegexExtractor,Extractor,ExtractorFactory
+from feelpp.benchmarking.reframe.scalability import ScalabilityHandler, CsvExtractor,TsvExtractor,JsonExtractor,RegexExtractor,RegexStreamExtractor,BinaryTableExtractor,Extractor,ExtractorFactory,ColumnTable
 import numpy as np
+from feelpp.benchmarking.reframe.parseCache import PARSE_CACHE
 
 class StageMocker:
-    def __init__(self,format="",filepath="",name="",variables_path=[],units={"*":"s"}):
+    def __init__(self,format="",filepath="",name="",variables_path=[],units={"*":"s"},arrays=None):
         self.format = format
         self.filepath = filepath
         self.name = name
         self.variables_path = variables_path
         self.units = units
+        self.arrays = arrays
+
+class StageArraysMocker:
+    def __init__(self,summary=["min","max","mean","last"]):
+        self.summary = summary
 
 class CustomVariableMocker:
-    def __init__(self, name="",columns=[],op="",unit="s"):
+    def __init__(self, name="",columns=[],op="",unit="s",q=None,expression=None):
         self.name = name
         self.columns = columns
         self.op = op
         self.unit = unit
+        self.q = q
+        self.expression = expression
 
 class ScalabilityMocker:
     def __init__(self, directory="",stages=[],custom_variables=[]):
@@ -82,6 +90,32 @@ class TestExtractors:
 
         file.close()
 
+    def test_extractTsvIndexed(self):
+        """ Tests that the row matching the index is retrieved from a multi-row TSV file, and that the parsed table is reused until the file changes"""
+        file = tempfile.NamedTemporaryFile()
+        columns = ["col1","col2"]
+        with open(file.name,"w") as f:
+            f.write("# nProc col1 col2\n1 10 20\n2 5 10\n4 2.5 5\n")
+
+        for index,values in [(1,[10,20]),(4,[2.5,5]),("2",[5,10])]:
+            perfvars = TsvExtractor(filepath=file.name,stage_name="",index=index,units={"*":"s"}).extract()
+            for col,value in zip(columns,values):
+                assert perfvars[col].evaluate() == value
+
+        table = ColumnTable.load(file.name,"tsv")
+        assert ColumnTable.load(file.name,"tsv") is table
+        assert table.data["col1"] == [10,5,2.5]
+
+        with open(file.name,"w") as f:
+            f.write("# nProc col1 col2\n8 1.25 2.5\n")
+        assert ColumnTable.load(file.name,"tsv") is not table
+        assert TsvExtractor(filepath=file.name,stage_name="",index=8,units={"*":"s"}).extract()["col1"].evaluate() == 1.25
+
+        with pytest.raises(ValueError,match="Index 16 not found"):
+            TsvExtractor(filepath=file.name,stage_name="",index=16,units={"*":"s"}).extract()
+
+        file.close()
+
 
 
     def test_extractRegex(self):
@@ -110,6 +144,126 @@ class TestExtractors:
 
 
 
+    def test_extractRegexStream(self):
+        """ Test extracting performance variables from a memory-mapped file, with byte windows and early exit"""
+        file = tempfile.NamedTemporaryFile(mode="w+")
+        content = "assembly: 0.012\nsolve: 1.42\npostprocess: 0.08\nsolve: 2.5\n"
+        file.write(content)
+        file.flush()
+
+        class WindowMocker:
+            def __init__(self,offset=0,head=None,tail=None):
+                self.offset = offset
+                self.head = head
+                self.tail = tail
+
+        pattern = r"^(?P<name>[^:\n]+):\s*(?P<value>[\d.]+)$"
+        kwargs = dict(filepath=file.name, stage_name="timers", pattern=pattern, variable_name_group="name", variable_value_group="value", units={"*":"s"})
+
+        #Same results as the in-memory regex extractor
+        assert {k:v.evaluate() for k,v in RegexStreamExtractor(**kwargs).extract().items()} == {k:v.evaluate() for k,v in RegexExtractor(**kwargs).extract().items()}
+
+        #Early exit keeps the first occurrence of each requested variable
+        perfvars = RegexStreamExtractor(**kwargs, variables=["solve"]).extract()
+        assert list(perfvars.keys()) == ["timers_solve"]
+        assert perfvars["timers_solve"].evaluate() == 1.42
+
+        #Byte windows
+        perfvars = RegexStreamExtractor(**kwargs, window=WindowMocker(head=len("assembly: 0.012\n"))).extract()
+        assert list(perfvars.keys()) == ["timers_assembly"]
+
+        perfvars = RegexStreamExtractor(**kwargs, window=WindowMocker(tail=len("solve: 2.5\n"))).extract()
+        assert list(perfvars.keys()) == ["timers_solve"]
+        assert perfvars["timers_solve"].evaluate() == 2.5
+
+        perfvars = RegexStreamExtractor(**kwargs, window=WindowMocker(offset=len("assembly: 0.012\n"))).extract()
+        assert "timers_assembly" not in perfvars
+        assert perfvars["timers_postprocess"].evaluate() == 0.08
+
+        #Unnamed groups
+        kwargs.update(pattern=r"^solve:\s*([\d.]+)$", variable_name_group=None, variable_value_group=1)
+        perfvars = RegexStreamExtractor(**kwargs).extract()
+        assert perfvars["timers_match_0"].evaluate() == 1.42
+        assert perfvars["timers_match_1"].evaluate() == 2.5
+
+        file.close()
+
+        empty = tempfile.NamedTemporaryFile()
+        assert RegexStreamExtractor(**dict(kwargs,filepath=empty.name)).extract() == {}
+        empty.close()
+
+
+    @staticmethod
+    def writeBinaryTable(filepath,format,data):
+        """ Helper function writing a dict of columns in a binary format"""
+        if format == "npy":
+            array = np.zeros(len(next(iter(data.values()))),dtype=[(k,np.asarray(v).dtype) for k,v in data.items()])
+            for k,v in data.items():
+                array[k] = v
+            np.save(filepath,array)
+        elif format == "npz":
+            np.savez(filepath,**data)
+        elif format == "parquet":
+            pa = pytest.importorskip("pyarrow")
+            import pyarrow.parquet as pq
+            pq.write_table(pa.table(data),filepath)
+        elif format == "arrow":
+            pa = pytest.importorskip("pyarrow")
+            import pyarrow.feather as feather
+            feather.write_feather(pa.table(data),filepath)
+        elif format == "hdf5":
+            h5py = pytest.importorskip("h5py")
+            with h5py.File(filepath,"w") as f:
+                for k,v in data.items():
+                    f.create_dataset(k,data=v)
+
+    @pytest.mark.parametrize(("format"),["npy","npz","parquet","arrow","hdf5"])
+    def test_extractBinary(self,tmp_path,format):
+        """ Test performance variable extraction and column projection for binary formats"""
+        filepath = str(tmp_path / f"timers.{format}")
+        data = { "nProc":np.array([1,2,4]), "solve":np.array([4.0,2.0,1.0]), "assembly":np.array([1.0,0.5,0.25]) }
+        self.writeBinaryTable(filepath,format,data)
+
+        perfvars = BinaryTableExtractor(filepath=filepath,stage_name="t",units={"*":"s"},format=format).extract()
+        assert len(perfvars) == 9
+        assert perfvars["t_solve_1"].evaluate() == 2.0
+
+        perfvars = BinaryTableExtractor(filepath=filepath,stage_name="t",units={"*":"s"},format=format,columns=["assembly"]).extract()
+        assert sorted(perfvars.keys()) == ["t_assembly_0","t_assembly_1","t_assembly_2"]
+        assert perfvars["t_assembly_2"].evaluate() == 0.25
+
+        with pytest.raises(ValueError):
+            BinaryTableExtractor(filepath=filepath,stage_name="t",units={"*":"s"},format=format,columns=["unknown"]).extract()
+
+    def test_extractBinaryArrays(self,tmp_path):
+        """ Test that binary columns are kept as numpy arrays, including memory-mapped and byte string columns"""
+        filepath = str(tmp_path / "history.npy")
+        self.writeBinaryTable(filepath,"npy",{ "residual":np.array([1.0,0.5,0.25]), "solver":np.array([b"gmres",b"cg",b"cg"]) })
+        extractor = BinaryTableExtractor(filepath=filepath,stage_name="conv",units={"*":"s"},format="npy")
+
+        columns = extractor._loadColumns()
+        assert all(isinstance(array,np.ndarray) for array in columns.values())
+        assert isinstance(columns["residual"],np.memmap) and not columns["residual"].flags.owndata
+        assert columns["solver"].tolist() == ["gmres","cg","cg"]
+
+        perfvars = extractor.extract()
+        assert perfvars["conv_residual_2"].evaluate() == 0.25
+        assert str(perfvars["conv_solver_0"].evaluate()) == "gmres"
+
+        perfvars, arrays = extractor.extractArrays(["min","count"])
+        assert sorted(perfvars.keys()) == ["conv_residual_count","conv_residual_min"]
+        assert perfvars["conv_residual_min"].evaluate() == 0.25
+        assert arrays["conv_residual"].dtype == float
+        assert arrays["conv_solver"].tolist() == ["gmres","cg","cg"]
+
+    def test_extractPlainNpy(self,tmp_path):
+        """ Test that plain (non structured) arrays are read as col_0, col_1, ... """
+        filepath = str(tmp_path / "timers.npy")
+        np.save(filepath,np.array([[1.0,2.0],[3.0,4.0]]))
+        perfvars = BinaryTableExtractor(filepath=filepath,stage_name="",units={"*":"s"},format="npy",columns=["col_1"]).extract()
+        assert {k:v.evaluate() for k,v in perfvars.items()} == {"col_1_0":2.0,"col_1_1":4.0}
+
+
     def test_extractJson(self):
         """ Test performance variable extraction for JSON files"""
         file = tempfile.NamedTemporaryFile()
@@ -286,4 +440,93 @@ class TestScalabilityHandler:
         assert perf_vars["re_recursive_var"].evaluate() == perf_vars["recursive_var"].evaluate() + perf_vars["custom_var2"].evaluate() + perf_vars["col3"].evaluate()
 
 
-        file.close()
\ No newline at end of file
+        file.close()
+
+    def test_customVariableExpressions(self):
+        """ Tests arithmetic expressions, statistical reductions over multi-row groups and forward references between custom variables"""
+        perf_vars = { "solve_0":4.0, "solve_1":2.0, "solve_2":2.0, "solve_3":8.0, "ref":16.0, "nodes":2.0, "stage_gaya2.total":3.0 }
+
+        scalability_handler = ScalabilityHandler(ScalabilityMocker(custom_variables=[
+            CustomVariableMocker(name="efficiency",expression="ref / (max(solve) * nodes)",unit="-"),
+            CustomVariableMocker(name="load",expression="imbalance(solve)",unit="-"),
+            CustomVariableMocker(name="spread",expression="max(solve) - median(solve) + std(solve) * 0",unit="s"),
+            CustomVariableMocker(name="slowest",op="argmax",columns=["solve"],unit="-"),
+            CustomVariableMocker(name="p50",op="percentile",columns=["solve"],q=50,unit="s"),
+            CustomVariableMocker(name="doubled",expression="2 * solve + {stage_gaya2.total} - 3",unit="s"),
+            CustomVariableMocker(name="forward",op="sum",columns=["late","ref"],unit="s"),
+            CustomVariableMocker(name="late",expression="-nodes",unit="s"),
+        ]))
+        custom = scalability_handler.getCustomPerformanceVariables(perf_vars)
+
+        assert custom["efficiency"].evaluate() == 1.0
+        assert custom["efficiency"].unit == "-"
+        assert custom["load"].evaluate() == 8.0 / 4.0
+        assert custom["spread"].evaluate() == 5.0
+        assert custom["slowest"].evaluate() == 3
+        assert custom["p50"].evaluate() == 3.0
+        assert [custom[f"doubled_{i}"].evaluate() for i in range(4)] == [8.0, 4.0, 4.0, 16.0]
+        assert "doubled" not in custom
+        assert custom["forward"].evaluate() == 14.0
+
+    def test_customVariableErrors(self):
+        """ Tests that cyclic and unknown references are reported"""
+        scalability_handler = ScalabilityHandler(ScalabilityMocker(custom_variables=[
+            CustomVariableMocker(name="a",expression="b + 1"),
+            CustomVariableMocker(name="b",op="sum",columns=["a","c"]),
+        ]))
+        with pytest.raises(ValueError,match="Cyclic dependency between custom variables"):
+            scalability_handler.getCustomPerformanceVariables({"c":1.0})
+
+        scalability_handler = ScalabilityHandler(ScalabilityMocker(custom_variables=[
+            CustomVariableMocker(name="a",expression="unknown + 1"),
+        ]))
+        with pytest.raises(ValueError,match="Custom variable not found : unknown"):
+            scalability_handler.getCustomPerformanceVariables({"c":1.0})
+
+    def test_sharedStagesParsing(self,tmp_path):
+        """ Tests that stages and test cases reading the same file parse it once"""
+        filepath = tmp_path / "stdout.txt"
+        filepath.write_text("solve: 1.5\nassembly: 0.5\n")
+
+        class RegexStageMocker(StageMocker):
+            def __init__(self,name,pattern):
+                super().__init__(format="regex",filepath="stdout",name=name)
+                self.pattern = pattern
+                self.variable_name_group = None
+                self.variable_value_group = 1
+
+        PARSE_CACHE.clear()
+        for _ in range(3):
+            scalability_handler = ScalabilityHandler(ScalabilityMocker(
+                directory=str(tmp_path),
+                stages = [ RegexStageMocker("solve",r"^solve: ([\d.]+)$"), RegexStageMocker("assembly",r"^assembly: ([\d.]+)$") ]
+            ), stdout=str(filepath))
+            perf_vars = scalability_handler.getPerformanceVariables()
+            assert perf_vars["solve_match_0"].evaluate() == 1.5
+            assert perf_vars["assembly_match_0"].evaluate() == 0.5
+
+        assert PARSE_CACHE.misses == 1
+        assert PARSE_CACHE.hits == 5
+
+    def test_arrayMode(self,tmp_path):
+        """ Tests that array-mode stages only register summary variables, and store one array per column in a sidecar file"""
+        filepath = tmp_path / "history.csv"
+        filepath.write_text("iteration,residual,solver\n" + "\n".join(f"{i},{1.0/(i+1)},gmres" for i in range(1000)))
+
+        scalability_handler = ScalabilityHandler(ScalabilityMocker(
+            directory=str(tmp_path),
+            stages = [ StageMocker(format="csv",filepath="history.csv",name="conv",units={"*":"s","residual":"-"},arrays=StageArraysMocker(["min","last","count"])) ]
+        ))
+        perf_vars = scalability_handler.getPerformanceVariables()
+
+        assert sorted(perf_vars.keys()) == sorted(f"conv_{col}_{stat}" for col in ["iteration","residual"] for stat in ["min","last","count"])
+        assert perf_vars["conv_residual_min"].evaluate() == 1.0/1000
+        assert perf_vars["conv_residual_min"].unit == "-"
+        assert perf_vars["conv_iteration_last"].evaluate() == 999
+        assert perf_vars["conv_iteration_count"].evaluate() == 1000
+
+        scalability_handler.saveArrays(str(tmp_path / "report" / "arrays" / "hash.npz"))
+        with np.load(str(tmp_path / "report" / "arrays" / "hash.npz")) as arrays:
+            assert sorted(arrays.keys()) == ["conv_iteration","conv_residual","conv_solver"]
+            assert arrays["conv_residual"].shape == (1000,)
+            assert arrays["conv_solver"][0] == "gmres"
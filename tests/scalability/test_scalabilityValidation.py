@@ -1,10 +1,37 @@
 import pytest
-from feelpp.benchmarking.reframe.schemas.scalability import Stage
+from feelpp.benchmarking.reframe.schemas.scalability import Stage, CustomVariable
 from pydantic import ValidationError
 
 class TestScalability:
     #CustomVariable
-    pass
+    def test_customVariableDefinition(self):
+        """ Tests that custom variables are defined either by an expression or by an operation over columns"""
+        custom_var = CustomVariable(name="efficiency",expression="ref / (max(solve) * {nodes})",unit="-")
+        assert custom_var.op is None
+
+        custom_var = CustomVariable(name="total",op="sum",columns=["a","b"],unit="s")
+        assert custom_var.expression is None
+
+        #Placeholders are only checked once resolved
+        CustomVariable(name="efficiency",expression="ref / ({{parameters.nodes.value}} * solve)",unit="-")
+
+        with pytest.raises(ValidationError,match="Either expression or \\(op, columns\\) must be specified"):
+            CustomVariable(name="total",columns=["a","b"],unit="s")
+
+        with pytest.raises(ValidationError,match="expression cannot be combined with op and columns"):
+            CustomVariable(name="total",op="sum",columns=["a"],expression="a+b",unit="s")
+
+        with pytest.raises(ValidationError,match="q must be specified for the percentile operation"):
+            CustomVariable(name="p90",op="percentile",columns=["a"],unit="s")
+
+        with pytest.raises(ValidationError,match="Unknown function"):
+            CustomVariable(name="bad",expression="__import__('os')",unit="s")
+
+        with pytest.raises(ValidationError,match="Unsupported syntax"):
+            CustomVariable(name="bad",expression="a.b",unit="s")
+
+        with pytest.raises(ValidationError,match="Invalid expression"):
+            CustomVariable(name="bad",expression="a +",unit="s")
 
 
 class TestStage:
@@ -48,6 +75,48 @@ class TestStage:
         assert stage.variable_name_group == "name"
         assert stage.variable_value_group == "value"
 
+    def test_regexStreamValidation(self):
+        """ Tests the regex_stream specific fields (window, variables)"""
+        stage = Stage(
+            name="r_stage", filepath="stdout", format="regex_stream",
+            pattern="^(?P<name>[^:]+):\\s*(?P<value>[\\d.]+)$",
+            variable_name_group="name", variable_value_group="value",
+            window={"tail":1024}, variables=["solve"]
+        )
+        assert stage.window.tail == 1024
+        assert stage.window.offset == 0
+        assert stage.variables == ["solve"]
+
+        with pytest.raises(ValidationError, match="regex must be specified if format == regex"):
+            Stage(**{"filepath": "stdout", "format": "regex_stream", "variable_value_group": "value"})
+
+        with pytest.raises(ValidationError, match="Only one of head or tail can be specified"):
+            Stage(filepath="stdout", format="regex_stream", pattern=".*", variable_value_group=0, window={"head":10,"tail":10})
+
+        with pytest.raises(ValidationError, match="window and variables can only be specified if format == regex_stream"):
+            Stage(filepath="stdout", format="regex", pattern=".*", variable_value_group=1, window={"head":10})
+
+        with pytest.raises(ValidationError, match="variables require variable_name_group to be specified"):
+            Stage(filepath="stdout", format="regex_stream", pattern="(.*)", variable_value_group=1, variables=["a"])
+
+    def test_arrays(self):
+        """ Tests the array mode options"""
+        assert Stage(filepath="history.csv").arrays is None
+        assert Stage(filepath="history.csv",arrays=False).arrays is None
+        assert Stage(filepath="history.csv",arrays=True).arrays.summary == ["min","max","mean","last"]
+        assert Stage(filepath="history.csv",arrays={"summary":["std"]}).arrays.summary == ["std"]
+        with pytest.raises(ValidationError):
+            Stage(filepath="history.csv",arrays={"summary":["unknown"]})
+
+    def test_binaryFormats(self):
+        """ Tests binary format inference and column projection options"""
+        assert Stage(filepath="timers.h5").format == "hdf5"
+        assert Stage(filepath="timers.feather").format == "arrow"
+        assert Stage(filepath="timers.parquet",columns=["solve"]).columns == ["solve"]
+        assert Stage(filepath="timers.bin",format="npy").format == "npy"
+        with pytest.raises(ValidationError,match="columns can only be specified for binary formats"):
+            Stage(filepath="timers.csv",columns=["solve"])
+
 
 class TestAppOutput:
     pass
@@ -0,0 +1,66 @@
+""" Tests for the node-local staging of images and input file dependencies"""
+
+import os, subprocess
+from feelpp.benchmarking.reframe.nodeStaging import NodeStaging
+from feelpp.benchmarking.reframe.schemas.machines import NodeLocalStaging
+
+
+class TestNodeStaging:
+
+    def test_paths(self):
+        staging = NodeStaging("/scratch", "abc")
+        assert staging.root == "/scratch/feelpp_benchmarking_abc"
+        assert staging.add("/pfs/images/app.sif") == "/scratch/feelpp_benchmarking_abc/app.sif"
+        assert staging.add("/pfs/data/meshes", "inputs/meshes") == "/scratch/feelpp_benchmarking_abc/inputs/meshes"
+        assert staging.add("/pfs/data/meshes/cube.geo", "inputs/meshes/cube.geo") == "/scratch/feelpp_benchmarking_abc/inputs/meshes/cube.geo"
+
+    def test_rewrite(self):
+        staging = NodeStaging("/tmp", "abc")
+        staging.add("/pfs/data/meshes", "inputs/meshes")
+        staging.add("/pfs/data/meshes/cube.geo", "inputs/cube.geo")
+        assert staging.rewrite("--mesh /pfs/data/meshes/cube.geo --dir /pfs/data/meshes/other --out /pfs/out") == \
+            "--mesh /tmp/feelpp_benchmarking_abc/inputs/cube.geo --dir /tmp/feelpp_benchmarking_abc/inputs/meshes/other --out /pfs/out"
+
+    def test_script(self, tmp_path):
+        (tmp_path / "pfs" / "meshes").mkdir(parents=True)
+        (tmp_path / "pfs" / "meshes" / "cube.msh").write_text("mesh")
+        (tmp_path / "pfs" / "app.sif").write_text("image")
+        staging = NodeStaging(str(tmp_path / "local"), "abc")
+        image = staging.add(str(tmp_path / "pfs" / "app.sif"))
+        meshes = staging.add(str(tmp_path / "pfs" / "meshes"), "inputs/meshes")
+
+        subprocess.run(["sh", "-c", staging.script()], check=True)
+        with open(image) as f:
+            assert f.read() == "image"
+        with open(os.path.join(meshes, "cube.msh")) as f:
+            assert f.read() == "mesh"
+
+    def test_commands(self, tmp_path):
+        (tmp_path / "input.txt").write_text("input")
+        staging = NodeStaging(str(tmp_path / "local"), "abc")
+        staging.add(str(tmp_path / "input.txt"))
+        per_node = "srun --nodes=2 --ntasks=2 --ntasks-per-node=1"
+        prerun = staging.prerunCommands(per_node, "staging.log")
+        assert prerun[0] == "_staging_start=$(date +%s.%N)"
+        assert prerun[1].startswith(f"{per_node} sh -c ")
+        assert staging.postrunCommands(per_node) == [f"{per_node} sh -c 'rm -rf {staging.root}'"]
+
+        #Single node jobs run the commands without launcher
+        script = "\n".join(staging.prerunCommands("", "staging.log"))
+        subprocess.run(["bash", "-c", script], cwd=tmp_path, check=True)
+        assert os.path.exists(os.path.join(staging.root, "input.txt"))
+        assert NodeStaging.parse(str(tmp_path / "staging.log")) >= 0
+        subprocess.run(["bash", "-c", "\n".join(staging.postrunCommands(""))], check=True)
+        assert not os.path.exists(staging.root)
+
+    def test_parse(self, tmp_path):
+        assert NodeStaging.parse(str(tmp_path / "staging.log")) is None
+        (tmp_path / "staging.log").write_text("1.25\n")
+        assert NodeStaging.parse(str(tmp_path / "staging.log")) == 1.25
+        (tmp_path / "staging.log").write_text("")
+        assert NodeStaging.parse(str(tmp_path / "staging.log")) is None
+
+    def test_schemaDefaults(self):
+        config = NodeLocalStaging()
+        assert config.directory == "/tmp"
+        assert config.image and config.inputs
@@ -0,0 +1,110 @@
+""" Tests for the content-addressed staging store of input file dependencies"""
+
+import os
+import pytest
+from feelpp.benchmarking.reframe.staging import StagingStore
+
+
+@pytest.fixture
+def inputs(tmp_path):
+    source = tmp_path / "user"
+    (source / "meshes" / "sub").mkdir(parents=True)
+    (source / "meshes" / "a.msh").write_text("a")
+    (source / "meshes" / "sub" / "b.msh").write_text("b")
+    (source / "meshes" / "sub" / "copy.msh").write_text("a")
+    (source / "config.cfg").write_text("cfg")
+    return source
+
+
+class TestStagingStore:
+
+    def test_stageFile(self, inputs, tmp_path):
+        store = StagingStore(str(tmp_path / "data" / ".staging"))
+        destination = tmp_path / "data" / "config.cfg"
+        store.stage(str(inputs / "config.cfg"), str(destination))
+        assert destination.read_text() == "cfg"
+        assert os.path.samefile(destination, store.objectPath(StagingStore.fileDigest(str(inputs / "config.cfg"))))
+        assert not os.stat(destination).st_mode & 0o222
+
+    def test_stageTree(self, inputs, tmp_path):
+        store = StagingStore(str(tmp_path / "data" / ".staging"), max_workers=2)
+        destination = tmp_path / "data" / "meshes"
+        store.stage(str(inputs / "meshes"), str(destination))
+        assert (destination / "a.msh").read_text() == "a"
+        assert (destination / "sub" / "b.msh").read_text() == "b"
+        #Identical contents share the same object
+        assert os.path.samefile(destination / "a.msh", destination / "sub" / "copy.msh")
+        assert len(os.listdir(tmp_path / "data" / ".staging" / "objects")) == 2
+
+    def test_hashOnce(self, inputs, tmp_path, monkeypatch):
+        store = StagingStore(str(tmp_path / "data" / ".staging"))
+        store.stage(str(inputs / "meshes"), str(tmp_path / "data" / "meshes"))
+
+        hashed = []
+        fileDigest = StagingStore.fileDigest
+        monkeypatch.setattr(StagingStore, "fileDigest", staticmethod(lambda path: hashed.append(path) or fileDigest(path)))
+        StagingStore(str(tmp_path / "data" / ".staging")).stage(str(inputs / "meshes"), str(tmp_path / "data" / "meshes"))
+        assert hashed == []
+
+        (inputs / "meshes" / "a.msh").write_text("changed")
+        StagingStore(str(tmp_path / "data" / ".staging")).stage(str(inputs / "meshes"), str(tmp_path / "data" / "meshes"))
+        assert hashed == [str(inputs / "meshes" / "a.msh")]
+        assert (tmp_path / "data" / "meshes" / "a.msh").read_text() == "changed"
+        assert (tmp_path / "data" / "meshes" / "sub" / "copy.msh").read_text() == "a"
+
+    def test_replaceOutdatedCopy(self, inputs, tmp_path):
+        destination = tmp_path / "data" / "config.cfg"
+        destination.parent.mkdir()
+        destination.write_text("old")
+        StagingStore(str(tmp_path / "data" / ".staging")).stage(str(inputs / "config.cfg"), str(destination))
+        assert destination.read_text() == "cfg"
+
+    def test_copyFallback(self, inputs, tmp_path, monkeypatch):
+        def link(src, dst):
+            raise OSError("cross-device link")
+        monkeypatch.setattr(os, "link", link)
+        destination = tmp_path / "data" / "config.cfg"
+        store = StagingStore(str(tmp_path / "store"))
+        store.stage(str(inputs / "config.cfg"), str(destination))
+        assert destination.read_text() == "cfg"
+        assert not os.path.samefile(destination, store.objectPath(StagingStore.fileDigest(str(inputs / "config.cfg"))))
+
+    def test_referenceCounting(self, inputs, tmp_path):
+        store = StagingStore(str(tmp_path / "data" / ".staging"))
+        destination = str(tmp_path / "data" / "meshes")
+        for holder in ["test1", "test2"]:
+            store.acquire(destination, holder)
+            store.stage(str(inputs / "meshes"), destination)
+        store.acquire(destination, "test2")
+
+        assert not store.release(destination, "test1")
+        assert os.path.isdir(destination)
+        assert store.release(destination, "test2")
+        assert not os.path.exists(destination)
+        #Store objects are kept for the next stagings
+        assert len(os.listdir(tmp_path / "data" / ".staging" / "objects")) == 2
+        assert store.readMetadata("refs") == {}
+
+    def test_collect(self, inputs, tmp_path):
+        """ Outdated objects are removed once they are not staged anymore, current ones only above the size cap"""
+        store = StagingStore(str(tmp_path / "data" / ".staging"))
+        destination = str(tmp_path / "data" / "config.cfg")
+        store.stage(str(inputs / "config.cfg"), destination)
+        outdated = store.objectPath(StagingStore.fileDigest(str(inputs / "config.cfg")))
+        (inputs / "config.cfg").write_text("new cfg")
+        store.stage(str(inputs / "config.cfg"), destination)
+        current = store.objectPath(StagingStore.fileDigest(str(inputs / "config.cfg")))
+
+        assert store.collect() == 0
+        assert store.collect(grace=0) == 1
+        assert not os.path.exists(outdated) and os.path.exists(current)
+
+        store.acquire(destination, "test")
+        store.release(destination, "test")
+        assert store.collect(grace=0) == 0
+        assert store.collect(max_bytes=0, grace=0) == 1
+        assert not os.path.exists(current)
+
+        os.remove(inputs / "config.cfg")
+        store.collect(grace=0)
+        assert store.readMetadata("index") == {}